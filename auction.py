@@ -0,0 +1,234 @@
+"""
+Auction rules: seats, call encoding, legality and auction keys.
+
+Every call has a small integer code: Pass 0, X 1, XX 2, then 1C 3 up to
+7NT 37, so contract bids compare by code. An Auction packs the calls
+into a bytearray and keeps just enough running state (the last contract
+and its side, the last action, trailing passes) for the legal calls to
+be a bitmask computed in O(1), and a 64-bit FNV-1a hash of the calls so
+far that is stable across processes and can key caches and indexes.
+
+The module-level helpers take auctions as lists of {seat, bid} in the
+order the calls were made, the same shape the full-auction page sends.
+Calls are 'Pass', 'X', 'XX' or a contract bid such as '1C' or '3NT'.
+"""
+
+SEATS = ['N', 'E', 'S', 'W']
+STRAINS = ['C', 'D', 'H', 'S', 'NT']
+NON_CONTRACT = ('Pass', 'X', 'XX')
+CONTRACT_BIDS = [f'{level}{strain}' for level in range(1, 8) for strain in STRAINS]
+ALL_CALLS = list(NON_CONTRACT) + CONTRACT_BIDS
+
+PASS, DOUBLE, REDOUBLE = 0, 1, 2
+FIRST_CONTRACT = 3
+CALL_CODES = {call: code for code, call in enumerate(ALL_CALLS)}
+SEAT_INDEX = {seat: i for i, seat in enumerate(SEATS)}
+
+_RANK = {bid: i for i, bid in enumerate(CONTRACT_BIDS)}
+
+# _ABOVE[code]: mask of the contract bids above `code` (all of them for -1)
+_ALL_CONTRACTS = ((1 << len(ALL_CALLS)) - 1) & ~0b111
+_ABOVE = {code: _ALL_CONTRACTS & ~((1 << (code + 1)) - 1) for code in range(FIRST_CONTRACT - 1, len(ALL_CALLS))}
+_ABOVE[-1] = _ALL_CONTRACTS
+
+_FNV_OFFSET = 0xcbf29ce484222325
+_FNV_PRIME = 0x100000001b3
+_MASK64 = (1 << 64) - 1
+
+
+def partner_of(seat):
+    return SEATS[(SEATS.index(seat) + 2) % 4]
+
+
+def is_contract(bid):
+    return bid not in NON_CONTRACT
+
+
+def bid_rank(bid):
+    """Position of a contract bid in the ladder 1C < 1D < ... < 7NT."""
+    return _RANK[bid]
+
+
+def encode(call):
+    """The code of a call; ValueError for anything else."""
+    try:
+        return CALL_CODES[call]
+    except (KeyError, TypeError):
+        raise ValueError(f'{call!r} is not a call') from None
+
+
+def decode(code):
+    return ALL_CALLS[code]
+
+
+def mask_calls(mask):
+    """The calls in a legal-call mask, in ladder order."""
+    return [call for code, call in enumerate(ALL_CALLS) if mask >> code & 1]
+
+
+def _fnv(value, code):
+    return ((value ^ (code + 1)) * _FNV_PRIME) & _MASK64
+
+
+def _seed(dealer):
+    """The hash of an empty auction: the dealer counts as a first symbol."""
+    return _FNV_OFFSET if dealer is None else _fnv(_FNV_OFFSET, len(ALL_CALLS) + dealer)
+
+
+class Auction:
+    """
+    A packed auction. `dealer` is the first seat to call; it may be None
+    for an empty auction whose dealer is not known yet, in which case
+    the seat of the first call sets it.
+    """
+
+    __slots__ = ('dealer', 'calls', 'hash', '_contract', '_action', '_action_side', '_passes')
+
+    def __init__(self, dealer=None):
+        self.dealer = None if dealer is None else SEAT_INDEX[dealer]
+        self.calls = bytearray()
+        self.hash = _seed(self.dealer)
+        self._contract = -1  # code of the last contract bid
+        self._action = PASS  # last call other than Pass
+        self._action_side = -1
+        self._passes = 0  # passes since the last action
+
+    @classmethod
+    def from_list(cls, auction):
+        """Pack a list of {seat, bid}; ValueError for an unknown call."""
+        packed = cls(auction[0]['seat'] if auction else None)
+        for entry in auction:
+            packed.push(encode(entry['bid']), entry['seat'])
+        return packed
+
+    @classmethod
+    def checked(cls, auction, dealer=None):
+        """
+        Pack a list of {seat, bid} call by call with add(), so each seat
+        must be next to call and each call legal; ValueError at the first
+        one that is not. `dealer` defaults to the seat of the first call.
+        """
+        packed = cls(dealer)
+        for entry in auction:
+            packed.add(entry['bid'], entry['seat'])
+        return packed
+
+    def __len__(self):
+        return len(self.calls)
+
+    def next_seat(self):
+        return None if self.dealer is None else SEATS[(self.dealer + len(self.calls)) % 4]
+
+    @property
+    def complete(self):
+        """Three passes after a bid, or four passes to start."""
+        if self._contract < 0:
+            return len(self.calls) == 4 and self._passes == 4
+        return self._passes >= 3
+
+    def legal_mask(self, seat=None):
+        """Bit `code` is set for each call `seat` (default: next to call) may make."""
+        if self.complete:
+            return 0
+        seat = seat or self.next_seat()
+        side = SEAT_INDEX[seat] % 2 if seat else -1
+        mask = 1 | _ABOVE[self._contract]
+        if self._action_side >= 0 and self._action_side != side:
+            if self._action >= FIRST_CONTRACT:
+                mask |= 1 << DOUBLE
+            elif self._action == DOUBLE:
+                mask |= 1 << REDOUBLE
+        return mask
+
+    def legal_calls(self, seat=None):
+        return mask_calls(self.legal_mask(seat))
+
+    def is_legal(self, call, seat=None):
+        code = CALL_CODES.get(call)
+        return code is not None and bool(self.legal_mask(seat) >> code & 1)
+
+    def push(self, code, seat=None):
+        """Append a call by code without checking it; `seat` defaults to the next seat."""
+        if seat is None:
+            seat = self.next_seat()
+        elif self.dealer is None:
+            self.dealer = SEAT_INDEX[seat]
+            self.hash = _seed(self.dealer)
+        side = SEAT_INDEX[seat] % 2
+        if code == PASS:
+            self._passes += 1
+        else:
+            self._passes = 0
+            self._action, self._action_side = code, side
+            if code >= FIRST_CONTRACT:
+                self._contract = code
+        self.calls.append(code)
+        self.hash = _fnv(self.hash, code)
+
+    def add(self, call, seat=None):
+        """Append the next call after checking it is legal and in turn; ValueError if not."""
+        if self.dealer is not None and seat is not None and seat != self.next_seat():
+            raise ValueError(f'{seat} called out of turn: {self.next_seat()} was next')
+        seat = seat or self.next_seat()
+        if not self.is_legal(call, seat):
+            raise ValueError(f'{call!r} is not a legal call for {seat}')
+        self.push(CALL_CODES[call], seat)
+
+    def prefix_hash(self, length):
+        """The hash this auction had after its first `length` calls."""
+        value = _seed(self.dealer)
+        for code in self.calls[:length]:
+            value = _fnv(value, code)
+        return value
+
+    def key(self):
+        """The hash as 16 hex digits."""
+        return f'{self.hash:016x}'
+
+    def to_list(self):
+        return [{'seat': SEATS[(self.dealer + i) % 4], 'bid': ALL_CALLS[code]}
+                for i, code in enumerate(self.calls)]
+
+
+def pack(auction):
+    """An Auction from a list of {seat, bid}."""
+    return Auction.from_list(auction)
+
+
+def is_auction_complete(auction):
+    """Three passes after a bid, or four passes to start."""
+    return pack(auction).complete
+
+
+def legal_calls(seat, auction):
+    """Every call `seat` may make next, in ladder order."""
+    return pack(auction).legal_calls(seat)
+
+
+def is_legal(call, seat, auction):
+    return pack(auction).is_legal(call, seat)
+
+
+def final_contract(auction):
+    """
+    The contract a finished auction reached, as {level, strain, declarer,
+    doubled} with doubled 0, 1 or 2; None if it was passed out. The
+    declarer is the first player of the winning side to name the strain.
+    """
+    last = None
+    doubled = 0
+    for entry in auction:
+        if is_contract(entry['bid']):
+            last = entry
+            doubled = 0
+        elif entry['bid'] == 'X':
+            doubled = 1
+        elif entry['bid'] == 'XX':
+            doubled = 2
+    if last is None:
+        return None
+    level, strain = int(last['bid'][0]), last['bid'][1:]
+    side = (last['seat'], partner_of(last['seat']))
+    declarer = next(entry['seat'] for entry in auction
+                    if entry['seat'] in side and is_contract(entry['bid']) and entry['bid'][1:] == strain)
+    return {'level': level, 'strain': strain, 'declarer': declarer, 'doubled': doubled}
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Precomputed AI bids for every reachable branch of the full-auction scenarios.
+
+Each scenario starts from a fixed opening and the user can only choose
+from the page's bid buttons, so the states where an AI seat has to bid
+form a small, finite tree. This module walks that tree to a given depth
+(the number of user calls to branch over), asks the backend for every AI
+call on the way, and writes the answers to a gzip-compressed JSON index
+keyed on (scenario, seat, auction). /api/bid serves from the index
+before going upstream.
+
+Build (uses ANTHROPIC_API_KEY and CLAUDE_MODEL like the backend):
+  python auction_tree.py --depth 1 --output data/auction_tree.json.gz
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from auction import is_auction_complete, legal_calls
+
+TREE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'auction_tree.json.gz')
+FORMAT_VERSION = 1
+
+# The calls offered by the bid buttons in slam-auction-full.html
+USER_CALLS = [
+    'Pass', 'X', '1C', '1D', '1H', '1S', '1NT', '2C', '2D', '2H', '2S', '2NT',
+    '3C', '3D', '3H', '3S', '3NT', '4C', '4D', '4H', '4S', '4NT',
+]
+
+# Only model answers are stored: rule-engine calls are cheaper to
+# recompute than to look up, and fallbacks are not real answers
+STORED_SOURCES = ('llm', 'repair')
+
+
+def tree_key(scenario_id, seat, auction):
+    """Index key for the call `seat` makes after `auction`."""
+    return f"{scenario_id}|{seat}|{' '.join(entry['bid'] for entry in auction)}"
+
+
+def user_options(seat, auction):
+    """Calls the user can pick from the page's bid buttons."""
+    legal = set(legal_calls(seat, auction))
+    return [call for call in USER_CALLS if call in legal]
+
+
+class AuctionTree:
+    """
+    Read-only index of precomputed bids, with hit/miss counters.
+
+    A missing file gives an empty tree; answers built for a different
+    model than the one being served are ignored.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.model = None
+        self.depth = None
+        self.entries = {}
+        if path and os.path.exists(path):
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                artifact = json.load(f)
+            if artifact.get('format') == FORMAT_VERSION:
+                self.model = artifact['model']
+                self.depth = artifact['depth']
+                self.entries = artifact['entries']
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, scenario_id, seat, auction, model):
+        """Return {bid, reasoning, source, model} or None."""
+        entry = self.entries.get(tree_key(scenario_id, seat, auction)) if model == self.model else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if entry is None:
+            return None
+        return {'bid': entry[0], 'reasoning': entry[1], 'source': 'precomputed', 'model': model}
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'model': self.model,
+                'depth': self.depth,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+def write_tree(path, entries, model, depth):
+    artifact = {'format': FORMAT_VERSION, 'model': model, 'depth': depth, 'entries': entries}
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(artifact, f, separators=(',', ':'), ensure_ascii=False)
+
+
+def build_tree(scenario, depth, advance, workers=4):
+    """
+    Walk one scenario's tree and return (entries, counts).
+
+    `advance(auction)` plays the AI seats from `auction` up to the user's
+    next turn and returns (bids, error) like /api/auction/advance.
+    """
+    entries = {}
+    counts = {'states': 0, 'rules': 0, 'stored': 0, 'failed': 0, 'paths': 0}
+    lock = threading.Lock()
+
+    def play(auction):
+        bids, error = advance(auction)
+        auction = list(auction)
+        with lock:
+            for bid in bids:
+                counts['states'] += 1
+                if bid['source'] in STORED_SOURCES:
+                    entries[tree_key(scenario['id'], bid['seat'], auction)] = [bid['bid'], bid['reasoning'], bid['source']]
+                    counts['stored'] += 1
+                elif bid['source'] == 'rules':
+                    counts['rules'] += 1
+                else:
+                    counts['failed'] += 1
+                auction.append({'seat': bid['seat'], 'bid': bid['bid']})
+            if error:
+                counts['states'] += 1
+                counts['failed'] += 1
+        return None if error or is_auction_complete(auction) else auction
+
+    frontier = [play([{'seat': scenario['dealer'], 'bid': scenario['opening_bid']}])]
+    user = scenario['your_seat']
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(depth):
+            branches = [state + [{'seat': user, 'bid': call}]
+                        for state in frontier if state is not None
+                        for call in user_options(user, state)]
+            frontier = list(pool.map(play, branches))
+            counts['paths'] += len(branches)
+    return entries, counts
+
+
+def backend_advance():
+    """An advance() that replays through the backend's own /api/auction/advance."""
+    import importlib.util
+
+    os.environ['AUCTION_TREE_PATH'] = ''  # never build from a previous tree
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'slam-backend.py')
+    spec = importlib.util.spec_from_file_location('slam_backend', path)
+    backend = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(backend)
+    from limits import ClientLimiter
+    backend.client_limiter = ClientLimiter(rate=0)  # every request comes from one address
+    client = backend.app.test_client()
+
+    def advance(scenario_id, auction):
+        response = client.post('/api/auction/advance',
+                               json={'scenario_id': scenario_id, 'auction': auction})
+        data = response.get_json()
+        return data.get('bids', []), data.get('error')
+
+    return advance, backend.choose_model()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--depth', type=int, default=1, help='user calls to branch over')
+    parser.add_argument('--scenarios', default='', help='comma-separated IDs (default: all)')
+    parser.add_argument('--workers', type=int, default=4, help='branches bid in parallel')
+    parser.add_argument('--output', default=TREE_FILE)
+    args = parser.parse_args()
+
+    from scenarios import load_scenarios
+    scenarios = load_scenarios()
+    ids = [s for s in args.scenarios.split(',') if s] or list(scenarios)
+    advance, model = backend_advance()
+
+    entries = {}
+    totals = dict.fromkeys(('states', 'rules', 'stored', 'failed', 'paths'), 0)
+    start = time.perf_counter()
+    print(f"{'scenario':<9} {'paths':>6} {'AI calls':>9} {'rules':>6} {'stored':>7} {'failed':>7}")
+    for scenario_id in ids:
+        scenario = scenarios[scenario_id]
+        found, counts = build_tree(scenario, args.depth,
+                                   lambda auction: advance(scenario_id, auction), args.workers)
+        entries.update(found)
+        for name in totals:
+            totals[name] += counts[name]
+        print(f"{scenario_id:<9} {counts['paths']:>6} {counts['states']:>9} {counts['rules']:>6} "
+              f"{counts['stored']:>7} {counts['failed']:>7}")
+
+    write_tree(args.output, entries, model, args.depth)
+    covered = totals['rules'] + totals['stored']
+    print(f"\n{totals['states']} AI calls within depth {args.depth}: "
+          f"{covered / max(1, totals['states']):.1%} answerable without an upstream call "
+          f"({totals['rules']} rules, {totals['stored']} precomputed, {totals['failed']} failed)")
+    print(f"Wrote {len(entries)} entries for {model} to {args.output} "
+          f"({os.path.getsize(args.output)} bytes) in {time.perf_counter() - start:.1f}s")
+    return 1 if totals['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
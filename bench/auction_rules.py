@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Auction rules benchmark: legality checks and auction keys per second.
+
+Builds --auctions random legal auctions, then at every point of each one
+checks all 38 calls two ways: the string rules the pages and tests used
+to carry (scan back for the last contract bid and compare level and
+strain parsed from the strings, every check) and auction.Auction's mask,
+updated once per call. Then keys every prefix two ways: the incremental
+FNV-1a hash against sha256 of the prefix's JSON.
+
+Usage:
+  python bench/auction_rules.py --auctions 2000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from auction import ALL_CALLS, CALL_CODES, SEATS, Auction, is_contract, partner_of
+
+STRAIN_ORDER = {'C': 0, 'D': 1, 'H': 2, 'S': 3, 'NT': 4}
+
+
+def string_value(bid):
+    return int(bid[0]) * 5 + STRAIN_ORDER[bid[1:]]
+
+
+def string_is_legal(call, seat, auction):
+    """The string rules, with X/XX by side, rescanning the auction per check."""
+    last = next((entry for entry in reversed(auction) if entry['bid'] != 'Pass'), None)
+    if call == 'Pass':
+        return True
+    if call in ('X', 'XX'):
+        if last is None or last['seat'] in (seat, partner_of(seat)):
+            return False
+        return is_contract(last['bid']) if call == 'X' else last['bid'] == 'X'
+    contract = next((entry['bid'] for entry in reversed(auction) if is_contract(entry['bid'])), None)
+    return contract is None or string_value(call) > string_value(contract)
+
+
+def random_auctions(count, seed):
+    """Legal auctions that run to completion, as lists of {seat, bid}."""
+    rng = random.Random(seed)
+    auctions = []
+    for _ in range(count):
+        packed = Auction(rng.choice(SEATS))
+        while not packed.complete:
+            calls = packed.legal_calls()
+            # Mostly pass so auctions end at a realistic length
+            call = 'Pass' if rng.random() < 0.55 else rng.choice(calls)
+            packed.add(call)
+        auctions.append(packed.to_list())
+    return auctions
+
+
+def rate(count, start):
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--auctions', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    auctions = random_auctions(args.auctions, args.seed)
+    calls = sum(len(a) for a in auctions)
+    print(f'{len(auctions)} auctions, {calls} calls, {calls / len(auctions):.1f} per auction')
+
+    # Both must agree before either is timed
+    for auction in auctions[:200]:
+        packed = Auction(auction[0]['seat'])
+        for i, entry in enumerate(auction):
+            seat = packed.next_seat()
+            expected = [call for call in ALL_CALLS if string_is_legal(call, seat, auction[:i])]
+            assert packed.legal_calls() == expected, (auction[:i], expected)
+            packed.push(CALL_CODES[entry['bid']])
+
+    checks = calls * len(ALL_CALLS)
+    start = time.perf_counter()
+    for auction in auctions:
+        for i, entry in enumerate(auction):
+            prefix = auction[:i]
+            for call in ALL_CALLS:
+                string_is_legal(call, entry['seat'], prefix)
+    strings = rate(checks, start)
+
+    codes = [[CALL_CODES[entry['bid']] for entry in auction] for auction in auctions]
+    all_codes = range(len(ALL_CALLS))
+    start = time.perf_counter()
+    for auction, sequence in zip(auctions, codes):
+        packed = Auction(auction[0]['seat'])
+        for code in sequence:
+            mask = packed.legal_mask()
+            for call in all_codes:
+                mask >> call & 1
+            packed.push(code)
+    masks = rate(checks, start)
+    print(f'legality checks/s: strings {strings:,.0f}, packed {masks:,.0f} ({masks / strings:.0f}x)')
+
+    start = time.perf_counter()
+    for auction in auctions:
+        for i in range(1, len(auction) + 1):
+            hashlib.sha256(json.dumps(auction[:i]).encode()).hexdigest()
+    sha = rate(calls, start)
+
+    start = time.perf_counter()
+    for auction, sequence in zip(auctions, codes):
+        packed = Auction(auction[0]['seat'])
+        for code in sequence:
+            packed.push(code)
+            packed.key()
+    fnv = rate(calls, start)
+    print(f'prefix keys/s: sha256 of JSON {sha:,.0f}, incremental FNV-1a {fnv:,.0f} ({fnv / sha:.0f}x)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
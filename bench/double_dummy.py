@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Double-dummy benchmark: whole deals (all 20 declarer/strain pairs) solved
+per second, on one core and on a process pool.
+
+Deals come from the full-auction scenarios or, with --random, from the
+deal generator. Each run starts with an empty memo so every deal is
+really solved; the per-deal times show how much harder some deals are.
+
+Usage:
+  python bench/double_dummy.py --count 4 --workers 4
+  python bench/double_dummy.py --random --count 8 --workers 1,2,4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import double_dummy
+from scenarios import get_store
+
+
+def deals(count, random_deals, seed):
+    if random_deals:
+        from deal_generator import generate_deals
+        return [{'id': f'random-{i}', 'hands': hands} for i, hands in enumerate(generate_deals({}, count, seed=seed))]
+    return get_store().scenarios('full')[:count]
+
+
+def run(records, workers):
+    """Solve every deal from scratch; return (seconds, per-deal seconds)."""
+    double_dummy._tables.clear()
+    start = time.perf_counter()
+    times = [seconds for _, _, seconds in double_dummy.annotate(records, workers)]
+    return time.perf_counter() - start, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=4, help='deals to solve')
+    parser.add_argument('--workers', default=f'1,{os.cpu_count() or 1}', help='comma-separated pool sizes')
+    parser.add_argument('--random', action='store_true', help='random deals instead of the scenarios')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    records = deals(args.count, args.random, args.seed)
+    print(f'{len(records)} deals, {os.cpu_count()} CPUs')
+    print(f"{'workers':>7} {'seconds':>8} {'deals/s':>8} {'median':>8} {'slowest':>8}")
+    for workers in sorted({int(w) for w in args.workers.split(',') if w}):
+        elapsed, times = run(records, workers)
+        times.sort()
+        print(f'{workers:>7} {elapsed:>8.1f} {len(records) / elapsed:>8.3f} '
+              f'{times[len(times) // 2]:>7.1f}s {times[-1]:>7.1f}s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Hand evaluation benchmark: hands per second, batched against per hand.
+
+Deals --hands random hands with the deal generator, then evaluates them
+three ways: hand_eval.evaluate_batch over the whole array, a Python loop
+calling hand_eval.evaluate on each mask, and a Python loop computing the
+same values from the {S, H, D, C} strings card by card, the way the
+bidding engine used to count HCP. The loops run on a --loop-hands
+sample, since they are orders of magnitude slower.
+
+Usage:
+  python bench/hand_eval.py --hands 4000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from deal_generator import DealGenerator, hand_masks
+from hand_eval import SUITS, evaluate, evaluate_batch, suit_cards, unpack_hand
+
+HCP_VALUES = {'A': 4, 'K': 3, 'Q': 2, 'J': 1}
+
+
+def string_evaluate(hand):
+    """HCP, lengths, losers, quick tricks, controls and stoppers from the card strings."""
+    values = {'hcp': 0, 'lengths': {}, 'ltc': 0, 'quick_tricks': 0.0, 'controls': 0, 'stoppers': []}
+    for suit in SUITS:
+        cards = suit_cards(hand.get(suit, ''))
+        length = len(cards)
+        values['lengths'][suit] = length
+        values['hcp'] += sum(HCP_VALUES.get(card, 0) for card in cards)
+        top = min(length, 3)
+        values['ltc'] += top - sum(1 for card in 'AKQ'[:top] if card in cards)
+        if 'A' in cards:
+            values['quick_tricks'] += 2 if 'K' in cards else 1.5 if 'Q' in cards else 1
+        elif 'K' in cards:
+            values['quick_tricks'] += 1 if 'Q' in cards else 0.5 if length >= 2 else 0
+        values['controls'] += 2 * ('A' in cards) + ('K' in cards)
+        if ('A' in cards or ('K' in cards and length >= 2) or ('Q' in cards and length >= 3)
+                or ('J' in cards and length >= 4)):
+            values['stoppers'].append(suit)
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hands', type=int, default=4_000_000, help='hands evaluated in one batch')
+    parser.add_argument('--loop-hands', type=int, default=100_000, help='hands evaluated one at a time')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    owners = DealGenerator({}, seed=args.seed, batch_size=65536).sample((args.hands + 3) // 4)
+    masks = hand_masks(owners).ravel()[:args.hands]
+    print(f'{len(masks):,} hands dealt in {time.perf_counter() - start:.1f}s')
+
+    sample = masks[:args.loop_hands].tolist()
+    hands = [unpack_hand(mask) for mask in sample]
+    for hand, mask in zip(hands[:1000], sample):
+        expected = evaluate(mask)
+        assert all(expected[key] == value for key, value in string_evaluate(hand).items()), hand
+
+    evaluate_batch(masks[:1000])  # warm up
+    start = time.perf_counter()
+    batch = evaluate_batch(masks)
+    batch_rate = len(masks) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for mask in sample:
+        evaluate(mask)
+    table_rate = len(sample) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for hand in hands:
+        string_evaluate(hand)
+    string_rate = len(hands) / (time.perf_counter() - start)
+
+    print(f"{'method':<28} {'hands/s':>14} {'vs strings':>11}")
+    for name, rate in (('card strings, per hand', string_rate), ('hand_eval.evaluate, per hand', table_rate),
+                       ('hand_eval.evaluate_batch', batch_rate)):
+        print(f'{name:<28} {rate:>14,.0f} {rate / string_rate:>10.1f}x')
+    print(f"mean HCP {batch['hcp'].mean():.2f}, LTC {batch['ltc'].mean():.2f}, "
+          f"quick tricks {batch['quick_tricks'].mean():.2f}, controls {batch['controls'].mean():.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
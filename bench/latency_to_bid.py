@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark: time until the bid is known, buffered vs. streamed.
+
+Boots the backend against the streaming stub upstream with the bid cache
+disabled and asks for the same judgment call through /api/bid (the bid
+arrives with the complete reply) and /api/bid/stream (the bid arrives as
+its own event once the model has written the bid field). Reports time to
+bid and time to the complete reply for each.
+
+Usage:
+  python bench/latency_to_bid.py --requests 20 --latency 1.0
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stub_upstream import start_stub
+from load_serving import percentile, start_backend
+
+# South's reply to 1NT is a judgment call, so it goes to the (stub) model
+BODY = {
+    'scenario_id': 'U01', 'seat': 'S',
+    'auction': [{'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'}],
+}
+
+
+def buffered(base_url):
+    start = time.perf_counter()
+    response = requests.post(base_url + '/api/bid', json=BODY, timeout=60)
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+def streamed(base_url):
+    start = time.perf_counter()
+    to_bid = None
+    with requests.post(base_url + '/api/bid/stream', json=BODY, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith('event:'):
+                event = line[6:].strip()
+            elif line.startswith('data:') and event == 'bid' and to_bid is None:
+                json.loads(line[5:])
+                to_bid = time.perf_counter() - start
+    return to_bid, time.perf_counter() - start
+
+
+def summarize(name, samples):
+    to_bid = sorted(s[0] for s in samples)
+    total = sorted(s[1] for s in samples)
+    print(f'{name:<10} time to bid p50 {1000 * statistics.median(to_bid):7.0f} ms  '
+          f'p95 {1000 * percentile(to_bid, 95):7.0f} ms   '
+          f'complete p50 {1000 * statistics.median(total):7.0f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=1.0, help='stub seconds per full reply')
+    parser.add_argument('--port', type=int, default=8093)
+    parser.add_argument('--mode', default='async', choices=['async', 'threaded', 'sync'])
+    args = parser.parse_args()
+
+    stub = start_stub(latency=args.latency)
+    stub_url = f'http://127.0.0.1:{stub.server_port}/v1/messages'
+    proc = start_backend(args.mode, args.port, stub_url, 1, {'BID_CACHE_MAX_ENTRIES': '0'})
+    base_url = f'http://127.0.0.1:{args.port}'
+    try:
+        print(f'{args.requests} sequential requests, stub reply takes {args.latency}s, mode {args.mode}')
+        summarize('buffered', [buffered(base_url) for _ in range(args.requests)])
+        summarize('streamed', [streamed(base_url) for _ in range(args.requests)])
+    finally:
+        proc.terminate()
+        proc.wait()
+        stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
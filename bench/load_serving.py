@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Load test: concurrent /api/bid throughput under each gunicorn serving mode.
+
+Starts the stub upstream, then for each mode boots
+`gunicorn slam-backend:app -c gunicorn.conf.py` against it and fires
+concurrent bid requests. Sync workers serve one bid at a time each, so
+throughput is capped at workers / latency; the async (gevent) mode keeps
+every request in flight at once.
+
+Usage:
+  python bench/load_serving.py --requests 100 --concurrency 50 --latency 0.5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stub_upstream import start_stub
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+STATIC_ROUTES = ['/', '/single', '/full', '/bridge-101', '/conventions']
+
+
+def wait_until_up(base_url, timeout=20.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(base_url + '/health', timeout=1).ok:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'Backend at {base_url} did not come up')
+
+
+def start_backend(mode, port, stub_url, workers, extra_env=None):
+    env = dict(os.environ)
+    env.update({
+        'SLAM_SERVING_MODE': mode,
+        'PORT': str(port),
+        'WEB_CONCURRENCY': str(workers),
+        'ANTHROPIC_API_URL': stub_url,
+        'ANTHROPIC_API_KEY': 'stub',
+    })
+    env.update(extra_env or {})
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'slam-backend:app', '-c', 'gunicorn.conf.py'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    wait_until_up(f'http://127.0.0.1:{port}')
+    return proc
+
+
+def run_load(base_url, total, concurrency, body):
+    """Fire `total` POSTs with `concurrency` in flight; return latencies and errors."""
+    def one(_):
+        start = time.perf_counter()
+        try:
+            ok = requests.post(base_url + '/api/bid', json=body, timeout=120).ok
+        except requests.exceptions.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    wall = time.perf_counter() - start
+    latencies = sorted(r[0] for r in results)
+    errors = sum(1 for r in results if not r[1])
+    return wall, latencies, errors
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='sync,async', help='comma-separated SLAM_SERVING_MODE values')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.5, help='stub upstream seconds per call')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=5077)
+    args = parser.parse_args()
+
+    stub = start_stub(latency=args.latency)
+    stub_url = f'http://127.0.0.1:{stub.server_port}/v1/messages'
+    base_url = f'http://127.0.0.1:{args.port}'
+    body = {'prompt': 'You are N playing bridge. Respond with JSON.'}
+
+    print(f"{args.requests} bids, {args.concurrency} concurrent, {args.workers} workers, "
+          f"stub latency {args.latency}s\n")
+    print(f"{'mode':<10}{'wall s':>9}{'bids/s':>9}{'p50 s':>8}{'p95 s':>8}{'errors':>8}  static")
+    for mode in args.modes.split(','):
+        proc = start_backend(mode, args.port, stub_url, args.workers)
+        try:
+            static_ok = all(requests.get(base_url + route, timeout=5).ok for route in STATIC_ROUTES)
+            wall, latencies, errors = run_load(base_url, args.requests, args.concurrency, body)
+        finally:
+            proc.terminate()
+            proc.wait()
+        print(f"{mode:<10}{wall:>9.2f}{args.requests / wall:>9.1f}"
+              f"{statistics.median(latencies):>8.2f}{percentile(latencies, 95):>8.2f}"
+              f"{errors:>8}  {'ok' if static_ok else 'FAIL'}")
+    stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: in-browser Babel pages vs. the precompiled build.
+
+Before the first hand can render, a source page downloads React and
+@babel/standalone, evaluates Babel, compiles its JSX block and parses
+the output. A built page downloads precompressed React plus the bundle
+and only parses the bundle. This script measures that main-thread work
+in V8 (a fresh `node` process per run, so nothing is cached) and the
+bytes each mode transfers. It then models time to first hand on a slow
+device as transfer time + CPU time x slowdown.
+
+No headless browser is needed. The default compiler is the Babel 6
+standalone build that ships with dukpy. Pass --babel with a downloaded
+@babel/standalone babel.min.js to time the compiler the pages really load.
+Babel 6 predates the <></> fragment shorthand and native object spread,
+so for it fragments are rewritten to <React.Fragment> and the spread
+plugin is enabled.
+
+Usage:
+  python build_pages.py && python bench/page_startup.py --runs 5
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+import build_pages
+
+NODE_RUNNER = r'''
+const vm = require('vm');
+const fs = require('fs');
+const job = JSON.parse(fs.readFileSync(process.argv[2], 'utf8'));
+const start = process.hrtime.bigint();
+if (job.mode === 'source') {
+  const context = vm.createContext({});
+  new vm.Script(fs.readFileSync(job.babel, 'utf8')).runInContext(context);
+  context.jsx = fs.readFileSync(job.jsx, 'utf8');
+  const code = vm.runInContext("Babel.transform(jsx, {presets: ['react'], plugins: " + JSON.stringify(job.plugins) + "}).code", context);
+  new vm.Script(code);
+} else {
+  new vm.Script(fs.readFileSync(job.bundle, 'utf8'));
+}
+console.log(Number(process.hrtime.bigint() - start) / 1e6);
+'''
+
+
+def default_babel():
+    import dukpy
+    return os.path.join(os.path.dirname(dukpy.__file__), 'jsmodules', 'babel-6.26.0.min.js')
+
+
+def time_node(job, runs, workdir):
+    """Median milliseconds of `runs` fresh node processes doing `job`."""
+    job_path = os.path.join(workdir, 'job.json')
+    runner = os.path.join(workdir, 'runner.js')
+    with open(runner, 'w') as f:
+        f.write(NODE_RUNNER)
+    with open(job_path, 'w') as f:
+        json.dump(job, f)
+    times = [float(subprocess.check_output(['node', runner, job_path], text=True))
+             for _ in range(runs)]
+    return statistics.median(times)
+
+
+def gzip_size(path):
+    with open(path, 'rb') as f:
+        return len(gzip.compress(f.read(), compresslevel=6))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--babel', help='path to @babel/standalone babel.min.js')
+    parser.add_argument('--dist', default=build_pages.DIST_DIR)
+    parser.add_argument('--mbps', type=float, default=5.0, help='modelled bandwidth')
+    parser.add_argument('--cpu-slowdown', type=float, default=4.0, help='modelled CPU slowdown vs. this machine')
+    args = parser.parse_args()
+
+    if not build_pages.is_current(args.dist):
+        sys.exit(f'{args.dist} is missing or stale: run python build_pages.py first')
+    with open(os.path.join(args.dist, build_pages.MANIFEST)) as f:
+        manifest = json.load(f)
+    babel = args.babel or default_babel()
+    vendor = [os.path.join(ROOT, path) for path in build_pages.VENDOR.values()]
+    built_vendor = [os.path.join(args.dist, manifest['assets'][name].lstrip('/')) for name in build_pages.VENDOR]
+
+    print(f'Compiler: {babel}\nModel: {args.mbps} Mbit/s, CPU x{args.cpu_slowdown}, median of {args.runs} runs\n')
+    print(f"{'page':<8} {'mode':<7} {'JS work':>9} {'transfer':>10} {'modelled first hand':>21}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, page in build_pages.PAGES.items():
+            with open(os.path.join(ROOT, page), encoding='utf-8') as f:
+                source = f.read()
+            jsx = build_pages._BABEL_BLOCK.search(source).group(1)
+            plugins = []
+            if not args.babel:
+                plugins = ['transform-object-rest-spread']
+                jsx = re.sub(r'<>', '<React.Fragment>', re.sub(r'</>', '</React.Fragment>', jsx))
+            jsx_path = os.path.join(workdir, f'{name}.jsx')
+            with open(jsx_path, 'w', encoding='utf-8') as f:
+                f.write(jsx)
+            bundle = os.path.join(args.dist, manifest['assets'][name].lstrip('/'))
+
+            rows = {
+                'source': (
+                    time_node({'mode': 'source', 'babel': babel, 'jsx': jsx_path, 'plugins': plugins}, args.runs, workdir),
+                    len(gzip.compress(source.encode('utf-8'))) + sum(gzip_size(p) for p in vendor + [babel]),
+                ),
+                'built': (
+                    time_node({'mode': 'built', 'bundle': bundle}, args.runs, workdir),
+                    sum(os.path.getsize(p + '.br') for p in built_vendor + [bundle, os.path.join(args.dist, page)]),
+                ),
+            }
+            for mode, (cpu_ms, transfer) in rows.items():
+                modelled = transfer * 8 / (args.mbps * 1e6) * 1000 + cpu_ms * args.cpu_slowdown
+                print(f'{name:<8} {mode:<7} {cpu_ms:>7.0f}ms {transfer / 1024:>8.0f}KB {modelled:>19.0f}ms')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Failover benchmark: bid latency while one provider degrades.
+
+Two in-process stub providers answer in --latency seconds. Partway
+through the run the primary slows to --degraded seconds (or, with
+--errors, fails every call, in 1ms with --fail-fast, the way a bad key
+does). --healthy 0 degrades it before the first call, so the router
+never sees it healthy. The same traffic goes through the primary
+alone and through ProviderRouter([primary, backup]), and the latency
+percentiles of each are printed. With the router, p95 should stay near
+the healthy latency.
+
+Usage:
+  python bench/provider_failover.py --requests 300 --concurrency 8
+  python bench/provider_failover.py --errors
+  python bench/provider_failover.py --errors --fail-fast --healthy 0
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from load_serving import percentile
+from providers import ProviderRouter, StubProvider
+from upstream import UpstreamError
+
+PAYLOAD = {'model': 'stub', 'max_tokens': 300, 'messages': [{'role': 'user', 'content': 'Bid'}]}
+
+
+def run(target, primary, args):
+    """Send the traffic, degrading `primary` after --healthy of it."""
+    degrade_at = max(1, int(args.requests * args.healthy))
+    lock = threading.Lock()
+    sent = [0]
+
+    def one(_):
+        with lock:
+            sent[0] += 1
+            if sent[0] == degrade_at:
+                if args.errors:
+                    primary.error_rate = 1.0
+                    if args.fail_fast:
+                        primary.latency = 0.001
+                else:
+                    primary.latency = args.degraded
+        start = time.perf_counter()
+        try:
+            target.post_json(PAYLOAD, timeout=(1.0, args.timeout))
+            ok = True
+        except UpstreamError:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    return sorted(seconds for seconds, _ in results), sum(not ok for _, ok in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.05, help='healthy provider latency (s)')
+    parser.add_argument('--degraded', type=float, default=1.0, help='degraded primary latency (s)')
+    parser.add_argument('--errors', action='store_true', help='degrade by failing instead of slowing down')
+    parser.add_argument('--fail-fast', action='store_true', help='with --errors, fail in 1ms')
+    parser.add_argument('--healthy', type=float, default=0.3, help='share of traffic before the primary degrades')
+    parser.add_argument('--timeout', type=float, default=2.0, help='read timeout (s)')
+    parser.add_argument('--failover-timeout', type=float, default=0.25, help="router's timeout before failing over (s)")
+    args = parser.parse_args()
+
+    print(f"{'setup':<18} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+    for name in ('primary only', 'router'):
+        primary = StubProvider('primary', latency=args.latency, seed=1)
+        backup = StubProvider('backup', latency=args.latency * 1.2, seed=2)
+        if name == 'router':
+            target = ProviderRouter([primary, backup], failover_timeout=(1.0, args.failover_timeout))
+        else:
+            target = primary
+        latencies, errors = run(target, primary, args)
+        print(f'{name:<18} {1000 * percentile(latencies, 50):>6.0f}ms {1000 * percentile(latencies, 95):>6.0f}ms '
+              f'{1000 * percentile(latencies, 99):>6.0f}ms {errors:>7}')
+        if name == 'router':
+            stats = target.stats()
+            print(f"  failovers {stats['failovers']}, probes {stats['probes']}, calls "
+                  + ', '.join(f"{n} {p['routing']['calls']}" for n, p in stats['providers'].items()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Stub of the Anthropic Messages API for local load tests.
+
+Every POST sleeps for the configured latency and answers with a canned
+bid, so the backend can be exercised without an API key or token spend.
+Requests with "stream": true get the same reply as Server-Sent Events,
+with the text deltas spread evenly over the latency the way a real model
+generates tokens.
+
+Latency is `latency` seconds, plus or minus up to `jitter` seconds, or
+with --sigma a lognormal around a median of `latency`: sigma 0.5 puts
+p99 at about 3.2x the median, like a model API under load. A fraction
+--error-rate of calls answer --error-status (529, "overloaded", by
+default) after the latency instead. --seed makes the draws repeatable.
+
+Usage:
+  python bench/stub_upstream.py --port 8089 --latency 1.0
+  python bench/stub_upstream.py --latency 0.8 --sigma 0.5 --error-rate 0.02
+
+Then start the backend with:
+  ANTHROPIC_API_URL=http://127.0.0.1:8089/v1/messages ANTHROPIC_API_KEY=stub ...
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_TEXT = '{"bid": "Pass", "reasoning": "Stub upstream always passes"}'
+STREAM_CHUNK = 8  # characters per streamed text delta
+
+
+def make_message(model, text=CANNED_TEXT):
+    """Build a Messages API response body."""
+    return {
+        'id': 'msg_stub',
+        'type': 'message',
+        'role': 'assistant',
+        'model': model,
+        'content': [{'type': 'text', 'text': text}],
+        'stop_reason': 'end_turn',
+        'usage': {'input_tokens': 0, 'output_tokens': len(text) // 4},
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 1.0
+    jitter = 0.0
+    sigma = 0.0
+    error_rate = 0.0
+    error_status = 529
+    rng = random.Random()
+    lock = threading.Lock()
+    counts = None  # {'requests', 'errors'}, shared by the server's handlers
+
+    def draw(self):
+        """(latency, fail) for one call."""
+        with self.lock:
+            if self.sigma:
+                latency = self.latency * math.exp(self.rng.gauss(0.0, self.sigma))
+            else:
+                latency = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+            fail = self.rng.random() < self.error_rate
+            self.counts['requests'] += 1
+            self.counts['errors'] += fail
+        return latency, fail
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        latency, fail = self.draw()
+        if fail:
+            return self._error(latency)
+        if request.get('stream'):
+            return self._stream(request, latency)
+        time.sleep(latency)
+
+        body = make_message(request.get('model', 'stub'))
+        body['usage']['input_tokens'] = len(json.dumps(request.get('messages', []))) // 4
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, latency):
+        time.sleep(latency)
+        payload = json.dumps({'type': 'error', 'error': {'type': 'overloaded_error', 'message': 'Stub failure'}}).encode()
+        self.send_response(self.error_status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, request, latency):
+        """Send the canned reply as SSE deltas spread over `latency` seconds."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def send(event, data):
+            chunk = f'event: {event}\ndata: {json.dumps(dict(data, type=event))}\n\n'.encode()
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.flush()
+
+        message = make_message(request.get('model', 'stub'), text='')
+        send('message_start', {'message': message})
+        send('content_block_start', {'index': 0, 'content_block': {'type': 'text', 'text': ''}})
+        pieces = [CANNED_TEXT[i:i + STREAM_CHUNK] for i in range(0, len(CANNED_TEXT), STREAM_CHUNK)]
+        for piece in pieces:
+            time.sleep(latency / len(pieces))
+            send('content_block_delta', {'index': 0, 'delta': {'type': 'text_delta', 'text': piece}})
+        send('content_block_stop', {'index': 0})
+        send('message_delta', {'delta': {'stop_reason': 'end_turn'}})
+        send('message_stop', {})
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def start_stub(port=0, latency=1.0, jitter=0.0, sigma=0.0, error_rate=0.0, error_status=529, seed=None):
+    """Start the stub in a background thread and return the server; `server.counts` tallies calls."""
+    counts = {'requests': 0, 'errors': 0}
+    handler = type('ConfiguredStubHandler', (StubHandler,), {
+        'latency': latency, 'jitter': jitter, 'sigma': sigma, 'error_rate': error_rate,
+        'error_status': error_status, 'rng': random.Random(seed), 'lock': threading.Lock(), 'counts': counts,
+    })
+    server = StubServer(('127.0.0.1', port), handler)
+    server.counts = counts
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=1.0, help='seconds per response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='+/- seconds of uniform jitter')
+    parser.add_argument('--sigma', type=float, default=0.0, help='lognormal shape; latency becomes the median')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of calls that fail')
+    parser.add_argument('--error-status', type=int, default=529)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    server = start_stub(args.port, args.latency, args.jitter, args.sigma, args.error_rate, args.error_status,
+                        args.seed)
+    spread = f'lognormal sigma {args.sigma}' if args.sigma else f'+/- {args.jitter}s'
+    print(f"Stub upstream on http://127.0.0.1:{server.server_port}/v1/messages "
+          f"(latency {args.latency}s {spread}, {args.error_rate:.0%} errors)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: throughput, latency, errors and memory for each serving
+mode under each traffic profile, saved as JSON to compare versions.
+
+Starts the stub upstream (bench/stub_upstream.py) with the configured
+latency distribution and error rate. Then, for each mode, it boots
+`gunicorn slam-backend:app -c gunicorn.conf.py`. For each profile it runs
+--users virtual users for --duration seconds. Each user plays sessions
+back to back, with exponential think time between the user's own calls:
+
+- single: a Single Decision drill. Load /single and a page of scenarios,
+  then ask for the legal calls at each of --decisions scenarios. Nothing
+  goes upstream.
+- full: a Full Auction deal. Load /full and the scenarios. Play the AI
+  seats over /api/auction/advance (as Server-Sent Events, like the page)
+  and make the user's calls until the auction ends: the scenario's answer
+  first, then passes. Finally score the contract.
+- bid: one structured /api/bid per session, for the seat after the
+  scenario's opening. The rules engine answers some of these calls; the
+  rest go upstream.
+
+The bid cache, the auction tree and the per-client rate limit are off
+by default so every AI call reaches the stub; --env KEY=VALUE overrides
+any backend setting.
+
+Each run reports:
+- requests and sessions per second;
+- p50/p95/p99 latency per endpoint and overall;
+- the error rate;
+- the workers' resident memory: idle, peak and at the end.
+
+Results go to --out. --compare OLD exits 1 when a matching run regressed
+by more than --tolerance. With --against NEW it compares two result
+files without running anything.
+
+Usage:
+  python bench/suite.py --out results.json
+  python bench/suite.py --modes async --profiles full --users 100 --sigma 0.5 --error-rate 0.02
+  python bench/suite.py --compare main.json --against branch.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from load_serving import ROOT, percentile, start_backend
+from stub_upstream import start_stub
+
+sys.path.insert(0, ROOT)
+from auction import Auction
+from scenarios import ScenarioStore
+
+RESULTS_VERSION = 1
+
+# Settings that would answer AI calls without the upstream, or refuse a
+# load generator's traffic as one abusive client
+BACKEND_ENV = {
+    'BID_CACHE_MAX_ENTRIES': '0',
+    'AUCTION_TREE_PATH': '',
+    'CLIENT_RATE_LIMIT': '0',
+}
+
+# Regressions: (metric, which way is better). Error rates compare in
+# absolute points, everything else relative to the old value.
+COMPARED = [('throughput_rps', 'higher'), ('p95_ms', 'lower'), ('p99_ms', 'lower'),
+            ('error_rate', 'lower'), ('peak_rss_mb', 'lower')]
+ERROR_RATE_SLACK = 0.01
+
+
+class Client:
+    """One virtual user's connection, recording (endpoint, seconds, ok) per request."""
+
+    def __init__(self, base_url, samples):
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.samples = samples
+
+    def request(self, endpoint, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=120, **kwargs)
+            ok = response.ok
+        except requests.exceptions.RequestException:
+            response, ok = None, False
+        self.samples.append((endpoint, time.perf_counter() - start, ok))
+        return response if ok else None
+
+    def events(self, endpoint, path, body):
+        """POST for Server-Sent Events; the (event, data) pairs, or None on an error."""
+        start = time.perf_counter()
+        events = []
+        try:
+            with self.session.post(self.base_url + path, json=body, stream=True, timeout=120,
+                                   headers={'Accept': 'text/event-stream'}) as response:
+                ok = response.ok
+                event = None
+                for line in response.iter_lines(decode_unicode=True) if ok else ():
+                    if line.startswith('event: '):
+                        event = line[7:]
+                    elif line.startswith('data: '):
+                        events.append((event, json.loads(line[6:])))
+            ok = ok and bool(events) and events[-1][0] == 'done'
+        except (requests.exceptions.RequestException, ValueError):
+            ok = False
+        self.samples.append((endpoint, time.perf_counter() - start, ok))
+        return events if ok else None
+
+
+def think(rng, seconds):
+    if seconds > 0:
+        time.sleep(rng.expovariate(1 / seconds))
+
+
+def single_session(client, rng, options):
+    client.request('page', 'GET', '/single')
+    listing = client.request('scenarios', 'GET', '/api/scenarios?set=single')
+    if listing is None:
+        return
+    for scenario in rng.sample(listing.json()['scenarios'], options.decisions):
+        turn = next((i for i, entry in enumerate(scenario['auction']) if entry['bid'] == '?'), None)
+        if turn is None:
+            continue
+        body = {'auction': [{'seat': e['seat'], 'bid': e['bid']} for e in scenario['auction'][:turn]],
+                'seat': scenario['auction'][turn]['seat']}
+        client.request('auction_legal', 'POST', '/api/auction/legal', json=body)
+        think(rng, options.think)
+
+
+def full_session(client, rng, options):
+    client.request('page', 'GET', '/full')
+    if client.request('scenarios', 'GET', '/api/scenarios?set=full') is None:
+        return
+    scenario = rng.choice(options.full_scenarios)
+    user = scenario['your_seat']
+    packed = Auction(scenario['dealer'])
+    if scenario.get('opening_bid'):
+        packed.add(scenario['opening_bid'])
+    answer = scenario['correct_first_bid']
+    while not packed.complete:
+        if packed.next_seat() != user:
+            events = client.events('auction_advance', '/api/auction/advance',
+                                   {'scenario_id': scenario['id'], 'user_seat': user, 'auction': packed.to_list()})
+            if events is None:
+                return
+            for event, data in events:
+                if event == 'call':
+                    packed.add(data['bid'], data['seat'])
+            continue
+        client.request('auction_legal', 'POST', '/api/auction/legal', json={'auction': packed.to_list(), 'seat': user})
+        think(rng, options.think)
+        packed.add(answer if answer and packed.is_legal(answer) else 'Pass')
+        answer = None
+    client.request('contract_score', 'POST', '/api/contract/score',
+                   json={'scenario_id': scenario['id'], 'auction': packed.to_list()})
+
+
+def bid_session(client, rng, options):
+    scenario = rng.choice(options.full_scenarios)
+    auction = [{'seat': scenario['dealer'], 'bid': scenario['opening_bid']}] if scenario.get('opening_bid') else []
+    seat = Auction.from_list(auction).next_seat() if auction else scenario['dealer']
+    client.request('bid', 'POST', '/api/bid', json={'scenario_id': scenario['id'], 'seat': seat, 'auction': auction})
+    think(rng, options.think)
+
+
+PROFILES = {'single': single_session, 'full': full_session, 'bid': bid_session}
+
+
+def process_rss(master_pid):
+    """Resident megabytes of gunicorn's workers (the master's children)."""
+    try:
+        with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+            pids = [int(pid) for pid in f.read().split()]
+    except OSError:
+        return 0.0
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+        except (OSError, StopIteration):
+            pass
+    return total / 1024
+
+
+class MemorySampler(threading.Thread):
+    """Peak worker RSS, sampled every `interval` seconds until stopped."""
+
+    def __init__(self, master_pid, interval=0.25):
+        super().__init__(daemon=True)
+        self.master_pid = master_pid
+        self.interval = interval
+        self.peak = 0.0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.peak = max(self.peak, process_rss(self.master_pid))
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.peak = max(self.peak, process_rss(self.master_pid))
+
+
+def latency_summary(seconds):
+    ordered = sorted(seconds)
+    if not ordered:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'mean_ms': None}
+    return {
+        'p50_ms': round(1000 * percentile(ordered, 50), 2),
+        'p95_ms': round(1000 * percentile(ordered, 95), 2),
+        'p99_ms': round(1000 * percentile(ordered, 99), 2),
+        'mean_ms': round(1000 * statistics.fmean(ordered), 2),
+    }
+
+
+def run_profile(base_url, profile, options, seed):
+    """Drive `options.users` users through `profile` sessions for `options.duration` seconds."""
+    samples = []
+    sessions = []
+    stop_at = time.perf_counter() + options.duration
+
+    def user(index):
+        rng = random.Random(seed * 100003 + index)
+        client = Client(base_url, samples)
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            PROFILES[profile](client, rng, options)
+            sessions.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options.users) as pool:
+        list(pool.map(user, range(options.users)))
+    return samples, sessions, time.perf_counter() - start
+
+
+def summarize(mode, profile, samples, sessions, wall, memory, upstream):
+    errors = sum(1 for _, _, ok in samples if not ok)
+    endpoints = {}
+    for name in sorted({name for name, _, _ in samples}):
+        mine = [(seconds, ok) for endpoint, seconds, ok in samples if endpoint == name]
+        endpoints[name] = dict(requests=len(mine), errors=sum(1 for _, ok in mine if not ok),
+                               **latency_summary([seconds for seconds, _ in mine]))
+    return dict(
+        mode=mode,
+        profile=profile,
+        wall_s=round(wall, 2),
+        requests=len(samples),
+        sessions=len(sessions),
+        throughput_rps=round(len(samples) / wall, 2),
+        sessions_per_s=round(len(sessions) / wall, 3),
+        errors=errors,
+        error_rate=round(errors / len(samples), 4) if samples else 0.0,
+        **latency_summary([seconds for _, seconds, _ in samples]),
+        session_p50_s=round(percentile(sorted(sessions), 50), 3) if sessions else None,
+        endpoints=endpoints,
+        idle_rss_mb=round(memory[0], 1),
+        peak_rss_mb=round(memory[1], 1),
+        end_rss_mb=round(memory[2], 1),
+        upstream_requests=upstream[0],
+        upstream_errors=upstream[1],
+    )
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision + ('-dirty' if dirty else '')
+
+
+def compare(old, new, tolerance):
+    """Print matching runs side by side; return the regressions as strings."""
+    before = {(run['mode'], run['profile']): run for run in old['runs']}
+    regressions = []
+    print(f"\nagainst {old.get('git') or 'baseline'} ({old.get('started', '?')})")
+    print(f"{'mode':<9}{'profile':<8}{'metric':<16}{'old':>11}{'new':>11}{'change':>9}")
+    for run in new['runs']:
+        key = (run['mode'], run['profile'])
+        if key not in before:
+            continue
+        for metric, better in COMPARED:
+            was, now = before[key].get(metric), run.get(metric)
+            if was is None or now is None:
+                continue
+            if metric == 'error_rate':
+                change = f'{100 * (now - was):+.1f}pt'
+                worse = now - was > ERROR_RATE_SLACK
+            else:
+                ratio = now / was - 1 if was else 0.0
+                change = f'{100 * ratio:+.0f}%'
+                worse = ratio < -tolerance if better == 'higher' else ratio > tolerance
+            flag = '  REGRESSED' if worse else ''
+            print(f'{key[0]:<9}{key[1]:<8}{metric:<16}{was:>11}{now:>11}{change:>9}{flag}')
+            if worse:
+                regressions.append(f'{key[0]}/{key[1]} {metric} {was} -> {now}')
+    return regressions
+
+
+def print_run(run):
+    print(f"{run['mode']:<9}{run['profile']:<8}{run['throughput_rps']:>9.1f}{run['sessions_per_s']:>9.2f}"
+          f"{run['p50_ms']:>9.0f}{run['p95_ms']:>9.0f}{run['p99_ms']:>9.0f}{100 * run['error_rate']:>8.1f}%"
+          f"{run['peak_rss_mb']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='sync,threaded,async', help='comma-separated SLAM_SERVING_MODE values')
+    parser.add_argument('--profiles', default='single,full,bid', help=f"comma-separated: {', '.join(PROFILES)}")
+    parser.add_argument('--users', type=int, default=50, help='concurrent virtual users per run')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds per run')
+    parser.add_argument('--think', type=float, default=0.5, help="mean seconds before each of the user's calls")
+    parser.add_argument('--decisions', type=int, default=5, help='scenarios per single-decision session')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.5, help='stub upstream seconds per call (median)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='+/- seconds of uniform jitter')
+    parser.add_argument('--sigma', type=float, default=0.0, help='lognormal latency shape instead of jitter')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of upstream calls that fail')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE', help='backend setting')
+    parser.add_argument('--port', type=int, default=5079)
+    parser.add_argument('--out', help='write the results here as JSON')
+    parser.add_argument('--compare', metavar='OLD', help='results file to compare against')
+    parser.add_argument('--against', metavar='NEW', help='with --compare: compare this file instead of running')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='relative change counted as a regression')
+    args = parser.parse_args()
+
+    if args.against:
+        if not args.compare:
+            parser.error('--against needs --compare')
+        with open(args.compare) as f, open(args.against) as g:
+            regressions = compare(json.load(f), json.load(g), args.tolerance)
+        print('\n' + ('\n'.join(regressions) if regressions else 'No regressions'))
+        return 1 if regressions else 0
+
+    profiles = [name for name in args.profiles.split(',') if name]
+    unknown = set(profiles) - set(PROFILES)
+    if unknown:
+        parser.error(f'Unknown profiles: {", ".join(sorted(unknown))}')
+    # Deals the double-dummy scorer can answer from stored tricks, so
+    # scoring measures the endpoint rather than the solver
+    args.full_scenarios = [s for s in ScenarioStore().scenarios('full') if s.get('dd_tricks')]
+    backend_env = dict(BACKEND_ENV, **dict(setting.split('=', 1) for setting in args.env))
+
+    stub = start_stub(latency=args.latency, jitter=args.jitter, sigma=args.sigma, error_rate=args.error_rate,
+                      seed=args.seed)
+    stub_url = f'http://127.0.0.1:{stub.server_port}/v1/messages'
+    base_url = f'http://127.0.0.1:{args.port}'
+    results = {
+        'version': RESULTS_VERSION,
+        'started': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'git': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'config': {key: value for key, value in vars(args).items()
+                   if key not in ('out', 'compare', 'against', 'full_scenarios')},
+        'backend_env': backend_env,
+        'runs': [],
+    }
+
+    print(f"{args.users} users x {args.duration:.0f}s per run, {args.workers} workers, stub latency "
+          f"{args.latency}s{f' sigma {args.sigma}' if args.sigma else ''}, {args.error_rate:.0%} upstream errors\n")
+    print(f"{'mode':<9}{'profile':<8}{'req/s':>9}{'sess/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'errors':>9}{'peak MB':>10}")
+    try:
+        for mode in args.modes.split(','):
+            proc = start_backend(mode, args.port, stub_url, args.workers, backend_env)
+            try:
+                for profile in profiles:
+                    # One session first, so imports and pools are warm
+                    PROFILES[profile](Client(base_url, []), random.Random(0), argparse.Namespace(
+                        **dict(vars(args), think=0)))
+                    idle = process_rss(proc.pid)
+                    upstream_before = dict(stub.counts)
+                    sampler = MemorySampler(proc.pid)
+                    sampler.start()
+                    samples, sessions, wall = run_profile(base_url, profile, args, args.seed)
+                    sampler.stop()
+                    upstream = (stub.counts['requests'] - upstream_before['requests'],
+                                stub.counts['errors'] - upstream_before['errors'])
+                    run = summarize(mode, profile, samples, sessions, wall,
+                                    (idle, sampler.peak, process_rss(proc.pid)), upstream)
+                    results['runs'].append(run)
+                    print_run(run)
+            finally:
+                proc.terminate()
+                proc.wait()
+    finally:
+        stub.shutdown()
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        print(f'\nResults written to {args.out}')
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        print('\n' + ('\n'.join(regressions) if regressions else 'No regressions'))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Load test: thousands of WebSocket auction tables on one worker.
+
+Boots `gunicorn slam-backend:app -c gunicorn.conf.py` (async mode, one
+worker, the in-process stub provider) and opens --idle tables that sit
+after their first round, plus --active tables that keep bidding: each
+sends the user's call, waits for the AI seats and starts a new deal when
+the auction ends. Optionally --observers watch one more table through a
+round of bidding.
+
+Reports the worker's resident memory per open table (connection and
+session together) and the turn latency of the active tables.
+
+Usage:
+  python bench/table_sessions.py --idle 2000 --active 200 --duration 20
+"""
+
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+
+import gevent
+import requests
+from simple_websocket import Client
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from load_serving import percentile, start_backend
+
+
+def worker_rss(master_pid):
+    """Resident bytes of the gunicorn worker (the master's only child)."""
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+        worker = int(f.read().split()[0])
+    with open(f'/proc/{worker}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def until(ws, kind):
+    """Receive messages up to the first of type `kind`; returns the last."""
+    while True:
+        message = json.loads(ws.receive(timeout=60))
+        if message['type'] in (kind, 'error'):
+            return message
+
+
+def open_table(url, scenario_id):
+    ws = Client.connect(url)
+    ws.send(json.dumps({'type': 'start', 'scenario_id': scenario_id}))
+    session = until(ws, 'session')
+    done = until(ws, 'done')
+    return ws, session, done
+
+
+def active_table(url, scenario_id, stop_at, turns):
+    """Bid Pass on every turn until `stop_at`, recording each turn's latency."""
+    ws, _, done = open_table(url, scenario_id)
+    while time.time() < stop_at:
+        start = time.perf_counter()
+        if done.get('complete') or done['type'] == 'error':
+            ws.send(json.dumps({'type': 'start', 'scenario_id': scenario_id}))
+        else:
+            ws.send(json.dumps({'type': 'call', 'bid': 'Pass'}))
+        done = until(ws, 'done')
+        turns.append(time.perf_counter() - start)
+    ws.close()
+
+
+def observer(url, session_id, received):
+    ws = Client.connect(url)
+    ws.send(json.dumps({'type': 'watch', 'session_id': session_id}))
+    try:
+        while True:
+            message = json.loads(ws.receive(timeout=60))
+            received.append(message['type'])
+            if message['type'] == 'closed':
+                break
+    except Exception:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--idle', type=int, default=2000, help='tables opened and left waiting')
+    parser.add_argument('--active', type=int, default=200, help='tables bidding continuously')
+    parser.add_argument('--observers', type=int, default=0, help='observers of one more table')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds the active tables bid')
+    parser.add_argument('--latency', type=float, default=0.2, help='stub provider seconds per call')
+    parser.add_argument('--scenario', default='U01')
+    parser.add_argument('--port', type=int, default=5078)
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    proc = start_backend('async', args.port, '', 1, {
+        'LLM_PROVIDERS': 'stub',
+        'STUB_LATENCY': str(args.latency),
+        'CLIENT_RATE_LIMIT': '0',
+        'AUCTION_TREE_PATH': '',
+        'BID_CACHE_MAX_ENTRIES': '0',
+        'SESSION_MAX': str(args.idle + args.active + 100),
+        'WORKER_CONNECTIONS': str(args.idle + args.active + args.observers + 100),
+    })
+    base_url = f'http://127.0.0.1:{args.port}'
+    url = f'ws://127.0.0.1:{args.port}/ws/table'
+    try:
+        open_table(url, args.scenario)[0].close()  # warm up imports and the stub
+        before = worker_rss(proc.pid)
+
+        start = time.perf_counter()
+        idle = [gevent.spawn(open_table, url, args.scenario) for _ in range(args.idle)]
+        gevent.joinall(idle)
+        sockets = [job.value[0] for job in idle if job.successful()]
+        opened = time.perf_counter() - start
+        after_idle = worker_rss(proc.pid)
+        per_table = (after_idle - before) / max(1, len(sockets))
+        print(f'{len(sockets)} idle tables opened in {opened:.1f}s')
+        print(f'worker RSS {before / 2**20:.1f} MiB -> {after_idle / 2**20:.1f} MiB, '
+              f'{per_table / 1024:.1f} KiB per open table')
+
+        turns, received = [], []
+        stop_at = time.time() + args.duration
+        active = [gevent.spawn(active_table, url, args.scenario, stop_at, turns) for _ in range(args.active)]
+        if args.observers:
+            owner, session, _ = open_table(url, args.scenario)
+            watchers = [gevent.spawn(observer, url, session['session_id'], received) for _ in range(args.observers)]
+            gevent.sleep(1.0)
+            owner.send(json.dumps({'type': 'call', 'bid': 'Pass'}))
+            until(owner, 'done')
+            owner.close()
+            gevent.joinall(watchers, timeout=30)
+        gevent.joinall(active)
+        peak = worker_rss(proc.pid)
+
+        turns.sort()
+        if turns:
+            print(f'{args.active} active tables: {len(turns)} turns in {args.duration:.0f}s '
+                  f'({len(turns) / args.duration:.0f}/s), p50 {1000 * percentile(turns, 50):.0f}ms, '
+                  f'p95 {1000 * percentile(turns, 95):.0f}ms, p99 {1000 * percentile(turns, 99):.0f}ms')
+        if args.observers:
+            print(f"{args.observers} observers received {received.count('call')} calls "
+                  f"({received.count('call') // args.observers} each)")
+        stats = requests.get(base_url + '/health', timeout=10).json()['sessions']
+        print(f"worker RSS at the end {peak / 2**20:.1f} MiB; sessions {stats['sessions']}, "
+              f"session state {stats['bytes'] / max(1, stats['sessions']):.0f} bytes per table")
+        for ws in sockets:
+            ws.close()
+    finally:
+        proc.terminate()
+        proc.wait()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Response cache for deterministic bid prompts.
+
+Scenario prompts are byte-identical for every user who replays the same
+deal, so upstream answers are cached under a hash of the normalized
+prompt plus model. Two tiers:
+
+- memory: LRU with a TTL, bounded by entry count and total bytes
+- disk (optional): SQLite file shared by all workers and kept across restarts
+
+Disk hits are promoted into memory. Expired disk rows are deleted every
+`purge_every` sets. Counters are exposed through stats().
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r'[ \t]+')
+
+
+def normalize_prompt(prompt):
+    """Collapse insignificant whitespace so cosmetic differences share a key."""
+    lines = prompt.replace('\r\n', '\n').split('\n')
+    return '\n'.join(_WHITESPACE.sub(' ', line).strip() for line in lines).strip()
+
+
+def cache_key(prompt, model, **params):
+    """Stable hash of the normalized prompt, model and any generation params."""
+    h = hashlib.sha256()
+    h.update(model.encode())
+    for name in sorted(params):
+        h.update(f'\x00{name}={params[name]}'.encode())
+    h.update(b'\x00')
+    h.update(normalize_prompt(prompt).encode())
+    return h.hexdigest()
+
+
+class BidCache:
+    """Two-tier TTL cache of JSON-serializable upstream responses."""
+
+    def __init__(self, ttl=86400.0, max_entries=10000, max_bytes=32 * 1024 * 1024,
+                 db_path=None, purge_every=1000, clock=time.time):
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self.counters = {
+            'hits_memory': 0,
+            'hits_disk': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions_lru': 0,
+            'evictions_ttl': 0,
+            'purged_disk': 0,
+        }
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS bid_cache ('
+                ' key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)'
+            )
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, key):
+        """Return the cached value or None."""
+        if not self.enabled:
+            return None
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.counters['hits_memory'] += 1
+                    return entry[2]
+                self._drop(key)
+                self.counters['evictions_ttl'] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT expires_at, value FROM bid_cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row and row[0] > now:
+                    value = json.loads(row[1])
+                    self._store(key, value, row[0], len(row[1]))
+                    self.counters['hits_disk'] += 1
+                    return value
+
+            self.counters['misses'] += 1
+            return None
+
+    def set(self, key, value):
+        """Cache a JSON-serializable value in both tiers."""
+        if not self.enabled:
+            return
+        encoded = json.dumps(value, separators=(',', ':'))
+        expires_at = self._clock() + self.ttl
+        with self._lock:
+            self.counters['sets'] += 1
+            self._store(key, value, expires_at, len(encoded))
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO bid_cache (key, expires_at, value) VALUES (?, ?, ?)',
+                    (key, expires_at, encoded),
+                )
+            purge = self.purge_every > 0 and self.counters['sets'] % self.purge_every == 0
+        if purge:
+            self.purge_expired()
+
+    def _store(self, key, value, expires_at, size):
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (expires_at, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.counters['evictions_lru'] += 1
+
+    def _drop(self, key):
+        expires_at, size, value = self._entries.pop(key)
+        self._bytes -= size
+
+    def purge_expired(self):
+        """Drop expired entries from both tiers."""
+        now = self._clock()
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e[0] <= now]:
+                self._drop(key)
+                self.counters['evictions_ttl'] += 1
+            if self._db is not None:
+                deleted = self._db.execute('DELETE FROM bid_cache WHERE expires_at <= ?', (now,)).rowcount
+                self.counters['purged_disk'] += max(deleted, 0)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+            stats['disk'] = self._db is not None
+            lookups = stats['hits_memory'] + stats['hits_disk'] + stats['misses']
+            stats['hit_rate'] = round((stats['hits_memory'] + stats['hits_disk']) / lookups, 3) if lookups else 0.0
+            return stats
@@ -0,0 +1,199 @@
+"""
+Parsing, normalization and legality checks for LLM bid output.
+
+Models answer with JSON such as {"bid": "2♥", "reasoning": "..."}, often
+wrapped in code fences or prose and with suit symbols or words instead of
+letters. parse_bid() turns a reply into a canonical call ('Pass', 'X',
+'XX', '1C' ... '7NT'). validate_bid() also checks the call is legal in
+the auction. When it is not, repair_request() builds a short follow-up
+request instead of resending the whole prompt. StreamingBidParser does
+the same incrementally for streamed replies, so the bid can be released
+before the reasoning has finished generating.
+"""
+
+import json
+import re
+import threading
+
+from auction import ALL_CALLS, legal_calls
+from hand_eval import suit_cards
+from hand_eval import hcp as hand_hcp
+
+_FENCE = re.compile(r'```(?:json)?')
+_OBJECT = re.compile(r'\{[^{}]*"bid"[^{}]*\}', re.S)
+_BID_FIELD = re.compile(r'"bid"\s*:\s*"([^"]*)"')
+_REASONING_FIELD = re.compile(r'"reasoning"\s*:\s*"((?:[^"\\]|\\.)*)')
+
+_SYMBOLS = {'♣': 'C', '♦': 'D', '♥': 'H', '♠': 'S'}
+_WORDS = {
+    'PASS': 'Pass', 'P': 'Pass', 'NO BID': 'Pass', 'NOBID': 'Pass',
+    'X': 'X', 'D': 'X', 'DBL': 'X', 'DOUBLE': 'X',
+    'XX': 'XX', 'RDBL': 'XX', 'REDOUBLE': 'XX',
+}
+_STRAIN_WORDS = [
+    ('NOTRUMPS', 'NT'), ('NOTRUMP', 'NT'), ('NO TRUMPS', 'NT'), ('NO TRUMP', 'NT'),
+    ('CLUBS', 'C'), ('CLUB', 'C'), ('DIAMONDS', 'D'), ('DIAMOND', 'D'),
+    ('HEARTS', 'H'), ('HEART', 'H'), ('SPADES', 'S'), ('SPADE', 'S'),
+]
+_CONTRACT = re.compile(r'^([1-7])(C|D|H|S|NT|N)$')
+
+
+def normalize_call(raw):
+    """Canonical call for a model's bid string, or None if unrecognisable."""
+    if not isinstance(raw, str):
+        return None
+    text = raw.strip().upper()
+    for symbol, letter in _SYMBOLS.items():
+        text = text.replace(symbol, letter)
+    if text in _WORDS:
+        return _WORDS[text]
+    for word, strain in _STRAIN_WORDS:
+        text = text.replace(word, strain)
+    text = text.replace(' ', '').replace('-', '')
+    match = _CONTRACT.match(text)
+    if not match:
+        return None
+    strain = 'NT' if match.group(2) == 'N' else match.group(2)
+    return match.group(1) + strain
+
+
+def extract_text(message):
+    """First text block of a Messages API reply."""
+    for block in message.get('content') or []:
+        if block.get('type') == 'text':
+            return block.get('text', '')
+    return ''
+
+
+def parse_bid(text):
+    """
+    Parse a model reply into (call, reasoning).
+
+    call is None when no recognisable bid could be found.
+    """
+    clean = _FENCE.sub('', text or '').strip()
+    data = None
+    try:
+        data = json.loads(clean)
+    except ValueError:
+        match = _OBJECT.search(clean)
+        if match:
+            try:
+                data = json.loads(match.group(0))
+            except ValueError:
+                data = None
+    if isinstance(data, dict):
+        return normalize_call(data.get('bid')), str(data.get('reasoning', ''))
+
+    # Truncated or malformed JSON: fall back to the fields we can see
+    bid = _BID_FIELD.search(clean)
+    reasoning = _REASONING_FIELD.search(clean)
+    return (normalize_call(bid.group(1)) if bid else None,
+            reasoning.group(1) if reasoning else '')
+
+
+def validate_bid(text, seat, auction):
+    """
+    Parse and check a reply against the auction.
+
+    Returns (call, reasoning, problem). problem is None for a legal call,
+    otherwise 'unparseable' or 'illegal'.
+    """
+    call, reasoning = parse_bid(text)
+    if call is None or call not in ALL_CALLS:
+        return None, reasoning, 'unparseable'
+    if call not in legal_calls(seat, auction):
+        return call, reasoning, 'illegal'
+    return call, reasoning, None
+
+
+def repair_request(payload, bad_text, problem, seat, hand, auction):
+    """
+    A short follow-up request after an unusable reply.
+
+    Keeps the (cached) system prefix but replaces the full prompt with a
+    compact restatement: the hand, the last call and the legal calls.
+    """
+    legal = legal_calls(seat, auction)
+    last = auction[-1] if auction else None
+    cards = ', '.join(f"{s} {''.join(suit_cards(hand.get(s, ''))) or '-'}" for s in 'SHDC')
+    why = 'could not be parsed' if problem == 'unparseable' else 'is not a legal call here'
+    message = (
+        f'Your previous reply {bad_text.strip()[:80]!r} {why}.\n'
+        f'You are {seat}. Hand: {cards} ({hand_hcp(hand)} HCP).\n'
+        f"Last call: {last['seat'] + ' ' + last['bid'] if last else 'none'}.\n"
+        f"Legal calls: {', '.join(legal[:12])}{' ...' if len(legal) > 12 else ''}\n"
+        'Reply with ONLY: {"bid": "<legal call>", "reasoning": "<one sentence>"}'
+    )
+    repaired = {key: value for key, value in payload.items() if key != 'messages'}
+    repaired['max_tokens'] = min(payload.get('max_tokens', 300), 120)
+    repaired['messages'] = [{'role': 'user', 'content': message}]
+    return repaired
+
+
+class StreamingBidParser:
+    """
+    Pull the bid and reasoning out of a reply as it streams in.
+
+    feed() returns new events: ('bid', call) once, as soon as a legal bid
+    field is complete, and ('reasoning', text) for each new piece of the
+    reasoning string.
+    """
+
+    def __init__(self, seat, auction):
+        self.seat = seat
+        self.auction = auction
+        self.text = ''
+        self.bid = None
+        self.reasoning = ''
+        self._bid_checked = False
+
+    def feed(self, delta):
+        self.text += delta
+        events = []
+        if not self._bid_checked:
+            match = _BID_FIELD.search(self.text)
+            if match:
+                self._bid_checked = True
+                call = normalize_call(match.group(1))
+                if call is not None and call in legal_calls(self.seat, self.auction):
+                    self.bid = call
+                    events.append(('bid', call))
+
+        match = _REASONING_FIELD.search(self.text)
+        if match:
+            try:
+                reasoning = json.loads(f'"{match.group(1)}"', strict=False)
+            except ValueError:
+                reasoning = None  # a split escape sequence; wait for more text
+            if reasoning is not None and len(reasoning) > len(self.reasoning):
+                events.append(('reasoning', reasoning[len(self.reasoning):]))
+                self.reasoning = reasoning
+        return events
+
+
+class OutputStats:
+    """Per-model counts of parse failures, illegal bids and repairs."""
+
+    FIELDS = ('replies', 'parse_failures', 'illegal_bids', 'repaired', 'repair_failed')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def record(self, model, field):
+        with self._lock:
+            counts = self._models.setdefault(model, dict.fromkeys(self.FIELDS, 0))
+            counts[field] += 1
+
+    def stats(self):
+        with self._lock:
+            result = {}
+            for model, counts in self._models.items():
+                replies = counts['replies'] or 1
+                result[model] = dict(
+                    counts,
+                    parse_failure_rate=round(counts['parse_failures'] / replies, 3),
+                    illegal_rate=round(counts['illegal_bids'] / replies, 3),
+                )
+            return result
@@ -0,0 +1,122 @@
+"""
+Rule-based bidding for forced and conventional calls.
+
+Many AI calls in the full-auction scenarios are not judgment calls at all:
+replying to partner's Stayman, completing a Jacoby transfer, or passing
+with a hand too weak to act. BiddingEngine answers those locally in
+microseconds and returns None for everything else, so only real judgment
+calls go to the LLM.
+
+Requests are structured: a hand ({S, H, D, C} strings such as "KQ84" or
+"A105"), the seat to bid for, the auction so far as [{seat, bid}, ...]
+and the conventions enabled for the scenario.
+"""
+
+import threading
+
+from auction import partner_of, is_contract
+from hand_eval import pack_hand, suit_lengths
+from hand_eval import hcp as hand_hcp
+
+
+class BiddingEngine:
+    """Answers forced and conventional calls; None means "ask the LLM"."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local = 0
+        self.fallback = 0
+        self.by_rule = {}
+
+    def decide(self, hand, seat, auction, conventions=()):
+        """Return {'bid', 'reasoning', 'rule'} or None."""
+        calls = [(entry['seat'], entry['bid']) for entry in auction]
+        conventions = set(conventions or ())
+        mask = pack_hand(hand)
+        lengths = suit_lengths(mask)
+        hcp = hand_hcp(mask)
+
+        result = None
+        for rule in (self._notrump_responses, self._weak_pass):
+            result = rule(seat, calls, conventions, lengths, hcp)
+            if result is not None:
+                break
+
+        with self._lock:
+            if result is None:
+                self.fallback += 1
+            else:
+                self.local += 1
+                self.by_rule[result['rule']] = self.by_rule.get(result['rule'], 0) + 1
+        return result
+
+    def _notrump_responses(self, seat, calls, conventions, lengths, hcp):
+        """Stayman replies and transfer completions after our own 1NT opening."""
+        if len(calls) < 4:
+            return None
+        (opener, opening), (lho, lho_call), (partner, response), (rho, rho_call) = calls[-4:]
+        if opener != seat or opening != '1NT' or partner != partner_of(seat):
+            return None
+        if any(is_contract(bid) for _, bid in calls[:-4]) or lho_call != 'Pass':
+            return None
+
+        if response == '2C' and 'stayman' in conventions and rho_call in ('Pass', 'X'):
+            if lengths['H'] >= 4:
+                bid, why = '2H', f"Stayman reply: I have {lengths['H']} hearts"
+            elif lengths['S'] >= 4:
+                bid, why = '2S', f"Stayman reply: I have {lengths['S']} spades, no 4-card heart suit"
+            else:
+                bid, why = '2D', 'Stayman reply: no 4-card major'
+            return {'bid': bid, 'reasoning': why, 'rule': 'stayman_reply'}
+
+        if response in ('2D', '2H') and 'transfers' in conventions and rho_call == 'Pass':
+            target = {'2D': ('2H', 'hearts'), '2H': ('2S', 'spades')}[response]
+            return {
+                'bid': target[0],
+                'reasoning': f'Completing partner\'s Jacoby transfer to {target[1]}',
+                'rule': 'transfer_completion',
+            }
+        return None
+
+    def _weak_pass(self, seat, calls, conventions, lengths, hcp):
+        """Pass with hands too weak to open, overcall or respond."""
+        longest = max(lengths.values())
+        partner = partner_of(seat)
+        ours = [bid for s, bid in calls if s in (seat, partner)]
+        theirs = [bid for s, bid in calls if s not in (seat, partner)]
+
+        if all(bid == 'Pass' for bid in ours):
+            if not any(is_contract(bid) for bid in theirs):
+                if hcp < 10 and longest < 6:
+                    return self._pass(f'{hcp} HCP and no 6-card suit: not enough to open', 'weak_no_open')
+            elif hcp < 8 and longest < 6:
+                return self._pass(f'{hcp} HCP and no long suit: too weak to compete', 'weak_no_overcall')
+            return None
+
+        partner_contracts = [bid for s, bid in calls if s == partner and is_contract(bid)]
+        my_calls = [bid for s, bid in calls if s == seat]
+        if len(partner_contracts) != 1 or any(bid != 'Pass' for bid in my_calls):
+            return None
+        if 'X' in [bid for s, bid in calls if s == partner] or partner_contracts[0][0] != '1':
+            return None
+
+        if partner_contracts[0] == '1NT':
+            if hcp < 8 and longest < 5:
+                return self._pass(f'{hcp} HCP opposite 1NT with no 5-card suit: no game', 'weak_response')
+        elif hcp < 6:
+            return self._pass(f'{hcp} HCP: too weak to respond', 'weak_response')
+        return None
+
+    @staticmethod
+    def _pass(reasoning, rule):
+        return {'bid': 'Pass', 'reasoning': reasoning, 'rule': rule}
+
+    def stats(self):
+        with self._lock:
+            total = self.local + self.fallback
+            return {
+                'local': self.local,
+                'llm_fallback': self.fallback,
+                'local_rate': round(self.local / total, 3) if total else 0.0,
+                'by_rule': dict(self.by_rule),
+            }
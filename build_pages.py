@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Build step for the React pages.
+
+slam-auction-full.html and slam-auction-single.html are written as single
+files with a <script type="text/babel"> block that @babel/standalone
+compiles in the browser on every load. This script does that work once:
+it compiles the JSX to plain ES2017, swaps the unpkg React/Babel tags for
+the copies in vendor/, and writes content-hashed assets plus gzip and
+brotli variants to dist/. The backend serves /full and /single from dist/
+when it is up to date with the source pages.
+
+Usage (needs the packages in requirements-build.txt):
+  python build_pages.py [--out dist]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DIST_DIR = os.path.join(ROOT, 'dist')
+MANIFEST = 'manifest.json'
+
+# Page name -> source file; the name is also the compiled bundle's name
+PAGES = {
+    'full': 'slam-auction-full.html',
+    'single': 'slam-auction-single.html',
+}
+VENDOR = {
+    'react': 'vendor/react@18.3.1.min.js',
+    'react-dom': 'vendor/react-dom@18.3.1.min.js',
+}
+
+_CDN_TAGS = re.compile(r'[ \t]*<script[^>]*src="https://unpkg\.com/[^"]*"[^>]*></script>\n')
+_BABEL_BLOCK = re.compile(r'<script type="text/babel">(.*?)</script>', re.S)
+_HEAD_END = '</head>'
+
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def source_digests():
+    """sha256 of every build input, recorded in the manifest."""
+    return {path: file_digest(os.path.join(ROOT, path))
+            for path in list(PAGES.values()) + list(VENDOR.values())}
+
+
+def is_current(dist_dir=DIST_DIR):
+    """True if dist/ was built from the source pages as they are now."""
+    try:
+        with open(os.path.join(dist_dir, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return manifest.get('sources') == source_digests()
+
+
+def compile_jsx(source):
+    """JSX -> ES2017 with the TypeScript transpiler (run in dukpy's JS engine)."""
+    import dukpy
+
+    services = os.path.join(os.path.dirname(dukpy.__file__), 'jsmodules', 'typescriptServices.js')
+    with open(services, encoding='utf-8') as f:
+        compiler = f.read()
+    result = dukpy.evaljs(
+        (compiler,
+         'var r = ts.transpileModule(dukpy.source, {compilerOptions: {'
+         'jsx: ts.JsxEmit.React, target: ts.ScriptTarget.ES2017}, '
+         "reportDiagnostics: true, fileName: 'page.jsx'});",
+         '({code: r.outputText, errors: r.diagnostics.map(function (d) {'
+         "return (d.messageText.messageText || d.messageText) + ' at ' + d.start; })})"),
+        source=source,
+    )
+    if result['errors']:
+        raise ValueError('JSX compile failed: ' + '; '.join(result['errors']))
+    return result['code']
+
+
+def write_compressed(path, data):
+    """Write `data` plus .gz and .br variants."""
+    import brotli
+
+    variants = {
+        '': data,
+        '.gz': gzip.compress(data, compresslevel=9, mtime=0),
+        '.br': brotli.compress(data, quality=11),
+    }
+    for suffix, body in variants.items():
+        with open(path + suffix, 'wb') as f:
+            f.write(body)
+
+
+def emit_asset(out_dir, name, data):
+    """Write assets/<name>.<hash>.js and return its URL path."""
+    filename = f'{name}.{hashlib.sha256(data).hexdigest()[:10]}.js'
+    write_compressed(os.path.join(out_dir, 'assets', filename), data)
+    return f'/assets/{filename}'
+
+
+def build_page(source_html, script_urls, bundle_url):
+    """Rewrite a page to load vendored React and its precompiled bundle."""
+    html = _CDN_TAGS.sub('', source_html)
+    tags = ''.join(f'    <script defer src="{url}"></script>\n' for url in script_urls)
+    html = html.replace(_HEAD_END, tags + _HEAD_END, 1)
+    # Deferred scripts run in document order, after parsing, so the bundle
+    # still runs after React without blocking first paint
+    return _BABEL_BLOCK.sub(lambda m: f'<script defer src="{bundle_url}"></script>', html, count=1)
+
+
+def build(out_dir=DIST_DIR):
+    """Build every page into `out_dir` and return the manifest."""
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(os.path.join(out_dir, 'assets'))
+
+    assets = {}
+    for name, path in VENDOR.items():
+        with open(os.path.join(ROOT, path), 'rb') as f:
+            assets[name] = emit_asset(out_dir, name, f.read())
+
+    pages = {}
+    for name, path in PAGES.items():
+        with open(os.path.join(ROOT, path), encoding='utf-8') as f:
+            source = f.read()
+        match = _BABEL_BLOCK.search(source)
+        if match is None:
+            raise ValueError(f'{path} has no <script type="text/babel"> block')
+        assets[name] = emit_asset(out_dir, name, compile_jsx(match.group(1)).encode('utf-8'))
+        html = build_page(source, [assets['react'], assets['react-dom']], assets[name])
+        write_compressed(os.path.join(out_dir, path), html.encode('utf-8'))
+        pages[name] = path
+
+    manifest = {'pages': pages, 'assets': assets, 'sources': source_digests()}
+    with open(os.path.join(out_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', default=DIST_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = build(args.out)
+    print(f"{'file':<40} {'raw':>9} {'gzip':>9} {'brotli':>9}")
+    for url in manifest['assets'].values():
+        path = os.path.join(args.out, url.lstrip('/'))
+        sizes = [os.path.getsize(path + suffix) for suffix in ('', '.gz', '.br')]
+        print(f"{url:<40} {sizes[0]:>9} {sizes[1]:>9} {sizes[2]:>9}")
+    print(f'Built {len(manifest["pages"])} pages into {args.out} in {time.perf_counter() - start:.1f}s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Random four-hand deals that meet a spec, for unlimited practice hands.
+
+A deal is stored as 52 bytes, one per card, holding the index of the seat
+that owns it (cards run AS KS ... 2S, AH ... 2C), so a batch of deals is
+one (batch, 52) uint8 array and every constraint is a vectorized test
+over the batch. Accepted deals convert to 52-bit masks per hand or to the
+{S, H, D, C} strings used by the scenarios.
+
+Deals are sampled exactly uniformly from those meeting the spec, in two
+vectorized steps:
+
+1. The 4x4 suit-length matrix. Seats are drawn in turn (N, E, S; W gets
+   the rest), each from the 560 possible 13-card patterns given the cards
+   left in every suit. The tables are weighted, once per spec, by the
+   chance that the remaining seats can still meet their shape constraints,
+   so this step never draws a shape that will be rejected.
+2. The ranks. Each suit's 13 cards are shared out by shuffling that
+   suit's seat labels, and deals outside the HCP ranges are rejected.
+
+A spec maps seats to constraints, all optional and combined with AND:
+
+  {'N': {'hcp': [15, 17], 'balanced': True},
+   'S': {'hcp': [8, 15], 'lengths': {'S': [4, 4], 'H': [4, 4]}}}
+
+Beyond HCP, a seat may bound the hand_eval values 'ltc', 'controls'
+and 'quick_tricks' with the same [low, high] ranges; these are checked
+on the dealt ranks, like HCP. A seat may also give a list of constraint dicts, meaning any of them
+(e.g. five or more of either major). PROFILES has one spec per drilled
+convention, keyed like the scenario store's convention tags.
+
+Usage (needs numpy):
+  python deal_generator.py --profile stayman --count 5 --seed 1
+"""
+
+import argparse
+import json
+import math
+import sys
+
+import numpy as np
+
+from hand_eval import evaluate_batch, is_balanced
+
+SEATS = ['N', 'E', 'S', 'W']
+SUITS = ['S', 'H', 'D', 'C']
+RANKS = ['A', 'K', 'Q', 'J', '10', '9', '8', '7', '6', '5', '4', '3', '2']
+
+# Per-card values in deck order
+CARD_HCP = np.tile(np.array([4, 3, 2, 1] + [0] * 9, dtype=np.int16), 4)
+CARD_BITS = np.left_shift(np.uint64(1), np.arange(52, dtype=np.uint64))
+
+# Ranges over hand_eval values, checked once the ranks are dealt
+EVALUATED = ('ltc', 'controls', 'quick_tricks')
+
+PROFILES = {
+    'stayman': {
+        'N': {'hcp': [15, 17], 'balanced': True},
+        'S': {'hcp': [8, 15], 'lengths': {'S': [4, 4], 'H': [4, 4]}},
+    },
+    'transfers': {
+        'N': {'hcp': [15, 17], 'balanced': True},
+        'S': [{'hcp': [0, 15], 'lengths': {'S': [5, 13], 'H': [0, 3]}},
+              {'hcp': [0, 15], 'lengths': {'H': [5, 13], 'S': [0, 3]}}],
+    },
+    'negative-double': {
+        'N': {'hcp': [12, 21], 'lengths': {'D': [4, 13], 'H': [0, 3], 'S': [0, 3]}},
+        'E': {'hcp': [8, 16], 'lengths': {'S': [5, 13]}},
+        'S': {'hcp': [7, 11], 'lengths': {'H': [4, 4], 'S': [0, 3]}},
+    },
+    'michaels': {
+        'E': {'hcp': [12, 21], 'lengths': {'C': [4, 13], 'H': [0, 4], 'S': [0, 4]}},
+        'S': {'hcp': [8, 16], 'lengths': {'S': [5, 13], 'H': [5, 13]}},
+    },
+    'unusual-2nt': {
+        'E': {'hcp': [12, 21], 'lengths': {'S': [5, 13]}},
+        'S': {'hcp': [8, 16], 'lengths': {'D': [5, 13], 'C': [5, 13]}},
+    },
+    'takeout-double': {
+        'E': {'hcp': [12, 21], 'lengths': {'D': [4, 13]}},
+        'S': {'hcp': [12, 17], 'lengths': {'D': [0, 2], 'S': [3, 5], 'H': [3, 5], 'C': [3, 5]}},
+    },
+}
+
+_BASE14 = np.array([14 ** 3, 14 ** 2, 14, 1])
+
+
+def _as_alternatives(constraints):
+    return constraints if isinstance(constraints, list) else [constraints]
+
+
+def check_spec(spec):
+    """Raise ValueError for an unknown seat, field or suit, or an inverted range."""
+    for seat, constraints in spec.items():
+        if seat not in SEATS:
+            raise ValueError(f'Unknown seat {seat!r}')
+        for alternative in _as_alternatives(constraints):
+            unknown = set(alternative) - {'hcp', 'balanced', 'lengths', *EVALUATED}
+            if unknown:
+                raise ValueError(f'Unknown constraint {sorted(unknown)} for {seat}')
+            ranges = [alternative.get(name, [0, 37]) for name in ('hcp',) + EVALUATED]
+            ranges += list(alternative.get('lengths', {}).values())
+            if any(suit not in SUITS for suit in alternative.get('lengths', {})):
+                raise ValueError(f'Unknown suit in {seat} lengths')
+            if any(len(r) != 2 or r[0] > r[1] for r in ranges):
+                raise ValueError(f'Bad range in {seat} constraints')
+
+
+def _evaluated(spec):
+    """Seat indexes whose constraints need hand_eval values."""
+    return {seat for seat, constraints in spec.items()
+            if any(name in alternative for alternative in _as_alternatives(constraints) for name in EVALUATED)}
+
+
+def seat_mask(lengths, hcp, constraints, values=None):
+    """
+    Boolean mask of the hands with these suit lengths (n, 4) and HCP (n,)
+    that meet any alternative, with `values` from hand_eval.evaluate_batch
+    for the EVALUATED ranges. hcp=None checks shape only.
+    """
+    matched = np.zeros(len(lengths), dtype=bool)
+    for alternative in _as_alternatives(constraints):
+        mask = np.ones(len(lengths), dtype=bool)
+        if 'hcp' in alternative and hcp is not None:
+            low, high = alternative['hcp']
+            mask &= (hcp >= low) & (hcp <= high)
+        for name in EVALUATED:
+            if name in alternative and values is not None:
+                low, high = alternative[name]
+                mask &= (values[name] >= low) & (values[name] <= high)
+        for suit, (low, high) in alternative.get('lengths', {}).items():
+            length = lengths[:, SUITS.index(suit)]
+            mask &= (length >= low) & (length <= high)
+        if 'balanced' in alternative:
+            mask &= is_balanced(lengths) == bool(alternative['balanced'])
+        matched |= mask
+    return matched
+
+
+class PatternTables:
+    """
+    The chain of suit-length draws shared by every spec.
+
+    A state is the number of cards left in each suit before a seat draws:
+    one state before N, 560 before E and 1834 before S. `prob[state, p]`
+    is the chance the seat's hand has pattern p from that state.
+    """
+
+    def __init__(self):
+        grid = np.indices((14, 14, 14, 14)).reshape(4, -1).T
+        self.patterns = grid[grid.sum(axis=1) == 13].astype(np.int8)
+        self.states = np.vstack([[[13, 13, 13, 13]], 13 - self.patterns, grid[grid.sum(axis=1) == 26]])
+        after_n = 1 + len(self.patterns)
+        self.stages = [np.arange(0, 1), np.arange(1, after_n), np.arange(after_n, len(self.states))]
+        self.state_index = np.full(14 ** 4, -1, dtype=np.int64)
+        self.state_index[self.states @ _BASE14] = np.arange(len(self.states))
+        self.pattern_index = np.full(14 ** 4, -1, dtype=np.int64)
+        self.pattern_index[self.patterns @ _BASE14] = np.arange(len(self.patterns))
+
+        comb = np.array([[math.comb(n, k) for k in range(14)] for n in range(14)], dtype=np.float64)
+        weights = np.prod(comb[self.states[:, None, :], self.patterns[None, :, :]], axis=2)
+        self.prob = weights / weights.sum(axis=1, keepdims=True)
+
+    def next_states(self, stage):
+        """(codes, valid): the state reached by drawing each pattern from each state in `stage`."""
+        left = self.states[self.stages[stage]][:, None, :] - self.patterns[None, :, :]
+        valid = (left >= 0).all(axis=2)
+        return np.where(valid[:, :, None], left, 0) @ _BASE14, valid
+
+
+_tables = None
+
+
+def pattern_tables():
+    """The shared PatternTables, built on first use."""
+    global _tables
+    if _tables is None:
+        _tables = PatternTables()
+    return _tables
+
+
+def shape_sampler(spec):
+    """
+    (flat_cdf, shape_probability) for a spec of seat index -> constraints.
+
+    Works backwards from S's draw: each state's value is the chance the
+    seats still to draw meet their shape constraints. The draw from a
+    state is then weighted by the value of the state it leads to, which
+    samples length matrices exactly from those meeting the spec. Every
+    state's CDF is offset by its row number so one searchsorted call
+    draws for many states at once.
+    """
+    tables = pattern_tables()
+    lengths = tables.patterns.astype(np.int64)
+    ok = [seat_mask(lengths, None, spec[seat]) if seat in spec else np.ones(len(lengths), dtype=bool)
+          for seat in range(4)]
+    value = np.zeros(len(tables.states))
+    weights = np.zeros_like(tables.prob)
+    for stage in (2, 1, 0):
+        codes, valid = tables.next_states(stage)
+        if stage == 2:
+            after = ok[3][tables.pattern_index[codes]]
+        else:
+            after = value[tables.state_index[codes]]
+        rows = tables.stages[stage]
+        weights[rows] = tables.prob[rows] * ok[stage][None, :] * np.where(valid, after, 0)
+        value[rows] = weights[rows].sum(axis=1)
+
+    totals = weights.sum(axis=1, keepdims=True)
+    cdf = np.cumsum(weights, axis=1) / np.where(totals > 0, totals, 1)
+    cdf[:, -1] = 1.0
+    return (cdf + np.arange(len(cdf))[:, None]).ravel(), float(value[0])
+
+
+def length_matrices(rng, flat_cdf, size):
+    """`size` suit-length matrices as a (size, seat, suit) int8 array."""
+    tables = pattern_tables()
+    left = np.full((size, 4), 13, dtype=np.int64)
+    seats = []
+    for _ in range(3):
+        rows = tables.state_index[left @ _BASE14]
+        index = np.searchsorted(flat_cdf, rows + rng.random(size), side='right') - rows * len(tables.patterns)
+        seats.append(tables.patterns[index])
+        left -= seats[-1]
+    seats.append(left.astype(np.int8))
+    return np.stack(seats, axis=1)
+
+
+def deal_cards(rng, lengths):
+    """Deal ranks to match (n, seat, suit) lengths; returns a (n, 52) owners array."""
+    # Each suit's lengths sum to 13, so repeating N E S W by them gives
+    # every suit's 13 seat labels in order
+    by_suit = lengths.transpose(0, 2, 1).ravel()
+    labels = np.repeat(np.tile(np.arange(4, dtype=np.uint8), len(by_suit) // 4), by_suit).reshape(-1, 4, 13)
+    order = rng.random(labels.shape).argsort(axis=2)
+    return np.take_along_axis(labels, order, axis=2).reshape(-1, 52)
+
+
+def hand_features(owners, seat_index):
+    """(hcp, lengths) for one seat across a batch: shapes (n,) and (n, 4)."""
+    held = owners == seat_index
+    hcp = held @ CARD_HCP
+    lengths = held.reshape(-1, 4, 13).sum(axis=2)
+    return hcp, lengths
+
+
+def hand_masks(owners):
+    """52-bit card masks per hand: (n, 4) uint64, bit i set for deck card i."""
+    held = owners[:, None, :] == np.arange(4, dtype=np.uint8)[None, :, None]
+    return np.where(held, CARD_BITS, np.uint64(0)).sum(axis=2, dtype=np.uint64)
+
+
+def to_hands(owners_row):
+    """One deal as {seat: {suit: "AK105"}}; a void is "-"."""
+    hands = {seat: {suit: '' for suit in SUITS} for seat in SEATS}
+    for card, owner in enumerate(owners_row.tolist()):
+        hands[SEATS[owner]][SUITS[card // 13]] += RANKS[card % 13]
+    for hand in hands.values():
+        for suit in SUITS:
+            hand[suit] = hand[suit] or '-'
+    return hands
+
+
+class DealGenerator:
+    """
+    Batched sampler for one spec.
+
+    Shapes never miss, so `dealt` counts deals whose cards were dealt and
+    HCP-checked; the spec's overall chance is shape_probability x acceptance.
+    """
+
+    def __init__(self, spec, seed=None, batch_size=4096):
+        check_spec(spec)
+        self.spec = {SEATS.index(seat): constraints for seat, constraints in spec.items()}
+        self.evaluated = _evaluated(self.spec)
+        self.flat_cdf, self.shape_probability = shape_sampler(self.spec)
+        if self.shape_probability == 0:
+            raise ValueError('No deal has the shapes this spec asks for')
+        self.rng = np.random.default_rng(seed)
+        self.batch_size = batch_size
+        self.dealt = 0
+        self.accepted = 0
+
+    def sample(self, count, max_deals=10_000_000):
+        """
+        Return a (count, 52) owners array of matching deals.
+
+        Raises RuntimeError if max_deals are dealt without finding enough,
+        which means the HCP ranges are (nearly) impossible with these shapes.
+        """
+        found = []
+        need = count
+        while need > 0:
+            if self.dealt >= max_deals:
+                raise RuntimeError(f'Only {count - need} of {count} deals matched after {self.dealt} tries')
+            owners = deal_cards(self.rng, length_matrices(self.rng, self.flat_cdf, self.batch_size))
+            mask = np.ones(len(owners), dtype=bool)
+            masks = hand_masks(owners) if self.evaluated else None
+            for seat_index, constraints in self.spec.items():
+                hcp, lengths = hand_features(owners, seat_index)
+                values = evaluate_batch(masks[:, seat_index]) if seat_index in self.evaluated else None
+                mask &= seat_mask(lengths, hcp, constraints, values)
+            matches = owners[mask][:need]
+            self.dealt += len(owners)
+            self.accepted += int(mask.sum())
+            found.append(matches)
+            need -= len(matches)
+        return np.concatenate(found)
+
+    def deals(self, count):
+        """`count` matching deals in the scenario `hands` shape."""
+        return [to_hands(row) for row in self.sample(count)]
+
+    def stats(self):
+        acceptance = self.accepted / self.dealt if self.dealt else 0.0
+        return {
+            'shape_probability': round(self.shape_probability, 5),
+            'dealt': self.dealt,
+            'accepted': self.accepted,
+            'acceptance': round(acceptance, 5),
+            'spec_probability': round(self.shape_probability * acceptance, 6),
+        }
+
+
+def generate_deals(spec, count, seed=None):
+    """`count` deals meeting `spec`, which may be a PROFILES name."""
+    if isinstance(spec, str):
+        spec = PROFILES[spec]
+    return DealGenerator(spec, seed=seed).deals(count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='stayman', help='a convention profile')
+    parser.add_argument('--spec', help='a JSON spec instead of a profile')
+    parser.add_argument('--count', type=int, default=10)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    spec = json.loads(args.spec) if args.spec else args.profile
+    for hands in generate_deals(spec, args.count, args.seed):
+        print(json.dumps({'hands': hands}, separators=(',', ':')))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
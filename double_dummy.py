@@ -0,0 +1,715 @@
+#!/usr/bin/env python3
+"""
+Double-dummy analysis: how many tricks each declarer takes in each strain
+with all four hands known and perfect play on both sides.
+
+The search answers yes/no questions ("can N-S take at least k of the
+remaining tricks?") with alpha-beta, and finds the trick count by binary
+search over k. What keeps it fast enough for whole deals in Python:
+
+- hands are 16 13-bit suit masks, so playing a card is one XOR;
+- cards that are equivalent (adjacent once the played cards are gone) are
+  tried once, and moves are ordered so cutoffs come early;
+- positions at trick boundaries go in a transposition table with lower
+  and upper bounds, which later searches of the same deal reuse; an
+  entry only keeps the cards that decided its result, so it also answers
+  for positions that differ in the small cards;
+- sure tricks the side on lead can cash end a search early.
+
+dd_table() solves all 20 declarer/strain pairs of a deal and memoizes the
+result by deal hash. best_contract() and contract_score() turn a table
+into the optimal contract and the expected score of any final contract.
+
+Annotate a scenario set in parallel:
+  python double_dummy.py --set full --workers 4 [--write]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+SEATS = ['N', 'E', 'S', 'W']
+SUITS = ['S', 'H', 'D', 'C']
+STRAINS = ['NT', 'S', 'H', 'D', 'C']
+NOTRUMP = 4
+RANKS = '23456789TJQKA'
+
+
+def parse_hands(hands):
+    """{seat: {suit: "AK105"}} -> 16 suit masks, seat-major (bit 12 is the ace)."""
+    masks = []
+    for seat in SEATS:
+        for suit in SUITS:
+            holding = hands[seat].get(suit, '').replace('10', 'T').replace('-', '').upper()
+            mask = 0
+            for card in holding:
+                mask |= 1 << RANKS.index(card)
+            masks.append(mask)
+    if sum(bin(m).count('1') for m in masks) != 52 or any(
+            masks[s] & masks[o * 4 + s % 4] for s in range(16) for o in range(4) if o != s // 4):
+        raise ValueError('Need four 13-card hands with no card dealt twice')
+    if any(sum(bin(masks[seat * 4 + suit]).count('1') for suit in range(4)) != 13 for seat in range(4)):
+        raise ValueError('Need four 13-card hands with no card dealt twice')
+    return masks
+
+
+def deal_hash(hands):
+    """Stable key for a deal, whatever the suit string formatting."""
+    masks = parse_hands(hands)
+    return hashlib.sha256(','.join(map(str, masks)).encode('ascii')).hexdigest()[:20]
+
+
+def _top_bit(mask):
+    return mask.bit_length() - 1
+
+
+_CASH_CACHE = {}
+
+
+def _cash(held, theirs, left_hand, right_hand, rounds):
+    """
+    What one suit is worth to the side on lead, as (cashed, follows,
+    later, crossing, lowest): `lowest` is the lowest rank the answer
+    depends on.
+
+    Winners are cards above every opponent's card, and every card once
+    both opponents are out of the suit. The leader cashes theirs from the
+    top while partner follows with their lowest cards; `cashed` stops
+    where partner would have to overtake or the opponents could ruff.
+    `follows` says partner never had to discard. If the leader cashed all
+    their winners and still has a (losing) card, it is a `crossing` to
+    partner, who then takes `later` tricks with the winners they have left.
+    Once small cards are cashed or the opponents are void, every rank in
+    the suit counts.
+    """
+    key = (held, theirs, left_hand, right_hand, rounds)
+    result = _CASH_CACHE.get(key)
+    if result is not None:
+        return result
+    floor = (left_hand | right_hand).bit_length()
+    longest = max(left_hand.bit_count(), right_hand.bit_count())
+    lowest = floor - 1 if floor else 0
+    cashed = 0
+    hand = held
+    other = theirs
+    while cashed < rounds and hand and (hand >> floor or cashed >= longest):
+        card = 1 << _top_bit(hand)
+        if card >> floor == 0:
+            lowest = 0
+        low = other & -other
+        if low > card:
+            break
+        hand ^= card
+        other ^= low
+        cashed += 1
+    later = 0
+    if not hand >> floor:
+        later = max(0, min((other >> floor).bit_count(), rounds - cashed))
+    result = _CASH_CACHE[key] = (cashed, theirs.bit_count() >= cashed, later, bool(later and hand), lowest)
+    return result
+
+
+def _top_run(hand, alive):
+    """How many of the top cards of `alive` are in `hand`."""
+    run = 0
+    while alive and hand >> _top_bit(alive) & 1:
+        alive ^= 1 << _top_bit(alive)
+        run += 1
+    return run
+
+
+_GROUP_CACHE = {}
+
+
+def _groups(alive, mine):
+    """
+    One rank from each run of `mine` that no other live card splits,
+    highest first: playing any card of a run has the same effect.
+    """
+    key = alive << 13 | mine
+    ranks = _GROUP_CACHE.get(key)
+    if ranks is None:
+        ranks = []
+        cards = mine
+        while cards:
+            rank = _top_bit(cards)
+            cards ^= 1 << rank
+            above = alive >> (rank + 1)
+            if not (above and mine >> (rank + 1 + _top_bit(above & -above)) & 1):
+                ranks.append(rank)
+        ranks = _GROUP_CACHE[key] = tuple(ranks)
+    return ranks
+
+
+def _compress_table(bits):
+    """table[gone][mask]: mask with the `gone` bits squeezed out."""
+    table = []
+    for gone in range(1 << bits):
+        row = []
+        for mask in range(1 << bits):
+            packed = shift = 0
+            for bit in range(bits):
+                if not gone >> bit & 1:
+                    packed |= (mask >> bit & 1) << shift
+                    shift += 1
+            row.append(packed)
+        table.append(row)
+    return table
+
+
+# Ranks 2-8 and 9-A compress separately to keep the tables small
+_LOW_BITS = 7
+_LOW_MASK = (1 << _LOW_BITS) - 1
+_COMPRESS_LOW = _compress_table(_LOW_BITS)
+_COMPRESS_HIGH = _compress_table(13 - _LOW_BITS)
+_ALIVE_LOW = [bin(_LOW_MASK & ~gone).count('1') for gone in range(1 << _LOW_BITS)]
+# _FIELDS[drop] keeps what is left of each hand's 13-bit field after >> drop
+_FIELDS = [sum(((1 << (13 - drop)) - 1) << shift for shift in (0, 13, 26, 39)) for drop in range(14)]
+
+
+class Solver:
+    """
+    Double-dummy search for one deal and strain.
+
+    The transposition table is kept between calls, so solving every
+    opening leader for a strain shares work.
+    """
+
+    def __init__(self, masks, trump):
+        self.hands = list(masks)
+        self.trump = trump
+        self.table = {}
+        self.seen = {}
+        # Lead that decided each position last time, as (suit, live cards
+        # above it): re-searches for a nearer target try it first
+        self.leads = {}
+        self._cut = None
+        self.nodes = 0
+        # Cards played to the current trick, per suit: they still separate
+        # the cards around them when deciding which cards are equivalent
+        self._trick = [0, 0, 0, 0]
+
+    def tricks(self, leader, guess=None):
+        """
+        Tricks N-S take with `leader` on lead and both sides playing
+        perfectly. A close `guess` (such as the answer for another leader)
+        saves searches.
+        """
+        left = sum(m.bit_count() for m in self.hands) // 4
+        if guess is None:
+            guess = (left + 1) // 2
+        guess = min(max(guess, 0), left)
+        if self._make(leader, guess)[0]:
+            while guess < left and self._make(leader, guess + 1)[0]:
+                guess += 1
+            return guess
+        while guess > 0 and not self._make(leader, guess - 1)[0]:
+            guess -= 1
+        return guess - 1
+
+    def estimate(self):
+        """
+        A starting guess for tricks(): everything the weaker side cannot
+        stop. Each side is credited with its best quick tricks plus, in a
+        trump contract, the trumps it holds beyond the other side's longest
+        holding. A guess on the high side is cheap to correct.
+        """
+        hands = self.hands
+        left = sum(m.bit_count() for m in hands) // 4
+        sides = []
+        for seats in ((0, 2), (1, 3)):
+            sure = max(self._quick_tricks(seat)[0] for seat in seats)
+            if self.trump != NOTRUMP:
+                mine = max(hands[seat * 4 + self.trump].bit_count() for seat in seats)
+                theirs = max(hands[(seat + 1) % 4 * 4 + self.trump].bit_count() for seat in seats)
+                sure += max(0, mine - theirs)
+            sides.append(min(sure, left))
+        ns, ew = sides
+        return left - ew if ns >= ew else ns
+
+    def _make(self, leader, target):
+        """
+        Whether N-S can take at least `target` of the remaining tricks,
+        and the ranks that decided it as a 52-bit mask (suit s at bit
+        13 * s): a position that only differs in cards below the lowest
+        of those ranks in each suit has the same answer.
+        """
+        hands = self.hands
+        left = (hands[leader * 4] | hands[leader * 4 + 1] << 13 | hands[leader * 4 + 2] << 26
+                | hands[leader * 4 + 3] << 39).bit_count()
+        if target <= 0:
+            return True, 0
+        if target > left:
+            return False, 0
+
+        # Exactly this position before: bounds with the ranks behind them
+        position = (leader | hands[0] << 2 | hands[1] << 15 | hands[2] << 28 | hands[3] << 41
+                    | hands[4] << 54 | hands[5] << 67 | hands[6] << 80 | hands[7] << 93
+                    | hands[8] << 106 | hands[9] << 119 | hands[10] << 132 | hands[11] << 145
+                    | hands[12] << 158 | hands[13] << 171 | hands[14] << 184 | hands[15] << 197)
+        known = self.seen.get(position)
+        if known is not None:
+            if known[0] >= target:
+                return True, known[1]
+            if known[2] < target:
+                return False, known[3]
+
+        key = self._key(leader)
+        bucket = (leader, *map(int.bit_count, hands))
+        patterns = self.table.get(bucket)
+        if patterns is not None:
+            # One probe per set of drops (few distinct ones share a
+            # bucket), most recently useful first
+            for drops, entries in reversed(patterns.items()):
+                bounds = entries.get(((key[1] >> drops[0]) & _FIELDS[drops[0]],
+                                      (key[2] >> drops[1]) & _FIELDS[drops[1]],
+                                      (key[3] >> drops[2]) & _FIELDS[drops[2]],
+                                      (key[4] >> drops[3]) & _FIELDS[drops[3]]))
+                if bounds is not None:
+                    if bounds[0] >= target:
+                        result, ranks = True, self._ranks(drops)
+                        break
+                    if bounds[1] < target:
+                        result, ranks = False, self._ranks(drops)
+                        break
+            else:
+                result = None
+            if result is not None:
+                patterns[drops] = patterns.pop(drops)
+                self._remember(position, known, target, result, ranks, left)
+                return result, ranks
+
+        sure, ranks = self._quick_tricks(leader)
+        if leader % 2 == 0:
+            if sure >= target:
+                return True, ranks
+        elif left - sure < target:
+            return False, ranks
+        if self.trump != NOTRUMP:
+            # The other side's top trumps, all in one hand, win whenever played
+            trump = self.trump
+            alive = hands[trump] | hands[4 + trump] | hands[8 + trump] | hands[12 + trump]
+            other = (leader + 1) % 4 * 4 + trump
+            theirs = max(_top_run(hands[other], alive), _top_run(hands[(other + 8) % 16], alive))
+            if (left - theirs < target) if leader % 2 == 0 else (theirs >= target):
+                for _ in range(alive.bit_count() - theirs - 1):
+                    alive &= alive - 1
+                return leader % 2 != 0, alive << 13 * trump
+
+        result, ranks = self._play(leader, 0, leader, -1, leader, -1, -1, target, self.leads.get(key))
+        if self._cut is not None:
+            self.leads[key] = self._cut
+        self._store(bucket, key, ranks, target, result, left)
+        self._remember(position, known, target, result, ranks, left)
+        return result, ranks
+
+    def _remember(self, position, known, target, result, ranks, left):
+        if known is None:
+            self.seen[position] = [target, ranks, left, 0] if result else [0, 0, target - 1, ranks]
+        elif result:
+            known[0], known[1] = target, ranks
+        else:
+            known[2], known[3] = target - 1, ranks
+
+    def _ranks(self, drops):
+        """The ranks a table entry kept, as cards of the current position."""
+        hands = self.hands
+        ranks = 0
+        for suit in range(4):
+            alive = hands[suit] | hands[4 + suit] | hands[8 + suit] | hands[12 + suit]
+            for _ in range(drops[suit]):
+                alive &= alive - 1
+            ranks |= alive << 13 * suit
+        return ranks
+
+    def _store(self, bucket, key, ranks, target, result, left):
+        """
+        Record a search result for every position that matches this one
+        in suit lengths and in who holds each card from the lowest
+        deciding rank up; small cards are dropped from the pattern.
+        """
+        hands = self.hands
+        drops = []
+        for suit in range(4):
+            alive = hands[suit] | hands[4 + suit] | hands[8 + suit] | hands[12 + suit]
+            marked = ranks >> 13 * suit & 0x1FFF
+            drops.append((alive & ((marked & -marked) - 1)).bit_count() if marked else alive.bit_count())
+        pattern = tuple((key[1 + suit] >> drops[suit]) & _FIELDS[drops[suit]] for suit in range(4))
+        entries = self.table.setdefault(bucket, {}).setdefault(tuple(drops), {})
+        bounds = entries.get(pattern)
+        if bounds is None:
+            entries[pattern] = [target, left] if result else [0, target - 1]
+        elif result:
+            bounds[0] = max(bounds[0], target)
+        else:
+            bounds[1] = min(bounds[1], target - 1)
+
+    def _key(self, leader):
+        """
+        The position with played cards squeezed out of every suit: only
+        relative ranks matter, so positions that differ in which small
+        cards are gone share an entry.
+        """
+        hands = self.hands
+        key = [leader]
+        for suit in range(4):
+            north, east, south, west = hands[suit], hands[4 + suit], hands[8 + suit], hands[12 + suit]
+            gone = 0x1FFF & ~(north | east | south | west)
+            gone_low = gone & _LOW_MASK
+            low = _COMPRESS_LOW[gone_low]
+            high = _COMPRESS_HIGH[gone >> _LOW_BITS]
+            shift = _ALIVE_LOW[gone_low]
+            key.append((low[north & _LOW_MASK] | high[north >> _LOW_BITS] << shift) << 39
+                       | (low[east & _LOW_MASK] | high[east >> _LOW_BITS] << shift) << 26
+                       | (low[south & _LOW_MASK] | high[south >> _LOW_BITS] << shift) << 13
+                       | low[west & _LOW_MASK] | high[west >> _LOW_BITS] << shift)
+        return tuple(key)
+
+    def _quick_tricks(self, leader):
+        """
+        Tricks the side on lead can take at once, whatever the others
+        do, and the ranks the count depends on.
+
+        The leader cashes their winners in every suit (see _cash); if some
+        suit then lets them cross to partner, partner cashes theirs too.
+        In a trump contract a side suit only counts the rounds both
+        opponents who hold trumps can follow to. Partner's tricks are only
+        counted when partner followed to every round the leader cashed,
+        so partner is never forced to discard a winner.
+        """
+        hands = self.hands
+        trump = self.trump
+        mine = leader * 4
+        partner = (leader + 2) % 4 * 4
+        left_hand = (leader + 1) % 4 * 4
+        right_hand = (leader + 3) % 4 * 4
+        own = partner_tricks = 0
+        own_ranks = partner_ranks = 0
+        partner_follows = True
+        crossing = False
+        for suit in range(4):
+            held = hands[mine + suit]
+            theirs = hands[partner + suit]
+            if not held and not theirs:
+                continue
+            rounds = 13
+            if trump != NOTRUMP and suit != trump:
+                if hands[left_hand + trump]:
+                    rounds = hands[left_hand + suit].bit_count()
+                if hands[right_hand + trump]:
+                    rounds = min(rounds, hands[right_hand + suit].bit_count())
+            cashed, follows, later, cross, lowest = _cash(held, theirs, hands[left_hand + suit],
+                                                          hands[right_hand + suit], rounds)
+            if cashed or later:
+                alive = held | theirs | hands[left_hand + suit] | hands[right_hand + suit]
+                suit_ranks = (alive >> lowest << lowest) << 13 * suit
+                if cashed:
+                    own += cashed
+                    own_ranks |= suit_ranks
+                partner_tricks += later
+                partner_ranks |= suit_ranks
+            partner_follows = partner_follows and follows
+            crossing = crossing or cross
+        if crossing and partner_follows:
+            return own + partner_tricks, own_ranks | partner_ranks
+        return own, own_ranks
+
+    def _moves(self, seat, lead_suit, win_seat, win_suit, win_rank):
+        """Candidate cards for `seat`, one per equivalent group, best guesses first."""
+        hands = self.hands
+        base = seat * 4
+        trick = self._trick
+        if lead_suit >= 0 and hands[base + lead_suit]:
+            suits = (lead_suit,)
+        else:
+            suits = (0, 1, 2, 3)
+
+        if lead_suit < 0:
+            # Leading: top winners first, then low cards from each suit
+            tops = []
+            rest = []
+            for suit in suits:
+                mine = hands[base + suit]
+                if not mine:
+                    continue
+                alive = hands[suit] | hands[4 + suit] | hands[8 + suit] | hands[12 + suit]
+                ranks = _groups(alive, mine)
+                if mine >> _top_bit(alive) & 1:
+                    tops.append((suit, ranks[0]))
+                    ranks = ranks[1:]
+                rest.extend((rank, suit) for rank in ranks)
+            rest.sort()
+            return tops + [(suit, rank) for rank, suit in rest]
+
+        trump = self.trump
+        partner_winning = win_seat % 2 == seat % 2
+        beats = []
+        others = []
+        for suit in suits:
+            mine = hands[base + suit]
+            if not mine:
+                continue
+            alive = hands[suit] | hands[4 + suit] | hands[8 + suit] | hands[12 + suit] | trick[suit]
+            ruff = suit == trump
+            for rank in reversed(_groups(alive, mine)):
+                if partner_winning or not (rank > win_rank if suit == win_suit else ruff):
+                    others.append((ruff, rank, suit))
+                else:
+                    beats.append((ruff, rank, suit))
+        if len(suits) > 1:
+            beats.sort()
+            others.sort()
+        ordered = beats[:1] + others + beats[1:]
+        return [(suit, rank) for _, rank, suit in ordered]
+
+    def _play(self, seat, played, lead_seat, lead_suit, win_seat, win_suit, win_rank, target, first=None):
+        """
+        Search one card of the current trick; returns whether N-S reach
+        `target` and the deciding ranks, as _make does. `first` is a lead
+        to try before the others.
+        """
+        self.nodes += 1
+        hands = self.hands
+        trick = self._trick
+        ns_to_play = seat % 2 == 0
+        moves = self._moves(seat, lead_suit, win_seat, win_suit, win_rank)
+        if first is not None:
+            alive = hands[first[0]] | hands[4 + first[0]] | hands[8 + first[0]] | hands[12 + first[0]]
+            for i, (suit, rank) in enumerate(moves):
+                if suit == first[0] and (alive >> (rank + 1)).bit_count() == first[1]:
+                    moves.insert(0, moves.pop(i))
+                    break
+        ranks = 0
+        for suit, rank in moves:
+            bit = 1 << rank
+            index = seat * 4 + suit
+            hands[index] ^= bit
+            trick[suit] |= bit
+            if played == 0:
+                new_win = (seat, suit, rank)
+            elif (suit == win_suit and rank > win_rank) or (suit == self.trump and win_suit != self.trump):
+                new_win = (seat, suit, rank)
+            else:
+                new_win = (win_seat, win_suit, win_rank)
+
+            if played == 3:
+                self._trick = [0, 0, 0, 0]
+                result, below = self._make(new_win[0], target - (new_win[0] % 2 == 0))
+                self._trick = trick
+                if trick[new_win[1]] != 1 << new_win[2]:
+                    # The winner beat other cards of its suit, so its rank counts
+                    below |= 1 << 13 * new_win[1] + new_win[2]
+            else:
+                result, below = self._play((seat + 1) % 4, played + 1, lead_seat,
+                                           suit if played == 0 else lead_suit, *new_win, target)
+            hands[index] ^= bit
+            trick[suit] &= ~bit
+            if result == ns_to_play:
+                if played == 0:
+                    alive = hands[suit] | hands[4 + suit] | hands[8 + suit] | hands[12 + suit]
+                    self._cut = (suit, (alive >> (rank + 1)).bit_count())
+                return result, below
+            ranks |= below
+        if played == 0:
+            self._cut = None
+        return not ns_to_play, ranks
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def dd_table(hands):
+    """
+    {strain: {declarer: tricks}} for all 20 pairs, memoized by deal hash.
+
+    Each strain is one Solver: the four opening leads share its
+    transposition table, and each answer seeds the next search.
+    """
+    key = deal_hash(hands)
+    with _tables_lock:
+        table = _tables.get(key)
+    if table is not None:
+        return table
+
+    masks = parse_hands(hands)
+    table = {}
+    for strain in STRAINS:
+        solver = Solver(masks, NOTRUMP if strain == 'NT' else SUITS.index(strain))
+        row = {}
+        guess = solver.estimate()
+        for declarer in range(4):
+            # Declarer's left-hand opponent leads
+            ns_tricks = guess = solver.tricks((declarer + 1) % 4, guess)
+            row[SEATS[declarer]] = ns_tricks if declarer % 2 == 0 else 13 - ns_tricks
+        table[strain] = row
+    with _tables_lock:
+        _tables[key] = table
+    return table
+
+
+def is_vulnerable(vul, seat):
+    """Scenario vulnerability ('None', 'N/S', 'E/W', 'Both') for one seat."""
+    if vul in ('Both', 'All'):
+        return True
+    return vul in ('N/S', 'NS') and seat in 'NS' or vul in ('E/W', 'EW') and seat in 'EW'
+
+
+def contract_score(level, strain, tricks, vulnerable=False, doubled=0):
+    """Duplicate score for declarer's side: `tricks` taken in level+strain, doubled 0/1/2."""
+    need = level + 6
+    if tricks < need:
+        down = need - tricks
+        if not doubled:
+            return -down * (100 if vulnerable else 50)
+        if vulnerable:
+            penalty = 200 + 300 * (down - 1)
+        else:
+            penalty = 100 + 200 * min(down - 1, 2) + 300 * max(down - 3, 0)
+        return -penalty * doubled
+
+    per_trick = 20 if strain in ('C', 'D') else 30
+    trick_score = (per_trick * level + (10 if strain == 'NT' else 0)) * (1, 2, 4)[doubled]
+    score = trick_score
+    score += (500 if vulnerable else 300) if trick_score >= 100 else 50
+    if level == 6:
+        score += 750 if vulnerable else 500
+    elif level == 7:
+        score += 1500 if vulnerable else 1000
+    over = tricks - need
+    if doubled:
+        score += 50 * doubled + over * (200 if vulnerable else 100) * doubled
+    else:
+        score += over * per_trick
+    return score
+
+
+def best_contract(table, vul='None'):
+    """
+    The highest-scoring contract that makes double dummy, as
+    {contract, declarer, level, strain, tricks, score}; the lowest level
+    wins ties. Sacrifices are not considered, so this is the side with
+    the stronger hands bidding to its own limit. None if nothing makes.
+    """
+    best = None
+    for strain in STRAINS:
+        for declarer in SEATS:
+            tricks = table[strain][declarer]
+            vulnerable = is_vulnerable(vul, declarer)
+            for level in range(1, tricks - 5):
+                score = contract_score(level, strain, tricks, vulnerable)
+                if best is None or score > best['score']:
+                    best = {'contract': f'{level}{strain} by {declarer}', 'declarer': declarer,
+                            'level': level, 'strain': strain, 'tricks': tricks, 'score': score}
+    return best
+
+
+def score_contract(table, contract, vul='None', side='NS'):
+    """
+    Expected result of a final contract ({level, strain, declarer,
+    doubled} or None for a pass-out) against the optimal one. Scores are
+    from `side`'s point of view ('NS' or 'EW').
+    """
+    optimal = best_contract(table, vul)
+    optimal_score = 0
+    if optimal:
+        optimal_score = optimal['score'] if optimal['declarer'] in side else -optimal['score']
+    if contract is None:
+        return {'contract': 'Passed Out', 'tricks': None, 'result': None, 'side': side, 'score': 0,
+                'optimal': optimal, 'optimal_score': optimal_score, 'difference': -optimal_score}
+
+    declarer = contract['declarer']
+    tricks = table[contract['strain']][declarer]
+    doubled = contract.get('doubled', 0)
+    score = contract_score(contract['level'], contract['strain'], tricks,
+                           is_vulnerable(vul, declarer), doubled)
+    if declarer not in side:
+        score = -score
+    name = f"{contract['level']}{contract['strain']}{('', 'X', 'XX')[doubled]} by {declarer}"
+    return {
+        'contract': name,
+        'tricks': tricks,
+        'result': tricks - contract['level'] - 6,
+        'side': side,
+        'score': score,
+        'optimal': optimal,
+        'optimal_score': optimal_score,
+        'difference': score - optimal_score,
+    }
+
+
+def _solve(hands):
+    start = time.perf_counter()
+    return dd_table(hands), time.perf_counter() - start
+
+
+def annotate(records, workers=1):
+    """
+    dd_table() for every record with hands, on a process pool when
+    workers > 1. Yields (record, table, seconds) in input order.
+    """
+    records = [r for r in records if 'hands' in r]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for record, (table, seconds) in zip(records, pool.map(_solve, [r['hands'] for r in records])):
+                yield record, table, seconds
+    else:
+        for record in records:
+            table, seconds = _solve(record['hands'])
+            yield record, table, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--set', default='full', help='scenario set to annotate')
+    parser.add_argument('--ids', default='', help='comma-separated scenario IDs (default: all)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--write', action='store_true',
+                        help='store dd_tricks and dd_contract (also as optimal_contract) in the scenario file')
+    args = parser.parse_args()
+
+    from scenarios import SCENARIO_FILE, ScenarioStore
+    store = ScenarioStore(SCENARIO_FILE)
+    ids = [i for i in args.ids.split(',') if i]
+    records = []
+    for record in store.scenarios(args.set):
+        if ids and record['id'] not in ids or 'hands' not in record:
+            continue
+        try:
+            parse_hands(record['hands'])
+        except ValueError as e:
+            print(f"{record['id']:<6} skipped: {e}")
+            continue
+        records.append(record)
+
+    start = time.perf_counter()
+    solved = 0
+    for record, table, seconds in annotate(records, args.workers):
+        best = best_contract(table, record.get('vul', 'None'))
+        contract = best['contract'] if best else 'Pass'
+        record['dd_tricks'] = table
+        record['dd_contract'] = contract
+        record['optimal_contract'] = contract
+        solved += 1
+        print(f"{record['id']:<6} {seconds:>6.1f}s  {contract:<10} "
+              + ' '.join(f"{strain}:{''.join('%X' % table[strain][seat] for seat in SEATS)}" for strain in STRAINS),
+              flush=True)
+    elapsed = time.perf_counter() - start
+    if solved:
+        print(f'{solved} deals in {elapsed:.1f}s ({solved / elapsed:.3f} deals/s, {args.workers} workers)')
+
+    if args.write and solved:
+        with open(SCENARIO_FILE, 'w', encoding='utf-8') as f:
+            for record in store.records:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        print(f'Wrote {SCENARIO_FILE}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
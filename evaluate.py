@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation of the bidding model against the scenario answers.
+
+Every scenario's decision point is replayed through the backend's own
+/api/bid, so the prompt, rules engine, reply parsing and repair are
+exactly what players get: the single-bid scenarios with their written
+auctions, the full-auction scenarios at the user's first call after the
+opening (other seats passing). Requests run on a bounded thread pool
+under a shared rate limit, and each finished item is appended to a JSONL
+checkpoint as it completes; rerunning with the same checkpoint skips
+what is already done, so a long sweep survives interruption.
+
+The report gives, per model: accuracy (the answer or an accepted
+alternative), how often the first reply was unusable, p50/p95 latency
+and token cost. --stub swaps the upstream model for an in-process one
+that always passes, for CI runs without an API key.
+
+  python evaluate.py --models haiku,sonnet,auto --workers 8 --rate 4
+  python evaluate.py --stub --checkpoint /tmp/eval-ci.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from model_router import PRICES
+from providers import StubProvider
+
+# Sources that mean the model answered (the rest are local answers)
+MODEL_SOURCES = ('llm', 'repair', 'fallback')
+
+
+def eval_items(store, sets=('single', 'full'), ids=()):
+    """One {key, expected, request} per scenario decision point."""
+    items = []
+    for set_name in sets:
+        for scenario in store.scenarios(set_name):
+            if ids and scenario['id'] not in ids:
+                continue
+            seat = scenario['your_seat']
+            if set_name == 'single':
+                expected = scenario['correct_bid']
+                request = {
+                    'hand': scenario['your_hand'],
+                    'seat': seat,
+                    'auction': [{'seat': b['seat'], 'bid': b['bid']}
+                                for b in scenario['auction'] if b['bid'] != '?'],
+                    'conventions': scenario.get('conventions', []),
+                }
+            else:
+                expected = scenario['correct_first_bid']
+                request = {'scenario_id': scenario['id'], 'seat': seat,
+                           'auction': opening_auction(scenario)}
+            items.append({
+                'key': f"{set_name}/{scenario['id']}",
+                'expected': [expected] + list(scenario.get('alternatives', [])),
+                'request': request,
+            })
+    return items
+
+
+def opening_auction(scenario):
+    """The opening bid and passes round to the user's seat."""
+    seats = ['N', 'E', 'S', 'W']
+    seat = seats.index(scenario['dealer'])
+    auction = [{'seat': scenario['dealer'], 'bid': scenario['opening_bid']}]
+    while seats[(seat + len(auction)) % 4] != scenario['your_seat']:
+        auction.append({'seat': seats[(seat + len(auction)) % 4], 'bid': 'Pass'})
+    return auction
+
+
+class RateLimiter:
+    """Spaces request starts at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = self._clock()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            self._sleep(start - now)
+
+
+class Checkpoint:
+    """Append-only JSONL of finished items, keyed on (model, item key)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        self._lock = threading.Lock()
+        self._newline = False
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    self._newline = not line.endswith('\n')
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by an interruption
+                    self.records[(record['model'], record['key'])] = record
+
+    def done(self, model, key):
+        return (model, key) in self.records
+
+    def add(self, record):
+        with self._lock:
+            self.records[(record['model'], record['key'])] = record
+            if self.path:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write('\n' * self._newline + json.dumps(record, ensure_ascii=False) + '\n')
+                self._newline = False
+
+
+def load_backend(stub=None):
+    """
+    The backend app, as evaluated: no precomputed tree or bid cache, so
+    every model answer is a fresh upstream call, and token usage counted
+    per thread. Returns (backend, usage) where usage() gives the tokens
+    and cost the current thread has used so far, each call priced for
+    the model that served it.
+    """
+    import importlib.util
+
+    os.environ['AUCTION_TREE_PATH'] = ''
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'slam-backend.py')
+    spec = importlib.util.spec_from_file_location('slam_backend', path)
+    backend = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(backend)
+
+    from bid_cache import BidCache
+    from limits import ClientLimiter
+    backend.bid_cache = BidCache(max_entries=0)
+    backend.client_limiter = ClientLimiter(rate=0)  # every request comes from one address
+    post_json = backend.upstream.post_json
+    if stub is not None:
+        backend.ANTHROPIC_API_KEY = backend.ANTHROPIC_API_KEY or 'stub'
+        post_json = stub.post_json
+
+    tokens = threading.local()
+
+    def counted(payload, timeout=None):
+        reply = post_json(payload, timeout=timeout)
+        usage = reply.get('usage', {})
+        price_in, price_out = PRICES.get(payload['model'], (0.0, 0.0))
+        tokens.input = getattr(tokens, 'input', 0) + usage.get('input_tokens', 0)
+        tokens.output = getattr(tokens, 'output', 0) + usage.get('output_tokens', 0)
+        tokens.cost = getattr(tokens, 'cost', 0.0) + (usage.get('input_tokens', 0) * price_in
+                                                      + usage.get('output_tokens', 0) * price_out) / 1e6
+        return reply
+
+    backend.upstream.post_json = counted
+    return backend, lambda: (getattr(tokens, 'input', 0), getattr(tokens, 'output', 0), getattr(tokens, 'cost', 0.0))
+
+
+def evaluate(backend, usage, items, model, checkpoint, workers=4, limiter=None, progress=None):
+    """
+    Ask for every item not yet in the checkpoint under `model` ('haiku',
+    'sonnet' or 'auto', as CLAUDE_MODEL). Returns (model id, number asked);
+    routed runs are recorded as 'auto'.
+    """
+    os.environ['CLAUDE_MODEL'] = model
+    model_id = 'auto' if backend.routing() else backend.choose_model()
+    todo = [item for item in items if not checkpoint.done(model_id, item['key'])]
+    client = backend.app.test_client()
+    limiter = limiter or RateLimiter(0)
+
+    def ask(item):
+        limiter.wait()
+        tokens_before = usage()
+        start = time.perf_counter()
+        response = client.post('/api/bid', json=item['request'])
+        latency = time.perf_counter() - start
+        tokens_after = usage()
+        data = response.get_json(silent=True) or {}
+        record = {
+            'model': model_id,
+            'key': item['key'],
+            'expected': item['expected'],
+            'bid': data.get('bid'),
+            'source': data.get('source'),
+            'answered_by': data.get('model'),
+            'escalated': bool(data.get('escalated')),
+            'correct': data.get('bid') in item['expected'],
+            'latency': round(latency, 4),
+            'input_tokens': tokens_after[0] - tokens_before[0],
+            'output_tokens': tokens_after[1] - tokens_before[1],
+            'cost': tokens_after[2] - tokens_before[2],
+            'error': None if response.status_code == 200 else data.get('error', response.status_code),
+        }
+        checkpoint.add(record)
+        if progress:
+            progress(record)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(ask, todo))
+    return model_id, len(todo)
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def summarize(records):
+    """Per-model report rows from checkpoint records."""
+    by_model = {}
+    for record in records:
+        by_model.setdefault(record['model'], []).append(record)
+    rows = []
+    for model, runs in sorted(by_model.items()):
+        asked = [r for r in runs if r['source'] in MODEL_SOURCES]
+        latencies = sorted(r['latency'] for r in asked) or [0.0]
+        tokens_in = sum(r['input_tokens'] for r in runs)
+        tokens_out = sum(r['output_tokens'] for r in runs)
+        rows.append({
+            'model': model,
+            'items': len(runs),
+            'accuracy': round(sum(r['correct'] for r in runs) / len(runs), 3),
+            'model_items': len(asked),
+            'model_accuracy': round(sum(r['correct'] for r in asked) / len(asked), 3) if asked else None,
+            'parse_failure_rate': round(sum(r['source'] in ('repair', 'fallback') for r in asked) / len(asked), 3)
+                                  if asked else 0.0,
+            'fallbacks': sum(r['source'] == 'fallback' for r in asked),
+            'escalations': sum(r['escalated'] for r in asked),
+            'errors': sum(r['error'] is not None for r in runs),
+            'p50_latency': round(percentile(latencies, 50), 3),
+            'p95_latency': round(percentile(latencies, 95), 3),
+            'input_tokens': tokens_in,
+            'output_tokens': tokens_out,
+            'cost_usd': round(sum(r['cost'] for r in runs), 4),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', default=os.environ.get('CLAUDE_MODEL', 'haiku'),
+                        help='comma-separated CLAUDE_MODEL values')
+    parser.add_argument('--sets', default='single,full')
+    parser.add_argument('--ids', default='', help='comma-separated scenario IDs (default: all)')
+    parser.add_argument('--workers', type=int, default=4, help='requests in flight')
+    parser.add_argument('--rate', type=float, default=2.0, help='requests started per second (0: no limit)')
+    parser.add_argument('--checkpoint', default='evaluation.jsonl', help='results so far; resumed if present')
+    parser.add_argument('--fresh', action='store_true', help='discard the checkpoint and start over')
+    parser.add_argument('--stub', action='store_true', help='in-process stub model, no API key needed')
+    parser.add_argument('--stub-latency', type=float, default=0.0)
+    parser.add_argument('--json', help='also write the summary here')
+    parser.add_argument('--verbose', action='store_true', help='print each answer')
+    args = parser.parse_args()
+
+    if args.fresh and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    stub = StubProvider(latency=args.stub_latency) if args.stub else None
+    backend, usage = load_backend(stub)
+    if not backend.provider_ready():
+        print('No LLM provider configured (use --stub for a dry run)')
+        return 1
+
+    from scenarios import get_store
+    items = eval_items(get_store(), [s for s in args.sets.split(',') if s],
+                       [i for i in args.ids.split(',') if i])
+    checkpoint = Checkpoint(args.checkpoint)
+    limiter = RateLimiter(args.rate)
+
+    def progress(record):
+        if args.verbose:
+            mark = 'ok' if record['correct'] else f"expected {'/'.join(record['expected'])}"
+            print(f"  {record['key']:<12} {record['bid'] or '-':<5} {record['source'] or '-':<8} "
+                  f"{record['latency']:6.2f}s  {mark}", flush=True)
+
+    ids = set()
+    for model in [m for m in args.models.split(',') if m]:
+        start = time.perf_counter()
+        model_id, asked = evaluate(backend, usage, items, model, checkpoint, args.workers, limiter, progress)
+        ids.add(model_id)
+        print(f'{model_id}: {asked} items asked, {len(items) - asked} from checkpoint '
+              f'({time.perf_counter() - start:.1f}s)')
+
+    keys = {item['key'] for item in items}
+    rows = summarize(r for (model, key), r in checkpoint.records.items() if model in ids and key in keys)
+
+    print(f"\n{'model':<28} {'items':>5} {'acc':>6} {'model acc':>9} {'unusable':>8} "
+          f"{'p50':>7} {'p95':>7} {'tokens in/out':>15} {'cost':>8}")
+    for row in rows:
+        model_accuracy = '-' if row['model_accuracy'] is None else f"{row['model_accuracy']:.1%}"
+        print(f"{row['model']:<28} {row['items']:>5} {row['accuracy']:>6.1%} {model_accuracy:>9} "
+              f"{row['parse_failure_rate']:>8.1%} {row['p50_latency']:>6.2f}s {row['p95_latency']:>6.2f}s "
+              f"{row['input_tokens']:>7}/{row['output_tokens']:<7} ${row['cost_usd']:>7.4f}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+    return 1 if any(row['errors'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Gunicorn settings for the SLAM Bridge backend.
+
+Usage:
+  gunicorn slam-backend:app -c gunicorn.conf.py
+
+SLAM_SERVING_MODE picks the worker model:
+- 'async' (default): gevent workers. While /api/bid waits on the LLM the
+  request yields to the event loop instead of blocking, so one worker can
+  hold hundreds of in-flight upstream calls.
+- 'threaded': gthread workers with SLAM_THREADS threads each. Every
+  open /ws/table socket holds a thread, so prefer 'async' for tables.
+- 'sync': one request per worker (the old behaviour).
+
+/ws/table sessions live in the memory of the worker that started them,
+so an observer can only watch a table held by the worker it lands on.
+'async' therefore defaults to a single worker (WEB_CONCURRENCY=1), which
+holds every table; with more workers classroom watching fails whenever
+the instructor and an observer land on different workers.
+"""
+
+import os
+
+serving_mode = os.environ.get('SLAM_SERVING_MODE', 'async').lower()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '1' if serving_mode == 'async' else '2'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+keepalive = 5
+
+if serving_mode == 'async':
+    worker_class = 'gevent'
+    worker_connections = int(os.environ.get('WORKER_CONNECTIONS', '1000'))
+    # Many in-flight bids per worker need many pooled upstream connections
+    os.environ.setdefault('UPSTREAM_POOL_SIZE', '200')
+elif serving_mode == 'threaded':
+    worker_class = 'gthread'
+    threads = int(os.environ.get('SLAM_THREADS', '16'))
+else:
+    worker_class = 'sync'
+
+
+def when_ready(server):
+    if workers > 1:
+        server.log.warning('WEB_CONCURRENCY=%d: /ws/table observers only see tables started on '
+                           'their own worker', workers)
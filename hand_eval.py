@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Hand evaluation: HCP, shape, losing tricks, quick tricks, controls and
+stoppers, for one hand or a batch of millions.
+
+A hand is a 52-bit mask in the deal generator's deck order (bit
+13 * suit + rank, suits S H D C, ranks A K Q ... 2), so each suit's
+holding is 13 bits with the ace lowest. Every per-suit value is read
+from a table with one entry per possible holding (8192), built once at
+import. One hand costs four shifts and a few lookups. For a batch, each
+suit's table packs every value into bit fields of one uint64 that can be
+summed across suits without carrying into the next field, so a batch is
+four numpy gathers, three additions and some shifts.
+
+The values:
+
+- hcp: A 4, K 3, Q 2, J 1.
+- distribution: 'balanced' (4-3-3-3, 4-4-3-2, 5-3-3-2), 'semi_balanced'
+  (5-4-2-2, 6-3-2-2), 'single_suited' (a 6+ suit and no other 4+),
+  'two_suited' (5-4 or longer) or 'three_suited' (4-4-4-1, 5-4-4-0).
+- ltc: losing-trick count, the missing A, K and Q among a suit's top
+  min(length, 3) cards, summed.
+- quick_tricks: per suit AK 2, AQ 1.5, A 1, KQ 1, Kx 0.5.
+- controls: A 2, K 1.
+- stoppers: suits held with A, Kx, Qxx or Jxxx.
+
+Usage:
+  python hand_eval.py            # every scenario's user hand, and any bad deals
+"""
+
+import argparse
+import itertools
+import sys
+
+import numpy as np
+
+SUITS = ['S', 'H', 'D', 'C']
+RANKS = 'AKQJT98765432'
+DISTRIBUTIONS = ('balanced', 'semi_balanced', 'single_suited', 'two_suited', 'three_suited')
+
+HOLDING_BITS = 13
+HOLDING_MASK = (1 << HOLDING_BITS) - 1
+_SHIFTS = np.arange(4, dtype=np.uint64) * np.uint64(HOLDING_BITS)
+
+_ACE, _KING, _QUEEN, _JACK = 1, 2, 4, 8
+
+
+def _holding_values(holding):
+    """(length, hcp, losers, quick tricks in halves, controls, stopped) of one suit."""
+    length = bin(holding).count('1')
+    ace, king, queen, jack = (bool(holding & bit) for bit in (_ACE, _KING, _QUEEN, _JACK))
+    hcp = 4 * ace + 3 * king + 2 * queen + jack
+    top = min(length, 3)
+    losers = top - sum((ace, king, queen)[:top])
+    if ace:
+        quick = 4 if king else 3 if queen else 2
+    else:
+        quick = 2 if king and queen else 1 if king and length >= 2 else 0
+    stopped = ace or (king and length >= 2) or (queen and length >= 3) or (jack and length >= 4)
+    return length, hcp, losers, quick, 2 * ace + king, int(stopped)
+
+
+# Per-holding tables for single hands
+LENGTH, HCP, LOSERS, QUICK_HALVES, CONTROLS, STOPPED = zip(*(_holding_values(h) for h in range(1 << HOLDING_BITS)))
+
+# Bit fields (offset, width) of the packed per-suit tables. The summed
+# fields fit their totals (40 HCP, 12 losers, 16 quick-trick halves, 12
+# controls); stoppers and lengths get a field per suit; 'pattern' sums
+# to the suit lengths in base 14.
+_FIELDS = {'hcp': (0, 6), 'ltc': (6, 4), 'quick': (10, 5), 'controls': (15, 4), 'stoppers': (19, 4),
+           'pattern': (23, 16), 'lengths': (39, 16)}
+_PATTERN_BASE = np.array([14 ** 3, 14 ** 2, 14, 1])
+
+
+def _packed_table(suit):
+    values = np.array([LENGTH, HCP, LOSERS, QUICK_HALVES, CONTROLS, STOPPED], dtype=np.uint64)
+    length, points, losers, quick, controls, stopped = values
+    shifts = {name: np.uint64(offset) for name, (offset, _) in _FIELDS.items()}
+    return ((points << shifts['hcp']) | (losers << shifts['ltc']) | (quick << shifts['quick'])
+            | (controls << shifts['controls']) | (stopped << (shifts['stoppers'] + np.uint64(suit)))
+            | ((length * np.uint64(_PATTERN_BASE[suit])) << shifts['pattern'])
+            | (length << (shifts['lengths'] + np.uint64(4 * suit))))
+
+
+_PACKED = [_packed_table(suit) for suit in range(4)]
+
+
+def _distribution(lengths):
+    pattern = sorted(lengths, reverse=True)
+    if pattern in ([4, 3, 3, 3], [4, 4, 3, 2], [5, 3, 3, 2]):
+        return 'balanced'
+    if pattern in ([5, 4, 2, 2], [6, 3, 2, 2]):
+        return 'semi_balanced'
+    if pattern[2] >= 4:
+        return 'three_suited'
+    if pattern[1] >= 4:
+        return 'two_suited'
+    return 'single_suited'
+
+
+# Distribution index by lengths in base 14 (S H D C), -1 for impossible lengths
+DISTRIBUTION_INDEX = np.full(14 ** 4, -1, dtype=np.int8)
+for _lengths in itertools.product(range(14), repeat=4):
+    if sum(_lengths) == 13:
+        DISTRIBUTION_INDEX[int(np.dot(_lengths, _PATTERN_BASE))] = DISTRIBUTIONS.index(_distribution(_lengths))
+
+
+def suit_cards(holding):
+    """Split a suit string into ranks, treating "10" as a single card."""
+    holding = (holding or '').replace('10', 'T').replace('-', '').strip()
+    return [c for c in holding.upper() if c in RANKS]
+
+
+def pack_hand(hand):
+    """A {S, H, D, C} hand as a 52-bit mask; ValueError for a card given twice."""
+    mask = 0
+    for suit_index, suit in enumerate(SUITS):
+        for card in suit_cards(hand.get(suit, '')):
+            bit = 1 << (HOLDING_BITS * suit_index + RANKS.index(card))
+            if mask & bit:
+                raise ValueError(f'{suit}{card} appears twice')
+            mask |= bit
+    return mask
+
+
+def unpack_hand(mask):
+    """A 52-bit mask as {S, H, D, C} strings in rank order; a void is "-"."""
+    return {suit: ''.join(RANKS[r] for r in range(HOLDING_BITS) if holding >> r & 1) or '-'
+            for suit, holding in zip(SUITS, holdings(mask))}
+
+
+def unpack_cards(mask):
+    """The cards in a mask as 'SA', 'HT' ..., in deck order."""
+    return [SUITS[bit // HOLDING_BITS] + RANKS[bit % HOLDING_BITS]
+            for bit in range(4 * HOLDING_BITS) if mask >> bit & 1]
+
+
+def holdings(mask):
+    """The four 13-bit suit holdings of one hand, S H D C."""
+    return [(mask >> (HOLDING_BITS * s)) & HOLDING_MASK for s in range(4)]
+
+
+def _as_mask(hand):
+    return hand if isinstance(hand, int) else pack_hand(hand)
+
+
+def hcp(hand):
+    """High-card points of a hand (dict or mask)."""
+    return sum(HCP[h] for h in holdings(_as_mask(hand)))
+
+
+def suit_lengths(hand):
+    return dict(zip(SUITS, (LENGTH[h] for h in holdings(_as_mask(hand)))))
+
+
+def evaluate(hand):
+    """Every value for one hand (dict or mask), as plain Python types."""
+    suits = holdings(_as_mask(hand))
+    lengths = [LENGTH[h] for h in suits]
+    return {
+        'hcp': sum(HCP[h] for h in suits),
+        'lengths': dict(zip(SUITS, lengths)),
+        'shape': '-'.join(str(n) for n in sorted(lengths, reverse=True)),
+        'distribution': _distribution(lengths) if sum(lengths) == 13 else None,
+        'ltc': sum(LOSERS[h] for h in suits),
+        'quick_tricks': sum(QUICK_HALVES[h] for h in suits) / 2,
+        'controls': sum(CONTROLS[h] for h in suits),
+        'stoppers': [suit for suit, h in zip(SUITS, suits) if STOPPED[h]],
+    }
+
+
+def _field(total, name):
+    offset, width = _FIELDS[name]
+    return (total >> np.uint64(offset)) & np.uint64((1 << width) - 1)
+
+
+def evaluate_batch(masks):
+    """
+    Every value for a batch of hand masks, as arrays: hcp, ltc, controls,
+    quick_tricks (float), distribution (index into DISTRIBUTIONS, -1 if
+    not 13 cards) and stoppers (bit s set for suit s) of shape (n,), and
+    lengths of shape (n, 4).
+    """
+    masks = np.asarray(masks, dtype=np.uint64)
+    total = np.zeros(len(masks), dtype=np.uint64)
+    for suit, table in enumerate(_PACKED):
+        holding = (masks >> np.uint64(HOLDING_BITS * suit)) & np.uint64(HOLDING_MASK)
+        total += table[holding.astype(np.intp)]
+    lengths = (_field(total, 'lengths')[:, None] >> np.arange(0, 16, 4, dtype=np.uint64)) & np.uint64(15)
+    # The lengths in base 14 index the distribution table directly
+    distribution = DISTRIBUTION_INDEX[_field(total, 'pattern').astype(np.intp)]
+    return {
+        'hcp': _field(total, 'hcp').astype(np.int16),
+        'lengths': lengths.astype(np.int8),
+        'distribution': distribution,
+        'ltc': _field(total, 'ltc').astype(np.int16),
+        'quick_tricks': _field(total, 'quick').astype(np.int16) / 2,
+        'controls': _field(total, 'controls').astype(np.int16),
+        'stoppers': _field(total, 'stoppers').astype(np.int8),
+    }
+
+
+def is_balanced(lengths):
+    """Boolean mask of the (n, 4) suit lengths that are 4-3-3-3, 4-4-3-2 or 5-3-3-2."""
+    lengths = np.asarray(lengths)
+    return (lengths.max(axis=1) <= 5) & (lengths.min(axis=1) >= 2) & ((lengths == 2).sum(axis=1) <= 1)
+
+
+def deal_problems(hands):
+    """What is wrong with a {seat: hand} deal: hands without 13 cards, cards dealt twice."""
+    problems = []
+    seen = 0
+    for seat, hand in hands.items():
+        try:
+            mask = pack_hand(hand)
+        except ValueError as e:
+            problems.append(f'{seat}: {e}')
+            continue
+        count = bin(mask).count('1')
+        if count != 13:
+            problems.append(f'{seat} holds {count} cards')
+        for card in unpack_cards(mask & seen):
+            problems.append(f'{card} dealt twice')
+        seen |= mask
+    return problems
+
+
+def main():
+    from scenarios import ScenarioStore
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--set', default='full', choices=['full', 'single'])
+    args = parser.parse_args()
+
+    bad = 0
+    for scenario in ScenarioStore().scenarios(args.set):
+        seat = scenario['your_seat']
+        hands = scenario.get('hands') or {seat: scenario['your_hand']}
+        values = evaluate(hands[seat])
+        print(f"{scenario['id']:<4} {seat} {values['hcp']:>2} HCP {values['shape']:<8} "
+              f"{values['distribution'] or '-':<14} LTC {values['ltc']:>2}  QT {values['quick_tricks']:<4} "
+              f"controls {values['controls']}  stoppers {''.join(values['stoppers']) or '-'}")
+        problems = deal_problems(hands)
+        if problems:
+            bad += 1
+            print(f"     {'; '.join(problems)}")
+    return 1 if bad else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
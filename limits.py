@@ -0,0 +1,152 @@
+"""
+Admission control and spend accounting for the bid endpoints.
+
+- ClientLimiter: a token bucket per client address, so one client
+  hammering /api/bid cannot use up the upstream rate limit for everyone
+- ConcurrencyLimit: a cap on upstream calls in flight; a call over the
+  cap is refused at once (429) rather than queued behind the others
+- TokenLedger: rolling input/output token and cost totals per model
+
+Refusals are cheap: a dictionary lookup under a lock, no I/O.
+"""
+
+import collections
+import math
+import threading
+import time
+
+
+class ClientLimiter:
+    """
+    Token bucket per key: `rate` requests per second on average, bursts
+    of up to `burst`. The least recently seen keys are dropped beyond
+    `max_clients`, which only ever resets a client to a full bucket.
+    """
+
+    def __init__(self, rate=1.0, burst=30, max_clients=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets = collections.OrderedDict()  # key -> (tokens, updated)
+        self.allowed = 0
+        self.limited = 0
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def allow(self, key):
+        """Return (allowed, seconds until the next request would be)."""
+        if not self.enabled:
+            return True, 0.0
+        now = self._clock()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+                self.allowed += 1
+            else:
+                self.limited += 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / self.rate
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate_per_second': self.rate,
+                'burst': self.burst,
+                'clients': len(self._buckets),
+                'allowed': self.allowed,
+                'limited': self.limited,
+            }
+
+
+class ConcurrencyLimit:
+    """Non-blocking cap on concurrent work; limit 0 means unlimited."""
+
+    def __init__(self, limit=0):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.rejected = 0
+
+    def try_acquire(self):
+        with self._lock:
+            if self.limit and self.in_flight >= self.limit:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {'limit': self.limit, 'in_flight': self.in_flight,
+                    'peak': self.peak, 'rejected': self.rejected}
+
+
+class TokenLedger:
+    """
+    Tokens and cost per model over the last `window` seconds, kept in
+    `bucket`-second slots, plus running totals since startup. `prices`
+    maps a model to USD per million (input, output) tokens.
+    """
+
+    def __init__(self, prices=None, window=3600, bucket=60, clock=time.time):
+        self.prices = prices or {}
+        self.window = window
+        self.bucket = bucket
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._slots = collections.deque()  # (slot start, {model: [calls, input, output, cost]})
+        self._totals = {}
+
+    def record(self, model, input_tokens, output_tokens):
+        price_in, price_out = self.prices.get(model, (0.0, 0.0))
+        cost = (input_tokens * price_in + output_tokens * price_out) / 1e6
+        now = self._clock()
+        start = math.floor(now / self.bucket) * self.bucket
+        with self._lock:
+            if not self._slots or self._slots[-1][0] != start:
+                self._slots.append((start, {}))
+            self._expire(now)
+            for counts in (self._slots[-1][1], self._totals):
+                row = counts.setdefault(model, [0, 0, 0, 0.0])
+                row[0] += 1
+                row[1] += input_tokens
+                row[2] += output_tokens
+                row[3] += cost
+
+    def _expire(self, now):
+        # A slot goes once all of it is older than the window
+        while self._slots and self._slots[0][0] + self.bucket <= now - self.window:
+            self._slots.popleft()
+
+    @staticmethod
+    def _report(counts):
+        models = {model: {'calls': calls, 'input_tokens': tokens_in, 'output_tokens': tokens_out,
+                          'cost_usd': round(cost, 6)}
+                  for model, (calls, tokens_in, tokens_out, cost) in counts.items()}
+        return {'models': models, 'cost_usd': round(sum(row[3] for row in counts.values()), 6)}
+
+    def stats(self):
+        with self._lock:
+            self._expire(self._clock())
+            recent = {}
+            for _, counts in self._slots:
+                for model, row in counts.items():
+                    total = recent.setdefault(model, [0, 0, 0, 0.0])
+                    for i, value in enumerate(row):
+                        total[i] += value
+            return dict(self._report(recent), window_seconds=self.window, lifetime=self._report(self._totals))
@@ -0,0 +1,93 @@
+"""
+Cheap-first model routing for structured bid requests.
+
+Most calls an AI seat makes are routine - a pass over partner's opening,
+a simple response in an uncontested auction - and the fast model gets
+them right. ModelRouter sends those to the cheap model and only hands the
+strong model the auctions a small model tends to get wrong: long ones,
+contested ones and slam-level ones. A cheap answer that fails validation
+is escalated to the strong model instead of repaired. Every choice is
+counted, with latency per route, so the thresholds can be tuned against
+the evaluation harness (python evaluate.py --models haiku,sonnet,auto).
+"""
+
+import threading
+
+from auction import bid_rank, is_contract
+
+MODELS = {
+    'haiku': 'claude-3-5-haiku-20241022',
+    'sonnet': 'claude-sonnet-4-20250514',
+}
+
+# USD per million input / output tokens
+PRICES = {
+    MODELS['haiku']: (0.80, 4.00),
+    MODELS['sonnet']: (3.00, 15.00),
+}
+
+SLAM_ZONE = bid_rank('4NT')  # Blackwood and above
+
+
+def difficulty(auction, long_auction=6):
+    """Reasons an auction is hard enough for the strong model (empty if none)."""
+    reasons = []
+    if len(auction) >= long_auction:
+        reasons.append('long')
+    sides = {entry['seat'] in 'NS' for entry in auction if entry['bid'] != 'Pass'}
+    if len(sides) == 2:
+        reasons.append('contested')
+    if any(is_contract(entry['bid']) and bid_rank(entry['bid']) >= SLAM_ZONE for entry in auction):
+        reasons.append('slam')
+    return reasons
+
+
+class ModelRouter:
+    """Pick the cheap or strong model per request and keep route statistics."""
+
+    ROUTES = ('cheap', 'strong', 'escalated')
+
+    def __init__(self, cheap=MODELS['haiku'], strong=MODELS['sonnet'], long_auction=6):
+        self.cheap = cheap
+        self.strong = strong
+        self.long_auction = long_auction
+        self._lock = threading.Lock()
+        self.reasons = {}
+        self.counts = dict.fromkeys(self.ROUTES, 0)
+        self.seconds = dict.fromkeys(self.ROUTES, 0.0)
+
+    def route(self, auction):
+        """Return (model, escalate_to): the model to ask first and its fallback."""
+        reasons = difficulty(auction, self.long_auction)
+        if reasons:
+            with self._lock:
+                for reason in reasons:
+                    self.reasons[reason] = self.reasons.get(reason, 0) + 1
+            return self.strong, None
+        return self.cheap, self.strong
+
+    def record(self, result, seconds):
+        """Count one answered request by the route it ended up taking."""
+        if result.get('escalated'):
+            route = 'escalated'
+        else:
+            route = 'strong' if result.get('model') == self.strong else 'cheap'
+        with self._lock:
+            self.counts[route] += 1
+            self.seconds[route] += seconds
+
+    def stats(self):
+        with self._lock:
+            total = sum(self.counts.values())
+            cheap_first = self.counts['cheap'] + self.counts['escalated']
+            return {
+                'cheap': self.cheap,
+                'strong': self.strong,
+                'requests': total,
+                'routes': dict(self.counts),
+                'reasons': dict(self.reasons),
+                'strong_share': round((self.counts['strong'] + self.counts['escalated']) / total, 3) if total else 0.0,
+                'escalation_rate': round(self.counts['escalated'] / cheap_first, 3) if cheap_first else 0.0,
+                'mean_latency': {route: round(self.seconds[route] / self.counts[route], 3)
+                                 for route in self.ROUTES if self.counts[route]},
+            }
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Server-side prompt construction for AI bids.
+
+The browser used to build a ~3 KB prompt for every call, most of it
+boilerplate. Now it sends {scenario_id, seat, auction} and the backend
+renders a compact prompt from precompiled templates:
+
+- a static system preamble (roles, legality, JSON reply format) plus one
+  block per enabled convention. These are identical across calls for the
+  same convention set, so they go first and carry cache_control, letting
+  the API reuse the prefix once it is long enough to qualify.
+- a short per-call user message with the hand and the auction.
+
+Run `python prompts.py` for a byte/token budget report per template.
+"""
+
+import json
+from functools import lru_cache
+from string import Template
+
+from auction import SEATS, partner_of
+from hand_eval import evaluate, pack_hand, suit_cards
+
+# Rough rule of thumb for English prompt text
+BYTES_PER_TOKEN = 4
+
+PREAMBLE = """\
+You bid one seat in a Standard American bridge auction.
+N-S are partners against E-W. Bids by your partner are cooperative; \
+conventions used by the opponents are not addressed to you.
+You hold only the cards listed. "T" is the ten.
+A call is Pass, X, XX, or a bid higher than the last bid \
+(C < D < H < S < NT within a level).
+Reply with ONLY this JSON, no other text:
+{"bid": "<call>", "reasoning": "<one short sentence>"}
+Calls use letters: Pass, X, XX, 1C, 1D, 1H, 1S, 1NT ... 7NT."""
+
+CONVENTION_BLOCKS = {
+    'stayman': """\
+Stayman: after YOUR side's 1NT opening, partner's 2C asks opener for a \
+4-card major. Opener must answer, even over a double: 2H with 4+ hearts \
+(2H first with both majors), 2S with 4 spades, else 2D. Over an overcall, \
+answer at the cheapest level. An opponent's 2C is not Stayman.""",
+    'transfers': """\
+Jacoby transfers: after YOUR side's 1NT opening, partner's 2D shows \
+hearts (opener must bid 2H) and 2H shows spades (opener must bid 2S).""",
+}
+
+USER_TEMPLATE = Template("""\
+You are $seat. Partner: $partner. Opponents: $opponents.
+Hand: $hand
+Values: $values
+Auction:
+$auction
+${note}\
+Your call?""")
+
+OPPONENT_STAYMAN_NOTE = (
+    "Note: the last 2C was bid by an OPPONENT. Do not answer it as Stayman.\n"
+)
+
+
+@lru_cache(maxsize=None)
+def system_blocks(conventions):
+    """System blocks for a (sorted tuple of) convention names; cached per set."""
+    texts = [PREAMBLE] + [CONVENTION_BLOCKS[c] for c in conventions if c in CONVENTION_BLOCKS]
+    blocks = [{'type': 'text', 'text': text} for text in texts]
+    blocks[-1] = dict(blocks[-1], cache_control={'type': 'ephemeral'})
+    return tuple(blocks)
+
+
+def format_hand(hand):
+    parts = []
+    for suit in 'SHDC':
+        cards = suit_cards(hand.get(suit, ''))
+        parts.append(f"{suit} {''.join(cards) or '-'} ({len(cards)})")
+    return ', '.join(parts)
+
+
+def format_values(values):
+    """The hand's evaluation in one line, so the model does not have to count."""
+    stoppers = ' '.join(values['stoppers']) or 'none'
+    shape = values['shape']
+    if values['distribution']:
+        shape += ' ' + values['distribution'].replace('_', '-')
+    return (f"{values['hcp']} HCP, {shape}, "
+            f"{values['ltc']} losers, {values['quick_tricks']:g} quick tricks, "
+            f"{values['controls']} controls, stoppers {stoppers}")
+
+
+def format_auction(seat, auction):
+    if not auction:
+        return '(no calls yet)'
+    partner = partner_of(seat)
+    labels = {seat: 'you', partner: 'partner'}
+    return '\n'.join(f"{b['seat']} {b['bid']} ({labels.get(b['seat'], 'opp')})" for b in auction)
+
+
+def render_user_message(seat, hand, auction, conventions=()):
+    """Render the per-call part of the prompt."""
+    partner = partner_of(seat)
+    note = ''
+    if auction and 'stayman' in conventions:
+        last = auction[-1]
+        if last['bid'] == '2C' and last['seat'] not in (seat, partner):
+            note = OPPONENT_STAYMAN_NOTE
+    return USER_TEMPLATE.substitute(
+        seat=seat,
+        partner=partner,
+        opponents=' and '.join(s for s in SEATS if s not in (seat, partner)),
+        hand=format_hand(hand),
+        values=format_values(evaluate(pack_hand(hand))),
+        auction=format_auction(seat, auction),
+        note=note,
+    )
+
+
+def build_bid_request(model, seat, hand, auction, conventions=(), max_tokens=300):
+    """Build the Messages API request body for one AI bid."""
+    conventions = tuple(sorted(set(conventions or ())))
+    return {
+        'model': model,
+        'max_tokens': max_tokens,
+        'system': [dict(block) for block in system_blocks(conventions)],
+        'messages': [
+            {'role': 'user', 'content': render_user_message(seat, hand, auction, conventions)}
+        ],
+    }
+
+
+def request_text(payload):
+    """All prompt text in a request body, in order (used for cache keys)."""
+    system = payload.get('system', '')
+    if isinstance(system, list):
+        system = '\n'.join(block['text'] for block in system)
+    messages = '\n'.join(m['content'] for m in payload.get('messages', []))
+    return f'{system}\n{messages}' if system else messages
+
+
+def budget_report(sample_seat='N', sample_hand=None, sample_auction=None):
+    """
+    Byte and estimated-token cost of each template.
+
+    The static prefix is paid once per convention set when prompt caching
+    applies; the per-call message is paid on every bid.
+    """
+    hand = sample_hand or {'S': 'A105', 'H': 'KQ84', 'D': 'AQ6', 'C': 'K73'}
+    auction = sample_auction or [
+        {'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'},
+        {'seat': 'S', 'bid': '2C'}, {'seat': 'W', 'bid': 'Pass'},
+    ]
+    report = []
+    for conventions in [(), ('stayman',), ('transfers',), ('stayman', 'transfers')]:
+        prefix = sum(len(b['text'].encode()) for b in system_blocks(conventions))
+        message = len(render_user_message(sample_seat, hand, auction, conventions).encode())
+        report.append({
+            'template': '+'.join(conventions) or 'base',
+            'prefix_bytes': prefix,
+            'prefix_tokens': prefix // BYTES_PER_TOKEN,
+            'message_bytes': message,
+            'message_tokens': message // BYTES_PER_TOKEN,
+            'total_tokens': (prefix + message) // BYTES_PER_TOKEN,
+        })
+    client_request = json.dumps({'scenario_id': 'U01', 'seat': sample_seat, 'auction': auction})
+    return {'templates': report, 'client_request_bytes': len(client_request.encode())}
+
+
+if __name__ == '__main__':
+    budget = budget_report()
+    print(f"{'template':<20}{'prefix B':>10}{'prefix tok':>12}{'message B':>11}{'message tok':>13}{'total tok':>11}")
+    for row in budget['templates']:
+        print(f"{row['template']:<20}{row['prefix_bytes']:>10}{row['prefix_tokens']:>12}"
+              f"{row['message_bytes']:>11}{row['message_tokens']:>13}{row['total_tokens']:>11}")
+    print(f"\nBrowser -> backend request body: {budget['client_request_bytes']} bytes")
@@ -0,0 +1,434 @@
+"""
+LLM providers behind one interface, and a router that picks between them.
+
+Every adapter takes a Messages API request body (what prompts.py builds)
+and returns a Messages API reply or event stream, so the rest of the
+backend never sees which provider answered:
+
+- AnthropicProvider: the Messages API itself
+- OpenAICompatibleProvider: any /chat/completions endpoint (Groq, OpenAI,
+  Ollama, LM Studio), with requests and replies translated
+- StubProvider: an in-process canned answer for tests and benchmarks
+
+Each HTTP adapter owns its own pooled UpstreamClient (connections,
+timeouts, retries, circuit breaker). ProviderRouter keeps a rolling
+latency and error record per provider, sends each call to the fastest
+healthy one and fails over to the next on an error or timeout.
+"""
+
+import collections
+import contextlib
+import itertools
+import random
+import threading
+import time
+
+from metrics import stage_seconds
+from model_router import MODELS
+from upstream import CircuitBreaker, UpstreamClient, UpstreamError
+
+DEFAULT_URLS = {
+    'anthropic': 'https://api.anthropic.com/v1/messages',
+    'groq': 'https://api.groq.com/openai/v1/chat/completions',
+    'openai': 'https://api.openai.com/v1/chat/completions',
+    'ollama': 'http://localhost:11434/v1/chat/completions',
+}
+
+DEFAULT_MODELS = {
+    'groq': 'llama-3.1-8b-instant',
+    'openai': 'gpt-4o-mini',
+    'ollama': 'llama3.1',
+}
+
+STUB_TEXT = '{"bid": "Pass", "reasoning": "Stub provider always passes"}'
+
+
+def make_message(model, text, input_tokens=0, output_tokens=0):
+    """A Messages API reply body."""
+    return {
+        'type': 'message',
+        'role': 'assistant',
+        'model': model,
+        'content': [{'type': 'text', 'text': text}],
+        'stop_reason': 'end_turn',
+        'usage': {'input_tokens': input_tokens, 'output_tokens': output_tokens},
+    }
+
+
+def text_delta(text):
+    return 'content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                   'delta': {'type': 'text_delta', 'text': text}}
+
+
+class AnthropicProvider:
+    """The Messages API, passed through unchanged."""
+
+    kind = 'anthropic'
+
+    def __init__(self, name, url, api_key, **client_options):
+        self.name = name
+        self.client = UpstreamClient(url, headers={
+            'Content-Type': 'application/json',
+            'x-api-key': api_key,
+            'anthropic-version': '2023-06-01',
+        }, **client_options)
+
+    def available(self):
+        return self.client.breaker.state != CircuitBreaker.OPEN
+
+    def post_json(self, payload, timeout=None):
+        return self.client.post_json(payload, timeout)
+
+    def stream_events(self, payload, timeout=None):
+        return self.client.stream_events(payload, timeout)
+
+    def stats(self):
+        return self.client.stats()
+
+
+class OpenAICompatibleProvider:
+    """
+    A /chat/completions endpoint. `model` answers every request unless
+    `models` maps the requested Messages API model to another one.
+    """
+
+    kind = 'openai'
+
+    def __init__(self, name, url, api_key=None, model=None, models=None, **client_options):
+        self.name = name
+        self.model = model
+        self.models = models or {}
+        headers = {'Content-Type': 'application/json'}
+        if api_key:
+            headers['Authorization'] = f'Bearer {api_key}'
+        self.client = UpstreamClient(url, headers=headers, **client_options)
+
+    def available(self):
+        return self.client.breaker.state != CircuitBreaker.OPEN
+
+    def request(self, payload):
+        """Chat Completions body for a Messages API body."""
+        messages = []
+        system = payload.get('system')
+        if isinstance(system, list):
+            system = '\n'.join(block['text'] for block in system)
+        if system:
+            messages.append({'role': 'system', 'content': system})
+        messages.extend({'role': m['role'], 'content': m['content']} for m in payload.get('messages', []))
+        body = {
+            'model': self.models.get(payload['model'], self.model or payload['model']),
+            'messages': messages,
+            'max_tokens': payload.get('max_tokens', 300),
+        }
+        if 'temperature' in payload:
+            body['temperature'] = payload['temperature']
+        return body
+
+    def post_json(self, payload, timeout=None):
+        reply = self.client.post_json(self.request(payload), timeout)
+        choices = reply.get('choices') or [{}]
+        usage = reply.get('usage') or {}
+        return make_message(reply.get('model', payload['model']),
+                            (choices[0].get('message') or {}).get('content') or '',
+                            usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0))
+
+    def stream_events(self, payload, timeout=None):
+        """Chat Completions chunks as Messages API text deltas."""
+        for _, chunk in self.client.stream_events(self.request(payload), timeout):
+            for choice in chunk.get('choices') or []:
+                text = (choice.get('delta') or {}).get('content')
+                if text:
+                    yield text_delta(text)
+        yield 'message_stop', {'type': 'message_stop'}
+
+    def stats(self):
+        return dict(self.client.stats(), model=self.model)
+
+
+class StubProvider:
+    """
+    Canned answers after `latency` seconds, in process. `error_rate` of
+    calls fail, and a call slower than its read timeout times out, so
+    degraded providers can be simulated.
+    """
+
+    kind = 'stub'
+
+    def __init__(self, name='stub', latency=0.0, error_rate=0.0, text=STUB_TEXT, seed=None):
+        self.name = name
+        self.latency = latency
+        self.error_rate = error_rate
+        self.text = text
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def available(self):
+        return True
+
+    def _wait(self, timeout):
+        with self._lock:
+            self.calls += 1
+            failed = self._random.random() < self.error_rate
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        if read_timeout and self.latency > read_timeout:
+            time.sleep(read_timeout)
+            raise UpstreamError(f'{self.name} timed out', 504)
+        time.sleep(self.latency)
+        if failed:
+            raise UpstreamError(f'{self.name} returned 503', 503)
+        stage_seconds.observe(self.latency, 'upstream_wait')
+
+    def post_json(self, payload, timeout=None):
+        self._wait(timeout)
+        return make_message(payload['model'], self.text,
+                            sum(len(m['content']) for m in payload.get('messages', [])) // 4,
+                            len(self.text) // 4)
+
+    def stream_events(self, payload, timeout=None):
+        self._wait(timeout)
+        yield 'message_start', {'type': 'message_start', 'message': make_message(payload['model'], '')}
+        for i in range(0, len(self.text), 8):
+            yield text_delta(self.text[i:i + 8])
+        yield 'message_stop', {'type': 'message_stop'}
+
+    def stats(self):
+        return {'requests': self.calls, 'latency': self.latency, 'error_rate': self.error_rate}
+
+
+def build_providers(names, env, breaker_threshold=5, breaker_reset=30.0, **client_options):
+    """
+    Providers from a comma-separated list such as 'anthropic,groq'.
+
+    Each name reads <NAME>_API_URL, <NAME>_API_KEY and <NAME>_MODEL from
+    `env` (with defaults for anthropic, groq, openai and ollama), plus
+    <NAME>_STRONG_MODEL for the requests routed to Sonnet. 'stub' reads
+    STUB_LATENCY. Every HTTP provider gets its own connection pool and
+    circuit breaker.
+    """
+    providers = []
+    for name in [n.strip().lower() for n in names.split(',') if n.strip()]:
+        if name == 'stub':
+            providers.append(StubProvider(latency=float(env.get('STUB_LATENCY', '0'))))
+            continue
+        prefix = name.upper()
+        url = env.get(f'{prefix}_API_URL') or DEFAULT_URLS.get(name)
+        if not url:
+            raise ValueError(f'Provider {name!r} needs {prefix}_API_URL')
+        options = dict(client_options, breaker=CircuitBreaker(breaker_threshold, breaker_reset))
+        if name == 'anthropic':
+            providers.append(AnthropicProvider(name, url, env.get('ANTHROPIC_API_KEY', ''), **options))
+            continue
+        strong = env.get(f'{prefix}_STRONG_MODEL')
+        providers.append(OpenAICompatibleProvider(
+            name, url, env.get(f'{prefix}_API_KEY'),
+            model=env.get(f'{prefix}_MODEL') or DEFAULT_MODELS.get(name),
+            models={MODELS['sonnet']: strong} if strong else None,
+            **options,
+        ))
+    if not providers:
+        raise ValueError('No LLM providers configured')
+    return providers
+
+
+class _Health:
+    """Rolling record of one provider's calls."""
+
+    def __init__(self, window):
+        self.samples = collections.deque(maxlen=window)  # (seconds, ok)
+        self.ewma = None
+        self.calls = 0
+        self.last_used = 0.0
+
+    def record(self, seconds, ok, alpha, floor=0.0):
+        self.samples.append((seconds, ok))
+        self.calls += 1
+        # A fast failure (breaker open, refused connection, bad key) says
+        # nothing about speed, so a failure, the first one included, is
+        # charged at least `floor` and can only raise the estimate
+        if not ok:
+            seconds = max(seconds, floor, self.ewma or 0.0)
+        self.ewma = seconds if self.ewma is None else alpha * seconds + (1 - alpha) * self.ewma
+
+    def healthy(self):
+        return any(ok for _, ok in self.samples)
+
+    def failing(self):
+        """Most recent calls failed."""
+        return self.error_rate() > 0.5
+
+    def error_rate(self):
+        return sum(not ok for _, ok in self.samples) / len(self.samples) if self.samples else 0.0
+
+    def score(self, error_penalty):
+        return (self.ewma or 0.0) * (1 + error_penalty * self.error_rate())
+
+    def p95(self):
+        latencies = sorted(seconds for seconds, ok in self.samples if ok)
+        return latencies[min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))] if latencies else 0.0
+
+
+class ProviderRouter:
+    """
+    post_json / stream_events / stats over several providers.
+
+    Calls go to the available provider with the lowest recent latency
+    (an exponential moving average, inflated by its recent error rate),
+    after every provider that is not failing most of its calls; providers
+    nobody has called yet are tried in list order. A failed call is
+    charged at least the slowest healthy provider's average (or the
+    failover timeout before any has succeeded), so a provider that fails
+    fast never looks fast. An error or
+    a timeout moves the call to the next provider. Every attempt but the
+    last uses `failover_timeout`, so a hung provider costs at most that
+    long. A provider that has not been used for `probe_interval` seconds
+    gets one call, so a recovered provider wins its traffic back.
+
+    With a `limit` (limits.ConcurrencyLimit) a call that would exceed it
+    fails at once with a 429 instead of waiting; a `ledger`
+    (limits.TokenLedger) is given every reply's token usage.
+    """
+
+    def __init__(self, providers, failover_timeout=None, window=100, probe_interval=30.0,
+                 alpha=0.3, error_penalty=4.0, limit=None, ledger=None, clock=time.monotonic):
+        self.providers = list(providers)
+        self.limit = limit
+        self.ledger = ledger
+        self.failover_timeout = failover_timeout
+        self.probe_interval = probe_interval
+        self.alpha = alpha
+        self.error_penalty = error_penalty
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._health = {provider.name: _Health(window) for provider in self.providers}
+        self.failovers = 0
+        self.probes = 0
+
+    def _ranked(self):
+        """Available before unavailable, mostly succeeding before failing, then by score, then list order (lock held)."""
+        return sorted(self.providers, key=lambda provider: (
+            not provider.available(),
+            self._health[provider.name].failing(),
+            self._health[provider.name].score(self.error_penalty),
+            self.providers.index(provider),
+        ))
+
+    def order(self):
+        """Providers to try for the next call, best first."""
+        now = self._clock()
+        with self._lock:
+            ranked = self._ranked()
+            for provider in ranked[1:]:
+                health = self._health[provider.name]
+                if health.calls and provider.available() and now - health.last_used >= self.probe_interval:
+                    ranked.remove(provider)
+                    ranked.insert(0, provider)
+                    self.probes += 1
+                    break
+            self._health[ranked[0].name].last_used = now
+        return ranked
+
+    def _record(self, provider, seconds, ok):
+        with self._lock:
+            floor = 0.0
+            if not ok:
+                # The slowest healthy provider's average; before any provider
+                # has succeeded, the time a failover may take
+                timeout = self.failover_timeout
+                floor = max((health.ewma for name, health in self._health.items()
+                             if name != provider.name and health.ewma is not None and health.healthy()),
+                            default=(timeout[1] if isinstance(timeout, tuple) else timeout) or 0.0)
+            self._health[provider.name].record(seconds, ok, self.alpha, floor)
+
+    def _attempts(self, timeout):
+        """(provider, timeout, is_last) for each provider in order."""
+        providers = self.order()
+        for position, provider in enumerate(providers):
+            last = position == len(providers) - 1
+            yield provider, timeout if last else (self.failover_timeout or timeout), last
+
+    def _failed(self, provider, start, last):
+        self._record(provider, time.perf_counter() - start, False)
+        if not last:
+            with self._lock:
+                self.failovers += 1
+
+    @contextlib.contextmanager
+    def _slot(self):
+        if self.limit is not None and not self.limit.try_acquire():
+            raise UpstreamError('Too many AI requests in flight - try again shortly', 429)
+        try:
+            yield
+        finally:
+            if self.limit is not None:
+                self.limit.release()
+
+    def _account(self, model, usage):
+        if self.ledger is not None and usage:
+            self.ledger.record(model, usage.get('input_tokens', 0), usage.get('output_tokens', 0))
+
+    def post_json(self, payload, timeout=None):
+        """The first successful provider's reply; the last error if all fail."""
+        with self._slot():
+            for provider, attempt_timeout, last in self._attempts(timeout):
+                start = time.perf_counter()
+                try:
+                    reply = provider.post_json(payload, timeout=attempt_timeout)
+                except UpstreamError:
+                    self._failed(provider, start, last)
+                    if last:
+                        raise
+                    continue
+                self._record(provider, time.perf_counter() - start, True)
+                self._account(reply.get('model', payload['model']), reply.get('usage'))
+                return reply
+
+    def stream_events(self, payload, timeout=None):
+        """
+        Stream from the first provider that starts answering. Once an
+        event has been relayed the call is committed to that provider.
+        """
+        with self._slot():
+            for provider, attempt_timeout, last in self._attempts(timeout):
+                start = time.perf_counter()
+                events = provider.stream_events(payload, timeout=attempt_timeout)
+                try:
+                    first = next(events, None)
+                except UpstreamError:
+                    self._failed(provider, start, last)
+                    if last:
+                        raise
+                    continue
+                break
+            model, usage = payload['model'], {}
+            try:
+                for event, body in itertools.chain([first] if first else [], events):
+                    if event == 'message_start':
+                        model = body['message'].get('model', model)
+                        usage.update(body['message'].get('usage') or {})
+                    elif event == 'message_delta':
+                        usage.update(body.get('usage') or {})
+                    yield event, body
+            except UpstreamError:
+                self._record(provider, time.perf_counter() - start, False)
+                raise
+            self._record(provider, time.perf_counter() - start, True)
+            self._account(model, usage)
+
+    def stats(self):
+        with self._lock:
+            order = [provider.name for provider in self._ranked()]
+        result = {'order': order, 'failovers': self.failovers, 'probes': self.probes, 'providers': {}}
+        for provider in self.providers:
+            with self._lock:
+                health = self._health[provider.name]
+                routing = {
+                    'calls': health.calls,
+                    'ewma_ms': round(1000 * (health.ewma or 0.0), 1),
+                    'p95_ms': round(1000 * health.p95(), 1),
+                    'error_rate': round(health.error_rate(), 3),
+                    'available': provider.available(),
+                }
+            result['providers'][provider.name] = dict(provider.stats(), kind=provider.kind, routing=routing)
+        return result
+
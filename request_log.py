@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+A structured JSONL log of /api/bid requests, and a tool to replay it.
+
+The request thread only puts the raw request and response bytes on a
+bounded queue. A background writer decodes them into one JSON line per
+request, writes them in batches and flushes when it has caught up or
+every `flush_interval` seconds. The request path never touches the disk.
+When the writer falls `queue_size` entries behind, new entries are
+dropped and counted instead of waited for. `sample` keeps that fraction
+of requests. At `max_bytes` the file is rotated to path.1 (the newest)
+... path.N, keeping `backups` old files. Put {pid} in the path so each
+gunicorn worker writes its own file.
+
+Under gevent (the default serving mode) threading is monkey-patched, so
+the writer loop is a greenlet. Its disk work then runs on the hub's
+thread pool, a real OS thread. The event loop keeps serving requests
+while a batch is encoded and written.
+
+Each line holds ts (unix seconds), endpoint, status, ms, cache (the
+X-Cache header), request and response (the JSON bodies), their sizes in
+bytes, and from the bodies: kind (scenario, hand or prompt),
+prompt_chars for raw prompts, and bid, source and model for answers.
+
+Usage:
+  python request_log.py summary logs/bids.jsonl
+  python request_log.py replay logs/bids.jsonl --target http://localhost:5000 --speed 4
+"""
+
+import argparse
+import atexit
+import collections
+import glob
+import json
+import math
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+
+class RequestLog:
+    """A JSONL request log written by a background thread; see the module docstring."""
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, backups=5, sample=1.0, queue_size=10000,
+                 flush_interval=1.0, seed=None):
+        self.path = path.replace('{pid}', str(os.getpid()))
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.sample = sample
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(queue_size)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._file = None
+        self._size = 0
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.errors = 0
+        self.rotations = 0
+
+    def record(self, endpoint, status, seconds, cache, request_body, response_body):
+        """Queue one request for the writer; False if it was sampled out or dropped."""
+        if self.sample < 1 and self._random.random() >= self.sample:
+            with self._lock:
+                self.sampled_out += 1
+            return False
+        self._start()
+        try:
+            self._queue.put_nowait((time.time(), endpoint, status, seconds, cache, request_body, response_body))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def _start(self):
+        # Started on first use, so that no thread exists before a worker forks
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='request-log', daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+
+    def _run(self):
+        offload = _offload()
+        last_flush = time.monotonic()
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            flush = self._queue.empty() or time.monotonic() - last_flush >= self.flush_interval
+            try:
+                rotated = offload(self._write_batch, (batch, flush))
+                with self._lock:
+                    self.written += len(batch)
+                    self.rotations += rotated
+                if flush:
+                    last_flush = time.monotonic()
+            except (OSError, ValueError, TypeError):
+                with self._lock:
+                    self.errors += len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch, flush):
+        """Encode and write a batch, flushing if asked; returns the rotations made. Runs off the event loop."""
+        data = ''.join(encode_entry(*item) for item in batch).encode('utf-8')
+        rotated = 0
+        if self._file is None:
+            self._open()
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+            rotated = 1
+        self._file.write(data)
+        self._size += len(data)
+        if flush:
+            self._file.flush()
+        return rotated
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'ab')
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{i}'):
+                os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+        if self.backups:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, 'ab')
+        self._size = 0
+
+    def flush(self):
+        """Wait until every queued entry is on disk."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'path': self.path,
+                'sample': self.sample,
+                'written': self.written,
+                'dropped': self.dropped,
+                'sampled_out': self.sampled_out,
+                'errors': self.errors,
+                'rotations': self.rotations,
+                'queued': self._queue.qsize(),
+                'bytes': self._size,
+            }
+
+
+def _offload():
+    """
+    How the writer runs blocking work: on the gevent hub's thread pool when
+    threading is monkey-patched (the writer is then a greenlet), else in
+    place, since the writer is already a thread of its own.
+    """
+    try:
+        from gevent import get_hub, monkey
+    except ImportError:
+        return lambda func, args: func(*args)
+    if not monkey.is_module_patched('threading'):
+        return lambda func, args: func(*args)
+    return get_hub().threadpool.apply
+
+
+def _loads(body):
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+
+def encode_entry(ts, endpoint, status, seconds, cache, request_body, response_body):
+    """One log line from the raw bytes queued by RequestLog.record."""
+    request = _loads(request_body)
+    response = _loads(response_body)
+    entry = {'ts': round(ts, 3), 'endpoint': endpoint, 'status': status, 'ms': round(seconds * 1000, 1),
+             'cache': cache, 'request': request, 'response': response,
+             'request_bytes': len(request_body or b''), 'response_bytes': len(response_body or b'')}
+    if isinstance(request, dict):
+        if 'prompt' in request:
+            entry['kind'] = 'prompt'
+            entry['prompt_chars'] = len(str(request['prompt']))
+        else:
+            entry['kind'] = 'scenario' if 'scenario_id' in request else 'hand'
+    if isinstance(response, dict):
+        for key in ('bid', 'source', 'model', 'error'):
+            if key in response:
+                entry[key] = response[key]
+    return json.dumps(entry, separators=(',', ':')) + '\n'
+
+
+def log_files(path):
+    """A log and its rotated files, oldest first."""
+    rotated = [p for p in glob.glob(glob.escape(path) + '.*') if p.rsplit('.', 1)[1].isdigit()]
+    rotated.sort(key=lambda p: int(p.rsplit('.', 1)[1]), reverse=True)
+    return rotated + ([path] if os.path.exists(path) else [])
+
+
+def read_log(paths):
+    """Entries from the given logs (each with its rotated files), skipping unreadable lines."""
+    for path in paths:
+        for name in log_files(path):
+            with open(name, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def summarize(entries):
+    """Counts, latency percentiles and prompt sizes of a set of log entries."""
+    ms = [e['ms'] for e in entries if e.get('ms') is not None]
+    prompt_chars = [e['prompt_chars'] for e in entries if 'prompt_chars' in e]
+    return {
+        'requests': len(entries),
+        'statuses': dict(collections.Counter(str(e.get('status')) for e in entries)),
+        'kinds': dict(collections.Counter(e.get('kind', 'other') for e in entries)),
+        'sources': dict(collections.Counter(e['source'] for e in entries if e.get('source'))),
+        'models': dict(collections.Counter(e['model'] for e in entries if e.get('model'))),
+        'cache': dict(collections.Counter(e['cache'] for e in entries if e.get('cache'))),
+        'ms': {f'p{p}': percentile(ms, p) for p in (50, 95, 99)},
+        'prompt_chars': {f'p{p}': percentile(prompt_chars, p) for p in (50, 95, 99)},
+    }
+
+
+def replay(entries, target, speed=1.0, concurrency=32, timeout=60.0, session=None):
+    """
+    Send the logged request bodies to `target` in their original order.
+    Each is sent at its original offset from the first entry divided by
+    `speed` (0: as fast as `concurrency` allows). Returns a summary with
+    the replayed latencies and how many answers matched the logged bid.
+    """
+    import requests
+    from concurrent.futures import ThreadPoolExecutor
+
+    session = session or requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+    lock = threading.Lock()
+    results = {'sent': 0, 'statuses': collections.Counter(), 'cache': collections.Counter(),
+               'same_bid': 0, 'changed_bid': 0, 'errors': 0}
+    latencies = []
+
+    def send(entry):
+        started = time.perf_counter()
+        try:
+            response = session.post(target.rstrip('/') + entry.get('endpoint', '/api/bid'),
+                                    json=entry['request'], timeout=timeout)
+        except requests.RequestException:
+            with lock:
+                results['errors'] += 1
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        try:
+            bid = response.json().get('bid')
+        except (ValueError, AttributeError):
+            bid = None
+        with lock:
+            latencies.append(elapsed)
+            results['statuses'][str(response.status_code)] += 1
+            if response.headers.get('X-Cache'):
+                results['cache'][response.headers['X-Cache']] += 1
+            if entry.get('bid') is not None and bid is not None:
+                results['same_bid' if bid == entry['bid'] else 'changed_bid'] += 1
+
+    start = time.perf_counter()
+    first = None
+    with ThreadPoolExecutor(concurrency) as pool:
+        for entry in entries:
+            if not isinstance(entry.get('request'), dict):
+                continue
+            first = entry['ts'] if first is None else first
+            if speed > 0:
+                delay = (entry['ts'] - first) / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            results['sent'] += 1
+            pool.submit(send, entry)
+    elapsed = time.perf_counter() - start
+    results.update({
+        'seconds': round(elapsed, 3),
+        'throughput': round(results['sent'] / elapsed, 1) if elapsed else None,
+        'statuses': dict(results['statuses']),
+        'cache': dict(results['cache']),
+        'ms': {f'p{p}': round(percentile(latencies, p), 1) if latencies else None for p in (50, 95, 99)},
+    })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    summary = commands.add_parser('summary', help='counts, latency and prompt sizes of a log')
+    summary.add_argument('logs', nargs='+')
+    send = commands.add_parser('replay', help='send a log to a server')
+    send.add_argument('logs', nargs='+')
+    send.add_argument('--target', default='http://localhost:5000', help='base URL of the server')
+    send.add_argument('--speed', type=float, default=1.0, help='time scale: 2 is twice as fast, 0 as fast as possible')
+    send.add_argument('--concurrency', type=int, default=32, help='requests in flight at most')
+    send.add_argument('--limit', type=int, default=0, help='replay only the first N requests')
+    args = parser.parse_args()
+
+    entries = read_log(args.logs)
+    if args.command == 'summary':
+        print(json.dumps(summarize(list(entries)), indent=2))
+        return 0
+    if args.limit:
+        entries = (entry for _, entry in zip(range(args.limit), entries))
+    print(json.dumps(replay(entries, args.target, args.speed, args.concurrency), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
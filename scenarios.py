@@ -0,0 +1,111 @@
+"""
+Scenario store for the backend and the pages.
+
+data/scenarios.jsonl holds every scenario, one compact JSON record per
+line, tagged with the page `set` it belongs to ('full' for the
+full-auction page, 'single' for the single-bid drills). The file is read
+once per process and indexed by module, convention and difficulty, so
+the pages fetch just the slice a session needs from /api/scenarios and
+AI bids can be requested by scenario ID with the prompt built
+server-side.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+SCENARIO_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'scenarios.jsonl')
+SETS = ('full', 'single')
+FILTERS = ('module', 'convention', 'difficulty')
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class ScenarioStore:
+    """
+    Read-only, indexed scenarios with a content digest for ETags.
+
+    Records keep the file's order; every index maps a (set, value) pair
+    to record positions so a filtered query is a set intersection.
+    """
+
+    def __init__(self, path=SCENARIO_FILE):
+        with open(path, 'rb') as f:
+            raw = f.read()
+        self.digest = hashlib.sha256(raw).hexdigest()[:16]
+        self.records = [json.loads(line) for line in raw.decode('utf-8').splitlines() if line.strip()]
+        self._by_id = {}
+        self._index = {name: {} for name in ('set',) + FILTERS}
+        for position, record in enumerate(self.records):
+            name = record['set']
+            self._by_id[(name, record['id'])] = record
+            self._index['set'].setdefault(name, []).append(position)
+            values = [('module', record['module']), ('difficulty', record['difficulty'])]
+            values += [('convention', convention) for convention in record.get('conventions', [])]
+            for field, value in values:
+                self._index[field].setdefault((name, value), []).append(position)
+        self._lock = threading.Lock()
+        self.queries = 0
+
+    def get(self, set_name, scenario_id):
+        """One scenario, or None."""
+        return self._by_id.get((set_name, scenario_id))
+
+    def scenarios(self, set_name):
+        """Every scenario in a set, in file order."""
+        return [self.records[i] for i in self._index['set'].get(set_name, [])]
+
+    def query(self, set_name, module=None, convention=None, difficulty=None, offset=0, limit=DEFAULT_LIMIT):
+        """Return (page, total) for the scenarios in `set_name` matching every given filter."""
+        positions = set(self._index['set'].get(set_name, []))
+        for field, value in (('module', module), ('convention', convention), ('difficulty', difficulty)):
+            if value:
+                positions &= set(self._index[field].get((set_name, value), []))
+        ordered = sorted(positions)
+        with self._lock:
+            self.queries += 1
+        return [self.records[i] for i in ordered[offset:offset + limit]], len(ordered)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'scenarios': len(self.records),
+                'sets': {name: len(positions) for name, positions in self._index['set'].items()},
+                'digest': self.digest,
+                'queries': self.queries,
+            }
+
+
+def client_view(scenario):
+    """
+    A scenario as sent to the pages: full-auction deals show only the
+    user's hand, and double-dummy results stay on the server.
+    """
+    if 'hands' not in scenario:
+        return scenario
+    seat = scenario['your_seat']
+    view = {k: v for k, v in scenario.items() if k not in ('dd_tricks', 'dd_contract')}
+    view['hands'] = {seat: scenario['hands'][seat]}
+    return view
+
+
+_store = None
+
+
+def get_store():
+    """The process-wide store, loaded on first use."""
+    global _store
+    if _store is None:
+        _store = ScenarioStore()
+    return _store
+
+
+def load_scenarios(path=SCENARIO_FILE):
+    """Return {id: scenario} for every full-auction scenario in the file."""
+    return {s['id']: s for s in ScenarioStore(path).scenarios('full')}
+
+
+def get_scenario(scenario_id, set_name='full'):
+    """Look up one scenario by ID, or None."""
+    return get_store().get(set_name, scenario_id)
@@ -0,0 +1,205 @@
+"""
+Server-held auction tables for the /ws/table WebSocket.
+
+A TableSession is one deal being bid: the scenario it comes from (the
+hands stay in the scenario store), the user's seat and the calls made so
+far as a packed auction.Auction, one byte per call. The client sends only its own call and the AI
+seats' calls are pushed back, so nothing is resent per bid.
+
+A table can be watched: every event sent to its owner is serialized once
+and put on each observer's queue, so an instructor's table fans out to a
+whole classroom. A slow observer whose queue fills up is dropped rather
+than holding up the table.
+"""
+
+import collections
+import queue
+import secrets
+import sys
+import threading
+import time
+
+from auction import Auction
+
+CLOSED = None  # put on observer queues when a table goes away
+
+
+class TableSession:
+    """One table: the deal's scenario, the user's seat and the calls so far."""
+
+    __slots__ = ('id', 'scenario_id', 'user_seat', 'calls', 'observers', 'touched')
+
+    def __init__(self, session_id, scenario_id, dealer, user_seat):
+        self.id = session_id
+        self.scenario_id = scenario_id
+        self.user_seat = user_seat
+        self.calls = Auction(dealer)
+        self.observers = None  # list of queues, once someone watches
+        self.touched = 0.0
+
+    def auction(self):
+        return self.calls.to_list()
+
+    def next_seat(self):
+        return self.calls.next_seat()
+
+    def complete(self):
+        return self.calls.complete
+
+    def add(self, bid):
+        """Append the next seat's call; ValueError if it is not legal."""
+        self.calls.add(bid)
+
+    def state(self):
+        complete = self.complete()
+        return {
+            'session_id': self.id,
+            'scenario_id': self.scenario_id,
+            'user_seat': self.user_seat,
+            'auction': self.auction(),
+            'complete': complete,
+            'next_seat': None if complete else self.next_seat(),
+        }
+
+    def size(self):
+        """Approximate bytes held by this table, observers' queues excluded."""
+        return (sys.getsizeof(self) + sys.getsizeof(self.id) + sys.getsizeof(self.calls)
+                + sys.getsizeof(self.calls.calls) + sys.getsizeof(self.calls.hash)
+                + (sys.getsizeof(self.observers) if self.observers is not None else 0))
+
+
+class SessionStore:
+    """
+    Tables by session ID. Tables idle for `idle_ttl` seconds expire and
+    beyond `max_sessions` the least recently used are dropped; either
+    way their observers are told the table closed.
+    """
+
+    def __init__(self, max_sessions=10000, idle_ttl=3600.0, max_observers=500, observer_queue=256,
+                 clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_observers = max_observers
+        self.observer_queue = observer_queue
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sessions = collections.OrderedDict()  # least recently used first
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self.dropped_observers = 0
+
+    def create(self, scenario, user_seat, auction=()):
+        """A new table for `scenario` that has seen `auction`; ValueError if it is not a legal sequence."""
+        session = TableSession(secrets.token_urlsafe(9), scenario['id'], scenario['dealer'], user_seat)
+        for i, entry in enumerate(auction):
+            if entry.get('seat') != session.next_seat():
+                raise ValueError(f"Call {i + 1} should be {session.next_seat()}'s")
+            session.add(entry.get('bid'))
+        now = self._clock()
+        session.touched = now
+        closed = []
+        with self._lock:
+            closed.extend(self._expire(now))
+            self._sessions[session.id] = session
+            self.created += 1
+            while len(self._sessions) > self.max_sessions:
+                closed.append(self._sessions.popitem(last=False)[1])
+                self.evicted += 1
+        for old in closed:
+            self._notify_closed(old)
+        return session
+
+    def get(self, session_id):
+        now = self._clock()
+        with self._lock:
+            closed = self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.touched = now
+                self._sessions.move_to_end(session_id)
+        for old in closed:
+            self._notify_closed(old)
+        return session
+
+    def close(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._notify_closed(session)
+
+    def _expire(self, now):
+        """Pop tables idle past the TTL (lock held); returns them."""
+        closed = []
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.touched < self.idle_ttl:
+                break
+            closed.append(self._sessions.popitem(last=False)[1])
+            self.expired += 1
+        return closed
+
+    def watch(self, session_id):
+        """(session, queue of serialized events) for a new observer; (None, None) if unknown or full."""
+        session = self.get(session_id)
+        if session is None:
+            return None, None
+        with self._lock:
+            if session.observers is None:
+                session.observers = []
+            if len(session.observers) >= self.max_observers:
+                return None, None
+            events = queue.Queue(self.observer_queue)
+            session.observers.append(events)
+        return session, events
+
+    def unwatch(self, session, events):
+        with self._lock:
+            if session.observers and events in session.observers:
+                session.observers.remove(events)
+
+    def publish(self, session, message):
+        """Hand one serialized event to every observer of `session`."""
+        if not session.observers:
+            return
+        with self._lock:
+            observers = list(session.observers)
+        for events in observers:
+            try:
+                events.put_nowait(message)
+            except queue.Full:
+                self.unwatch(session, events)
+                self.dropped_observers += 1
+                self._close_queue(events)
+
+    def _notify_closed(self, session):
+        with self._lock:
+            observers, session.observers = session.observers or [], None
+        for events in observers:
+            self._close_queue(events)
+
+    @staticmethod
+    def _close_queue(events):
+        try:
+            events.put_nowait(CLOSED)
+        except queue.Full:
+            # The observer is far behind; make room for the sentinel
+            try:
+                events.get_nowait()
+                events.put_nowait(CLOSED)
+            except (queue.Empty, queue.Full):
+                pass
+
+    def stats(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            stats = {
+                'sessions': len(sessions),
+                'observers': sum(len(s.observers) for s in sessions if s.observers),
+                'created': self.created,
+                'expired': self.expired,
+                'evicted': self.evicted,
+                'dropped_observers': self.dropped_observers,
+            }
+        stats['bytes'] = sum(s.size() for s in sessions)
+        return stats
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 Simple Flask backend to proxy Claude API calls for SLAM Auction.
-This avoids CORS issues when running locally.
+Serving the pages and the API from one origin avoids CORS; other origins
+must be listed in CORS_ORIGINS.
 
 Usage:
   python slam-backend.py
@@ -9,98 +10,1022 @@ Usage:
 Then open slam-auction-interactive.html in your browser.
 """
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-import requests
+from flask_sock import Sock
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
+import json
+import hashlib
+import math
+import queue
+import time
+
+from upstream import UpstreamError
+from providers import ProviderRouter, build_providers
+from bid_cache import BidCache, cache_key
+from singleflight import SingleFlight
+from auction import CALL_CODES, SEATS, Auction, encode, is_auction_complete, final_contract, pack
+from bidding_engine import BiddingEngine
+from prompts import build_bid_request, request_text
+from bid_output import OutputStats, StreamingBidParser, extract_text, validate_bid, repair_request
+from model_router import MODELS, PRICES, ModelRouter
+from limits import ClientLimiter, ConcurrencyLimit, TokenLedger
+from metrics import REGISTRY, Registry, stage_seconds
+from sessions import CLOSED, SessionStore
+from scenarios import SETS, FILTERS, DEFAULT_LIMIT, MAX_LIMIT, get_scenario, get_store, client_view
+from auction_tree import AuctionTree, TREE_FILE
+from request_log import RequestLog
+from double_dummy import parse_hands, score_contract
+from hand_eval import pack_hand
+import build_pages
+from static_assets import StaticAssets
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON, timed as the 'parse' and 'serialize' stages."""
+
+    def loads(self, s, **kwargs):
+        with stage_seconds.time('parse'):
+            return super().loads(s, **kwargs)
+
+    def dumps(self, obj, **kwargs):
+        with stage_seconds.time('serialize'):
+            return super().dumps(obj, **kwargs)
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+app.json = TimedJSONProvider(app)
+
+# The pages are served by this app, so the API needs no cross-origin access
+# beyond the origins listed in CORS_ORIGINS (e.g. a page opened from disk
+# during development: CORS_ORIGINS=null)
+CORS_ORIGINS = [origin.strip() for origin in os.environ.get('CORS_ORIGINS', '').split(',') if origin.strip()]
+if CORS_ORIGINS:
+    CORS(app, resources={r'/api/*': {'origins': CORS_ORIGINS}})
+
+# Behind a reverse proxy (Railway, nginx) the client address comes from
+# X-Forwarded-For; TRUST_PROXY is the number of proxies to trust
+if int(os.environ.get('TRUST_PROXY', '0')):
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.environ['TRUST_PROXY']))
 
 # You can set this as an environment variable or hardcode it (less secure)
 ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY', '')
 
+# Request budget per client address, a cap on upstream calls in flight and
+# a rolling token/cost ledger (see limits.py)
+client_limiter = ClientLimiter(
+    rate=float(os.environ.get('CLIENT_RATE_LIMIT', '2')),
+    burst=int(os.environ.get('CLIENT_BURST', '60')),
+)
+upstream_limit = ConcurrencyLimit(int(os.environ.get('UPSTREAM_MAX_IN_FLIGHT', '50')))
+token_ledger = TokenLedger(PRICES)
+MAX_PROMPT_CHARS = int(os.environ.get('MAX_PROMPT_CHARS', '4000'))
+
+# LLM providers in order of preference, each with its own pooled keep-alive
+# client, behind a latency-aware failover router (see providers.py)
+upstream = ProviderRouter(
+    build_providers(
+        os.environ.get('LLM_PROVIDERS', 'anthropic'),
+        os.environ,
+        connect_timeout=float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', '3.05')),
+        read_timeout=float(os.environ.get('UPSTREAM_READ_TIMEOUT', '30')),
+        max_retries=int(os.environ.get('UPSTREAM_MAX_RETRIES', '2')),
+        pool_size=int(os.environ.get('UPSTREAM_POOL_SIZE', '20')),
+        breaker_threshold=int(os.environ.get('UPSTREAM_BREAKER_THRESHOLD', '5')),
+        breaker_reset=float(os.environ.get('UPSTREAM_BREAKER_RESET', '30')),
+    ),
+    failover_timeout=(float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', '3.05')),
+                      float(os.environ.get('UPSTREAM_FAILOVER_TIMEOUT', '10'))),
+    limit=upstream_limit,
+    ledger=token_ledger,
+)
+
+# Scenario prompts repeat across users, so answers are cached (see bid_cache.py)
+bid_cache = BidCache(
+    ttl=float(os.environ.get('BID_CACHE_TTL', '86400')),
+    max_entries=int(os.environ.get('BID_CACHE_MAX_ENTRIES', '10000')),
+    max_bytes=int(os.environ.get('BID_CACHE_MAX_BYTES', str(32 * 1024 * 1024))),
+    db_path=os.environ.get('BID_CACHE_DB') or None,
+    purge_every=int(os.environ.get('BID_CACHE_PURGE_EVERY', '1000')),
+)
+
+# Identical prompts arriving together share one upstream call (see singleflight.py)
+bid_flights = SingleFlight()
+
+# Forced and conventional calls are answered locally (see bidding_engine.py)
+bidding_engine = BiddingEngine()
+
+# Parse-failure / illegal-bid / repair counts per model (see bid_output.py)
+output_stats = OutputStats()
+
+# Cheap-first routing when CLAUDE_MODEL=auto (see model_router.py)
+model_router = ModelRouter(long_auction=int(os.environ.get('ROUTER_LONG_AUCTION', '6')))
+
+# Offline-built answers for the scenarios' reachable branches (see auction_tree.py)
+auction_tree = AuctionTree(os.environ.get('AUCTION_TREE_PATH', TREE_FILE) or None)
+
+# Every scenario, indexed for /api/scenarios, read once at startup (see scenarios.py)
+scenario_store = get_store()
+
+# Server-held auction tables for /ws/table (see sessions.py)
+sock = Sock(app)
+app.config['SOCK_SERVER_OPTIONS'] = {'ping_interval': 25, 'max_message_size': 4096}
+table_sessions = SessionStore(
+    max_sessions=int(os.environ.get('SESSION_MAX', '10000')),
+    idle_ttl=float(os.environ.get('SESSION_IDLE_TTL', '3600')),
+    max_observers=int(os.environ.get('SESSION_MAX_OBSERVERS', '500')),
+)
+
+# A JSONL record of /api/bid traffic for tuning and replay, off unless
+# REQUEST_LOG_PATH is set (see request_log.py)
+request_log = RequestLog(
+    os.environ['REQUEST_LOG_PATH'],
+    max_bytes=int(os.environ.get('REQUEST_LOG_MAX_BYTES', str(64 * 1024 * 1024))),
+    backups=int(os.environ.get('REQUEST_LOG_BACKUPS', '5')),
+    sample=float(os.environ.get('REQUEST_LOG_SAMPLE', '1')),
+) if os.environ.get('REQUEST_LOG_PATH') else None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PAGES = ['index.html', 'bridge-101.html', 'conventions.html',
+         'slam-auction-single.html', 'slam-auction-full.html']
+
+# Per-route request counts and latency; the components' own counters are
+# read when /metrics is scraped (see component_metrics)
+metrics_registry = Registry()
+http_requests = metrics_registry.counter(
+    'slam_http_requests_total', 'Requests by route, method and status', ('route', 'method', 'status'))
+request_seconds = metrics_registry.histogram(
+    'slam_request_seconds', 'Time to the response headers by route', ('route',))
+
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+def count_request(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    http_requests.inc(route, request.method, str(response.status_code))
+    if 'started' in g:
+        request_seconds.observe(time.perf_counter() - g.started, route)
+    return response
+
+@app.after_request
+def log_bid_request(response):
+    """Hand /api/bid requests to the request log; the bodies are decoded by its writer."""
+    if request_log is not None and request.endpoint == 'get_bid':
+        request_log.record(request.path, response.status_code, time.perf_counter() - g.started,
+                           response.headers.get('X-Cache'), request.get_data(), response.get_data())
+    return response
+
+def load_static_files(dist_dir):
+    """
+    Read the pages into memory, taking the precompiled React pages and
+    their hashed assets from dist_dir when it was built from the current
+    sources (see build_pages.py). Returns (StaticAssets, built).
+    """
+    built = build_pages.is_current(dist_dir)
+    files = StaticAssets()
+    for page in PAGES:
+        built_page = os.path.join(dist_dir, page)
+        files.add(page, built_page if built and os.path.exists(built_page) else os.path.join(ROOT, page))
+    if built:
+        files.add_directory('assets/', os.path.join(dist_dir, 'assets'))
+    return files, built
+
+# Pages and assets are served from memory with ETags and precompressed bodies (see static_assets.py)
+static_files, PAGES_BUILT = load_static_files(os.environ.get('SLAM_DIST_DIR', build_pages.DIST_DIR))
+
 @app.route('/')
 def index():
     """Serve the main landing page with mode selection."""
-    return send_file('index.html')
+    return static_files.response('index.html')
 
 @app.route('/bridge-101')
 def bridge_101():
     """Serve the beginner's guide to bridge."""
-    return send_file('bridge-101.html')
+    return static_files.response('bridge-101.html')
 
 @app.route('/conventions')
 def conventions():
     """Serve the conventions guide."""
-    return send_file('conventions.html')
+    return static_files.response('conventions.html')
 
 @app.route('/single')
 def single():
     """Serve the single-decision version."""
-    return send_file('slam-auction-single.html')
+    return static_files.response('slam-auction-single.html')
 
 @app.route('/full')
 def full():
     """Serve the full multi-turn auction version."""
-    return send_file('slam-auction-full.html')
+    return static_files.response('slam-auction-full.html')
+
+@app.route('/assets/<path:name>')
+def assets(name):
+    """Serve content-hashed build output with a long-lived cache lifetime."""
+    response = static_files.response('assets/' + name)
+    if response is None:
+        return jsonify({'error': 'Not found'}), 404
+    return response
+
+def structured_request_error(data, dealer=None):
+    """
+    Return an error message if the structured bid fields are malformed or
+    the auction is not a legal sequence starting with `dealer` (default:
+    whoever called first).
+    """
+    hand = data.get('hand')
+    if not isinstance(hand, dict) or not all(isinstance(hand.get(s, ''), str) for s in 'SHDC'):
+        return 'hand must be an object with S, H, D and C strings'
+    try:
+        pack_hand(hand)
+    except ValueError as e:
+        return f'hand is not valid: {e}'
+    if data.get('seat') not in SEATS:
+        return 'seat must be one of N, E, S, W'
+    auction = data.get('auction', [])
+    if not isinstance(auction, list) or not all(
+            isinstance(b, dict) and b.get('seat') in SEATS and b.get('bid') in CALL_CODES
+            for b in auction):
+        return 'auction must be a list of {seat, bid} objects with calls such as Pass, X, XX or 1C'
+    error = auction_error(auction, dealer)
+    if error:
+        return error
+    if not isinstance(data.get('conventions', []), list):
+        return 'conventions must be a list'
+    return None
+
+def auction_error(auction, dealer=None):
+    """An error message if calls are out of turn or illegal, else None."""
+    try:
+        Auction.checked(auction, dealer)
+    except ValueError as e:
+        return f'auction is not legal: {e}'
+    return None
+
+def llm_bid(payload, seat, hand, auction, escalate_to=None):
+    """
+    Ask the model for a bid and return it parsed, normalized and legal.
+    
+    An unparseable or illegal reply is asked again of `escalate_to` when
+    the router gave a stronger model, otherwise it gets one short repair
+    request; if that fails too the seat passes.
+    """
+    model = payload['model']
+    text = extract_text(upstream.post_json(payload))
+    output_stats.record(model, 'replies')
+    call, reasoning, problem = validate_bid(text, seat, auction)
+    if problem is None:
+        return {'bid': call, 'reasoning': reasoning, 'source': 'llm', 'model': model}
+    return unusable_reply(payload, text, problem, seat, hand, auction, escalate_to)
+
+def unusable_reply(payload, text, problem, seat, hand, auction, escalate_to=None):
+    """Escalate a bad reply to the stronger model if there is one, else repair it."""
+    if escalate_to is None:
+        return repair_bid(payload, text, problem, seat, hand, auction)
+    output_stats.record(payload['model'], 'parse_failures' if problem == 'unparseable' else 'illegal_bids')
+    return dict(llm_bid(dict(payload, model=escalate_to), seat, hand, auction), escalated=True)
+
+def repair_bid(payload, text, problem, seat, hand, auction):
+    """One short repair request after an unusable reply, else a forced pass."""
+    model = payload['model']
+    output_stats.record(model, 'parse_failures' if problem == 'unparseable' else 'illegal_bids')
+    text = extract_text(upstream.post_json(repair_request(payload, text, problem, seat, hand, auction)))
+    call, reasoning, problem = validate_bid(text, seat, auction)
+    if problem is None:
+        output_stats.record(model, 'repaired')
+        return {'bid': call, 'reasoning': reasoning, 'source': 'repair', 'model': model}
+    
+    output_stats.record(model, 'repair_failed')
+    return {
+        'bid': 'Pass',
+        'reasoning': 'Forced pass: the AI did not produce a legal bid',
+        'source': 'fallback',
+        'model': model
+    }
+
+def structured_payload(model, data):
+    """Upstream request body and cache key for a structured request."""
+    payload = build_bid_request(
+        model, data['seat'], data['hand'], data.get('auction', []), data.get('conventions', [])
+    )
+    return payload, cache_key(request_text(payload), model, max_tokens=payload['max_tokens'])
+
+def cached_llm_bid(data):
+    """
+    Server-built prompt -> cache -> coalesced upstream call -> validated bid.
+    
+    Returns (result, 'HIT' | 'MISS' | 'COALESCED').
+    """
+    seat, hand = data['seat'], data['hand']
+    auction = data.get('auction', [])
+    model, escalate_to = route_model(data)
+    payload, key = structured_payload(model, data)
+    
+    result = bid_cache.get(key)
+    if result is not None:
+        return result, 'HIT'
+    
+    def produce():
+        start = time.perf_counter()
+        result = llm_bid(payload, seat, hand, auction, escalate_to)
+        if routing():
+            model_router.record(result, time.perf_counter() - start)
+        if result['source'] != 'fallback':
+            bid_cache.set(key, result)
+        return result
+    
+    result, shared = bid_flights.do(key, produce)
+    return result, 'COALESCED' if shared else 'MISS'
+
+def structured_bid(data):
+    result, cache_status = cached_llm_bid(data)
+    response = jsonify(result)
+    response.headers['X-Cache'] = cache_status
+    return response
+
+def find_scenario(scenario_id):
+    """(scenario, None), or (None, error response): 400 for an ID that is not a string, 404 for an unknown one."""
+    if not isinstance(scenario_id, str):
+        return None, (jsonify({'error': 'scenario_id must be a string'}), 400)
+    scenario = get_scenario(scenario_id)
+    if scenario is None:
+        return None, (jsonify({'error': f'Unknown scenario {scenario_id!r}'}), 404)
+    return scenario, None
+
+def resolve_structured_request(data):
+    """
+    Fill in the hand and conventions for scenario requests and validate
+    structured fields. Returns (data, None) or (None, error response).
+    """
+    if 'scenario_id' in data:
+        scenario, error = find_scenario(data['scenario_id'])
+        if error:
+            return None, error
+        if data.get('seat') not in SEATS:
+            return None, (jsonify({'error': 'seat must be one of N, E, S, W'}), 400)
+        data = dict(data, hand=scenario['hands'][data['seat']],
+                    conventions=scenario.get('conventions', []))
+    if 'hand' in data:
+        error = structured_request_error(data, scenario['dealer'] if 'scenario_id' in data else None)
+        if error:
+            return None, (jsonify({'error': error}), 400)
+    return data, None
+
+def local_bid(data):
+    """
+    An answer that needs no upstream call: the rules engine's, or for
+    scenario requests the precomputed auction tree's. None otherwise.
+    """
+    answer = bidding_engine.decide(
+        data['hand'], data['seat'], data.get('auction', []), data.get('conventions', [])
+    )
+    if answer is not None:
+        return {'bid': answer['bid'], 'reasoning': answer['reasoning'], 'source': 'rules', 'model': 'rules'}
+    if 'scenario_id' in data:
+        return auction_tree.get(data['scenario_id'], data['seat'], data.get('auction', []), choose_model())
+    return None
+
+def choose_model():
+    """Model from the CLAUDE_MODEL env variable ('auto' starts with the cheap one)."""
+    return MODELS.get(os.environ.get('CLAUDE_MODEL', 'haiku').lower(), MODELS['haiku'])
+
+def routing():
+    return os.environ.get('CLAUDE_MODEL', 'haiku').lower() == 'auto'
+
+def route_model(data):
+    """
+    (model, escalate_to) for a structured request: CLAUDE_MODEL's model,
+    or with CLAUDE_MODEL=auto the router's pick for this auction.
+    """
+    if routing():
+        return model_router.route(data.get('auction', []))
+    return choose_model(), None
+
+def client_limit_error():
+    """A 429 response if the calling client is over its request budget, else None."""
+    allowed, retry_after = client_limiter.allow(request.remote_addr or 'unknown')
+    if allowed:
+        return None
+    response = jsonify({'error': 'Too many requests - slow down'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(math.ceil(retry_after))
+    return response
 
 @app.route('/api/bid', methods=['POST'])
 def get_bid():
     """
     Proxy endpoint for Claude API calls.
     
+    Accepts one of:
+    - {"scenario_id", "seat", "auction"}: the server looks up the hand and
+      conventions and renders a compact prompt (see prompts.py)
+    - {"hand", "seat", "auction", "conventions"}: same, for any hand
+    - {"prompt"}: free text sent upstream as-is (legacy clients); the raw
+      Messages API reply is returned
+    
+    Structured requests return {"bid", "reasoning", "source", "model"}.
+    Forced or conventional calls (Stayman reply, transfer completion, weak
+    pass) are answered by the local bidding engine without calling the
+    LLM, and scenario calls found in the precomputed auction tree are
+    served from it. Model replies are parsed, normalized and checked for legality
+    server-side, with one short repair request if they are unusable.
+    
+    Each client address gets CLIENT_RATE_LIMIT requests per second (bursts
+    of CLIENT_BURST), raw prompts are capped at MAX_PROMPT_CHARS, and when
+    UPSTREAM_MAX_IN_FLIGHT model calls are already running the request is
+    refused at once; all three answer 429 (413 for the prompt size).
+    
     Set CLAUDE_MODEL env variable to choose:
     - 'haiku' (default): claude-3-5-haiku-20241022 - $1.50/mo for 100 req/day
     - 'sonnet': claude-sonnet-4-20250514 - $18/mo for 100 req/day
+    - 'auto': haiku first, sonnet for hard auctions and unusable replies
+      (see model_router.py)
     """
-    if not ANTHROPIC_API_KEY:
+    error = client_limit_error()
+    if error:
+        return error
+    data, error = resolve_structured_request(request.get_json(silent=True) or {})
+    if error:
+        return error
+    
+    structured = 'hand' in data
+    if structured:
+        answer = local_bid(data)
+        if answer is not None:
+            return jsonify(answer)
+    
+    if not provider_ready():
         return jsonify({
             'error': 'ANTHROPIC_API_KEY not set. Set it as an environment variable.'
         }), 500
     
-    # Choose model based on environment variable
-    model_choice = os.environ.get('CLAUDE_MODEL', 'haiku').lower()
-    if model_choice == 'sonnet':
-        model = 'claude-sonnet-4-20250514'
-    else:
-        model = 'claude-3-5-haiku-20241022'
-    
     try:
-        data = request.json
+        if structured:
+            return structured_bid(data)
+        
         prompt = data.get('prompt', '')
+        if not isinstance(prompt, str) or len(prompt) > MAX_PROMPT_CHARS:
+            return jsonify({'error': f'prompt must be a string of at most {MAX_PROMPT_CHARS} characters'}), 413
+        model = choose_model()
+        payload = {
+            'model': model,
+            'max_tokens': 300,
+            'messages': [
+                {'role': 'user', 'content': prompt}
+            ]
+        }
+        key = cache_key(request_text(payload), model, max_tokens=payload['max_tokens'])
+        result = bid_cache.get(key)
+        if result is not None:
+            response = jsonify(result)
+            response.headers['X-Cache'] = 'HIT'
+            return response
         
-        response = requests.post(
-            'https://api.anthropic.com/v1/messages',
-            headers={
-                'Content-Type': 'application/json',
-                'x-api-key': ANTHROPIC_API_KEY,
-                'anthropic-version': '2023-06-01'
-            },
-            json={
-                'model': model,
-                'max_tokens': 300,
-                'messages': [
-                    {'role': 'user', 'content': prompt}
-                ]
-            }
-        )
+        def call_upstream():
+            result = upstream.post_json(payload)
+            bid_cache.set(key, result)
+            return result
         
-        response.raise_for_status()
-        return jsonify(response.json())
+        result, shared = bid_flights.do(key, call_upstream)
+        response = jsonify(result)
+        response.headers['X-Cache'] = 'COALESCED' if shared else 'MISS'
+        return response
         
-    except requests.exceptions.RequestException as e:
-        return jsonify({'error': str(e)}), 500
+    except UpstreamError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def provider_ready():
+    """True when some configured provider can be called."""
+    return bool(ANTHROPIC_API_KEY) or any(p.kind != 'anthropic' for p in upstream.providers)
+
+def require_api_key():
+    if not provider_ready():
+        raise UpstreamError('ANTHROPIC_API_KEY not set. Set it as an environment variable.', 500)
+
+def sse(event, data):
+    """Format one Server-Sent Event."""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+def sse_stream(events):
+    """Format (event, data) pairs as SSE, ending with an error event on failure."""
+    try:
+        for event, data in events:
+            yield sse(event, data)
+    except UpstreamError as e:
+        yield sse('error', {'error': str(e), 'status': e.status_code})
+
+def sse_response(events):
+    response = Response(stream_with_context(sse_stream(events)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # don't let proxies buffer the stream
+    return response
+
+def stream_llm_bid(payload, key, seat, hand, auction, escalate_to=None):
+    """Relay a streamed model reply as bid / reasoning / done events."""
+    model = payload['model']
+    start = time.perf_counter()
+    parser = StreamingBidParser(seat, auction)
+    for event, body in upstream.stream_events(payload):
+        if event == 'content_block_delta' and body['delta'].get('type') == 'text_delta':
+            for kind, value in parser.feed(body['delta']['text']):
+                if kind == 'bid':
+                    yield 'bid', {'bid': value, 'source': 'llm', 'model': model}
+                else:
+                    yield 'reasoning', {'delta': value}
+        elif event == 'error':
+            raise UpstreamError(body.get('error', {}).get('message', 'Upstream stream error'))
+    
+    output_stats.record(model, 'replies')
+    if parser.bid is not None:
+        result = {'bid': parser.bid, 'reasoning': parser.reasoning, 'source': 'llm', 'model': model}
+    else:
+        call, reasoning, problem = validate_bid(parser.text, seat, auction)
+        if problem is None:
+            result = {'bid': call, 'reasoning': reasoning, 'source': 'llm', 'model': model}
+        else:
+            result = unusable_reply(payload, parser.text, problem, seat, hand, auction, escalate_to)
+        yield 'bid', result
+    
+    if routing():
+        model_router.record(result, time.perf_counter() - start)
+    if result['source'] != 'fallback':
+        bid_cache.set(key, result)
+    yield 'done', result
+
+def streamed_bid(data):
+    """bid / reasoning / done events for one seat: rules, cache, then a live stream."""
+    result = local_bid(data)
+    if result is None:
+        require_api_key()
+        model, escalate_to = route_model(data)
+        payload, key = structured_payload(model, data)
+        result = bid_cache.get(key)
+        if result is None:
+            yield from stream_llm_bid(payload, key, data['seat'], data['hand'], data.get('auction', []), escalate_to)
+            return
+    yield 'bid', result
+    yield 'done', result
+
+@app.route('/api/bid/stream', methods=['POST'])
+def stream_bid():
+    """
+    Streaming variant of /api/bid for structured requests.
+    
+    Replies with Server-Sent Events:
+    - bid: {"bid", "source", "model"} as soon as a legal bid is parsed
+    - reasoning: {"delta"} pieces of the reasoning as they are generated
+    - done: the complete {"bid", "reasoning", "source", "model"}
+    - error: {"error", "status"} if the upstream call fails (or no API key is set)
+    
+    Rule-engine answers and cache hits arrive as a single bid + done pair.
+    """
+    error = client_limit_error()
+    if error:
+        return error
+    data, error = resolve_structured_request(request.get_json(silent=True) or {})
+    if error:
+        return error
+    if 'hand' not in data:
+        return jsonify({'error': 'Streaming needs scenario_id or hand, seat and auction'}), 400
+    return sse_response(streamed_bid(data))
+
+def next_seat(auction, dealer):
+    if not auction:
+        return dealer
+    return SEATS[(SEATS.index(auction[-1]['seat']) + 1) % 4]
+
+def ai_seat_bids(scenario, auction, user_seat, stream=False):
+    """
+    Bid for every AI seat until it is `user_seat`'s turn or the auction ends.
+    
+    Yields (event, data) pairs. Each seat produces a 'bid' and a 'call'
+    event (plus 'reasoning' deltas when streaming an LLM reply); a final
+    'done' carries {"bids", "complete", "next_seat"}. Every seat goes
+    through the rules engine and bid cache first; LLM calls share the
+    pooled upstream connection.
+    """
+    auction = list(auction)
+    packed = pack(auction)
+    played = []
+    seat = next_seat(auction, scenario['dealer'])
+    while not packed.complete and seat != user_seat:
+        data = {
+            'scenario_id': scenario['id'],
+            'seat': seat,
+            'hand': scenario['hands'][seat],
+            'auction': list(auction),
+            'conventions': scenario.get('conventions', []),
+        }
+        if stream:
+            for event, body in streamed_bid(data):
+                if event == 'done':
+                    result = body
+                else:
+                    yield event, dict(body, seat=seat)
+        else:
+            result = local_bid(data)
+            if result is None:
+                require_api_key()
+                result, _ = cached_llm_bid(data)
+            yield 'bid', dict(result, seat=seat)
+        
+        played.append(dict(result, seat=seat))
+        yield 'call', played[-1]
+        auction.append({'seat': seat, 'bid': result['bid']})
+        packed.push(encode(result['bid']), seat)
+        seat = next_seat(auction, scenario['dealer'])
+    
+    complete = packed.complete
+    yield 'done', {'bids': played, 'complete': complete, 'next_seat': None if complete else seat}
+
+@app.route('/api/auction/advance', methods=['POST'])
+def advance_auction():
+    """
+    Play every AI seat in a row in one request.
+    
+    Takes {"scenario_id", "auction", "user_seat"} (user_seat defaults to
+    the scenario's your_seat) and bids for each following seat until it
+    is the user's turn again or the auction is over. Returns
+    {"bids": [{"seat", "bid", "reasoning", "source", "model"}, ...],
+    "complete", "next_seat"}.
+    
+    With "Accept: text/event-stream" the bids are streamed instead: a
+    'bid' event as soon as each seat's call is known, 'reasoning' deltas,
+    a 'call' event with each seat's complete answer, then 'done'.
+    """
+    error = client_limit_error()
+    if error:
+        return error
+    data = request.get_json(silent=True) or {}
+    scenario, error = find_scenario(data.get('scenario_id'))
+    if error:
+        return error
+    user_seat = data.get('user_seat', scenario['your_seat'])
+    error = structured_request_error({
+        'hand': scenario['hands'][scenario['dealer']],
+        'seat': user_seat,
+        'auction': data.get('auction', []),
+    }, scenario['dealer'])
+    if error:
+        return jsonify({'error': error}), 400
+    
+    stream = 'text/event-stream' in request.headers.get('Accept', '')
+    events = ai_seat_bids(scenario, data.get('auction', []), user_seat, stream)
+    if stream:
+        return sse_response(events)
+    
+    played = []
+    try:
+        for event, body in events:
+            if event == 'call':
+                played.append(body)
+            elif event == 'done':
+                return jsonify(body)
+    except UpstreamError as e:
+        # Return the seats that did bid so the client can keep them
+        return jsonify({'error': str(e), 'bids': played}), e.status_code
+
+def send_table_event(ws, session, event, body):
+    """Send one event to a table's owner and every observer, serialized once."""
+    message = json.dumps(dict(body, type=event, session_id=session.id))
+    ws.send(message)
+    table_sessions.publish(session, message)
+
+def play_table(ws, session):
+    """Bid for the AI seats of a table until the user's turn or the end."""
+    scenario = get_scenario(session.scenario_id)
+    try:
+        for event, body in ai_seat_bids(scenario, session.auction(), session.user_seat, stream=True):
+            if event == 'call':
+                session.add(body['bid'])
+            send_table_event(ws, session, event, body)
+    except UpstreamError as e:
+        send_table_event(ws, session, 'error', {'error': str(e), 'status': e.status_code})
+
+def start_table(message):
+    """A new session from a 'start' message, or an error string."""
+    if not isinstance(message.get('scenario_id'), str):
+        return None, 'scenario_id must be a string'
+    scenario = get_scenario(message.get('scenario_id'))
+    if scenario is None:
+        return None, f"Unknown scenario {message.get('scenario_id')!r}"
+    user_seat = message.get('user_seat', scenario['your_seat'])
+    if user_seat not in SEATS:
+        return None, 'user_seat must be one of N, E, S, W'
+    auction = message.get('auction')
+    if auction is None:
+        auction = [{'seat': scenario['dealer'], 'bid': scenario['opening_bid']}] if scenario.get('opening_bid') else []
+    if not isinstance(auction, list) or not all(isinstance(entry, dict) for entry in auction):
+        return None, 'auction must be a list of {seat, bid} objects'
+    try:
+        return table_sessions.create(scenario, user_seat, auction), None
+    except ValueError as e:
+        return None, str(e)
+
+def watch_table(ws, session_id):
+    """Relay a table's events to an observer until it closes or the observer leaves."""
+    session, events = table_sessions.watch(session_id)
+    if session is None:
+        # Tables are held per worker (see gunicorn.conf.py)
+        ws.send(json.dumps({'type': 'error', 'error': f'No table {session_id!r} to watch in this worker'}))
+        return
+    try:
+        ws.send(json.dumps(dict(session.state(), type='session', observer=True)))
+        while ws.connected:
+            try:
+                message = events.get(timeout=30)
+            except queue.Empty:
+                continue
+            if message is CLOSED:
+                ws.send(json.dumps({'type': 'closed', 'session_id': session.id}))
+                return
+            ws.send(message)
+    finally:
+        table_sessions.unwatch(session, events)
+
+@sock.route('/ws/table')
+def table_socket(ws):
+    """
+    An auction table held by the server, over a WebSocket.
+    
+    Messages are JSON objects with a "type":
+    - start {"scenario_id", "user_seat"?, "auction"?}: open a table, by
+      default after the scenario's opening bid; the reply is 'session'
+      with its session_id and state
+    - call {"bid"}: the user's next call, the only thing sent per bid
+    - watch {"session_id"}: follow another connection's table read-only
+      (classroom mode); the connection then only receives
+    
+    After 'start' and 'call' the AI seats bid at once and their 'bid',
+    'reasoning', 'call' and 'done' events are pushed as in
+    /api/auction/advance, each with the session_id, to the owner and
+    every observer. A refused message gets an 'error'. The table closes
+    when its owner disconnects or opens another one.
+    """
+    session = None
+    try:
+        while True:
+            raw = ws.receive()
+            try:
+                message = json.loads(raw)
+            except (TypeError, ValueError):
+                message = None
+            if not isinstance(message, dict):
+                ws.send(json.dumps({'type': 'error', 'error': 'Messages must be JSON objects'}))
+                continue
+            allowed, retry_after = client_limiter.allow(request.remote_addr or 'unknown')
+            if not allowed:
+                ws.send(json.dumps({'type': 'error', 'error': 'Too many requests - slow down',
+                                    'retry_after': math.ceil(retry_after)}))
+                continue
+            
+            kind = message.get('type')
+            if kind == 'watch':
+                if session is not None:
+                    table_sessions.close(session.id)
+                    session = None
+                watch_table(ws, message.get('session_id'))
+                return
+            if kind == 'start':
+                if session is not None:
+                    table_sessions.close(session.id)
+                session, error = start_table(message)
+                if error:
+                    ws.send(json.dumps({'type': 'error', 'error': error}))
+                    continue
+                ws.send(json.dumps(dict(session.state(), type='session')))
+            elif kind == 'call':
+                if session is None or table_sessions.get(session.id) is None:
+                    session = None
+                    ws.send(json.dumps({'type': 'error', 'error': 'No table - send start first'}))
+                    continue
+                if session.complete() or session.next_seat() != session.user_seat:
+                    ws.send(json.dumps({'type': 'error', 'error': f'It is not {session.user_seat} to call',
+                                        'session_id': session.id}))
+                    continue
+                seat = session.next_seat()
+                try:
+                    session.add(message.get('bid'))
+                except ValueError as e:
+                    ws.send(json.dumps({'type': 'error', 'error': str(e), 'session_id': session.id}))
+                    continue
+                table_sessions.publish(session, json.dumps({
+                    'type': 'call', 'session_id': session.id, 'seat': seat, 'bid': message['bid'], 'source': 'user',
+                }))
+            else:
+                ws.send(json.dumps({'type': 'error', 'error': 'type must be start, call or watch'}))
+                continue
+            play_table(ws, session)
+    finally:
+        if session is not None:
+            table_sessions.close(session.id)
+
+@app.route('/api/auction/legal', methods=['POST'])
+def auction_legal_calls():
+    """
+    The auction rules for the pages, from the same engine the server uses.
+    
+    Takes {"auction", "seat"?} (seat defaults to the next to call) and
+    returns {"legal": [calls], "complete", "next_seat", "key"}, where key
+    is the auction's stable 64-bit hash in hex.
+    """
+    data = request.get_json(silent=True) or {}
+    auction = data.get('auction', [])
+    seat = data.get('seat')
+    if not isinstance(auction, list) or not all(
+            isinstance(b, dict) and b.get('seat') in SEATS and b.get('bid') in CALL_CODES for b in auction):
+        return jsonify({'error': 'auction must be a list of {seat, bid} objects'}), 400
+    if seat is not None and seat not in SEATS:
+        return jsonify({'error': 'seat must be one of N, E, S, W'}), 400
+    try:
+        packed = Auction.checked(auction)
+    except ValueError as e:
+        return jsonify({'error': f'auction is not legal: {e}'}), 400
+    return jsonify({
+        'legal': packed.legal_calls(seat),
+        'complete': packed.complete,
+        'next_seat': None if packed.complete else packed.next_seat(),
+        'key': packed.key(),
+    })
+
+def scenario_response(query, build):
+    """
+    JSON from build() with an ETag over the store's content and the query,
+    or a bodyless 304 when the client already has it.
+    """
+    etag = hashlib.sha256(f'{scenario_store.digest}|{query}'.encode('utf-8')).hexdigest()[:20]
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/scenarios', methods=['GET'])
+def list_scenarios():
+    """
+    One page of scenarios for a page set, filtered by module, convention
+    and difficulty: /api/scenarios?set=full&module=BASIC&offset=0&limit=20.
+    fields=id,title trims each record to the listed fields.
+    """
+    set_name = request.args.get('set', 'full')
+    if set_name not in SETS:
+        return jsonify({'error': f'set must be one of {", ".join(SETS)}'}), 400
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    if offset < 0 or not 1 <= limit <= MAX_LIMIT:
+        return jsonify({'error': f'Need offset >= 0 and 1 <= limit <= {MAX_LIMIT}'}), 400
+    filters = {name: request.args.get(name) or None for name in FILTERS}
+    fields = [name for name in request.args.get('fields', '').split(',') if name]
+
+    def build():
+        page, total = scenario_store.query(set_name, offset=offset, limit=limit, **filters)
+        scenarios = [client_view(scenario) for scenario in page]
+        if fields:
+            scenarios = [{name: s[name] for name in ['id'] + fields if name in s} for s in scenarios]
+        return {'set': set_name, 'total': total, 'offset': offset, 'limit': limit, 'scenarios': scenarios}
+
+    query = json.dumps([set_name, offset, limit, filters, fields], sort_keys=True)
+    return scenario_response(query, build)
+
+@app.route('/api/scenarios/<set_name>/<scenario_id>', methods=['GET'])
+def get_scenario_by_id(set_name, scenario_id):
+    """One scenario as the pages see it."""
+    scenario = scenario_store.get(set_name, scenario_id)
+    if scenario is None:
+        return jsonify({'error': f'Unknown scenario {set_name}/{scenario_id}'}), 404
+    return scenario_response(f'{set_name}/{scenario_id}', lambda: client_view(scenario))
+
+@app.route('/api/contract/score', methods=['POST'])
+def score_final_contract():
+    """
+    Score a finished auction by what its contract makes double dummy.
+
+    Takes {"scenario_id", "auction"} and returns the final contract, the
+    tricks declarer takes with best play, the expected score and the best
+    makeable contract's score, all from the user's side (see
+    double_dummy.score_contract), plus "reached_optimal" for the
+    scenario's optimal contract. Only scenarios annotated by
+    `python double_dummy.py --write` are scored, from their stored trick
+    table: solving a deal takes minutes, far too long for a request, so
+    others answer 422 (a malformed deal) or 503 (not annotated yet).
+    """
+    error = client_limit_error()
+    if error:
+        return error
+    data = request.get_json(silent=True) or {}
+    scenario, error = find_scenario(data.get('scenario_id'))
+    if error:
+        return error
+    auction = data.get('auction', [])
+    error = structured_request_error({'hand': scenario['hands'][scenario['dealer']],
+                                      'seat': scenario['your_seat'], 'auction': auction}, scenario['dealer'])
+    if error:
+        return jsonify({'error': error}), 400
+    if not is_auction_complete(auction):
+        return jsonify({'error': 'auction is not finished'}), 400
+
+    contract = final_contract(auction)
+    table = scenario.get('dd_tricks')
+    if not table:
+        try:
+            parse_hands(scenario['hands'])
+        except ValueError as e:
+            return jsonify({'error': f'Cannot analyse this deal: {e}'}), 422
+        return jsonify({'error': 'This deal has not been annotated with double-dummy results yet'}), 503
+    side = 'NS' if scenario['your_seat'] in 'NS' else 'EW'
+    result = score_contract(table, contract, scenario.get('vul', 'None'), side)
+    reached = contract and f"{contract['level']}{contract['strain']} by {contract['declarer']}"
+    result['reached_optimal'] = reached == scenario.get('dd_contract', scenario.get('optimal_contract'))
+    return jsonify(result)
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint."""
-    return jsonify({'status': 'ok', 'api_key_set': bool(ANTHROPIC_API_KEY)})
+    return jsonify({
+        'status': 'ok',
+        'api_key_set': provider_ready(),
+        'upstream': upstream.stats(),
+        'cache': bid_cache.stats(),
+        'coalescing': bid_flights.stats(),
+        'rules': bidding_engine.stats(),
+        'bid_output': output_stats.stats(),
+        'routing': model_router.stats(),
+        'limits': {'clients': client_limiter.stats(), 'upstream': upstream_limit.stats()},
+        'ledger': token_ledger.stats(),
+        'auction_tree': auction_tree.stats(),
+        'scenarios': scenario_store.stats(),
+        'sessions': table_sessions.stats(),
+        'request_log': request_log.stats() if request_log else None,
+        'pages': 'built' if PAGES_BUILT else 'source',
+        'static': static_files.stats()
+    })
+
+@metrics_registry.collector
+def component_metrics():
+    """The /health counters as Prometheus metrics."""
+    providers = upstream.stats()['providers']
+    yield ('slam_upstream_responses_total', 'counter', 'Upstream responses by provider and status code',
+           [({'provider': name, 'code': code}, count)
+            for name, stats in providers.items() for code, count in sorted(stats.get('status_codes', {}).items())])
+    yield ('slam_upstream_calls_total', 'counter', 'Calls routed to each provider',
+           [({'provider': name}, stats['routing']['calls']) for name, stats in providers.items()])
+    yield ('slam_upstream_breaker_open', 'gauge', '1 while a provider is failing fast',
+           [({'provider': name}, int(not stats['routing']['available'])) for name, stats in providers.items()])
+    yield ('slam_upstream_failovers_total', 'counter', 'Calls moved to the next provider',
+           [({}, upstream.failovers)])
+    ledger = token_ledger.stats()['lifetime']['models']
+    yield ('slam_tokens_total', 'counter', 'Model tokens used, by model and direction',
+           [({'model': model, 'direction': direction}, row[f'{direction}_tokens'])
+            for model, row in sorted(ledger.items()) for direction in ('input', 'output')])
+    yield ('slam_cost_usd_total', 'counter', 'Estimated model spend in USD',
+           [({'model': model}, row['cost_usd']) for model, row in sorted(ledger.items())])
+    limits = upstream_limit.stats()
+    yield ('slam_upstream_in_flight', 'gauge', 'Model calls running now', [({}, limits['in_flight'])])
+    yield ('slam_upstream_rejected_total', 'counter', 'Model calls refused at UPSTREAM_MAX_IN_FLIGHT',
+           [({}, limits['rejected'])])
+    clients = client_limiter.stats()
+    yield ('slam_client_requests_total', 'counter', 'Bid requests by per-client limiter decision',
+           [({'result': 'allowed'}, clients['allowed']), ({'result': 'limited'}, clients['limited'])])
+    cache = bid_cache.stats()
+    yield ('slam_bid_cache_lookups_total', 'counter', 'Bid cache lookups by result',
+           [({'result': 'hit_memory'}, cache['hits_memory']), ({'result': 'hit_disk'}, cache['hits_disk']),
+            ({'result': 'miss'}, cache['misses'])])
+    yield ('slam_bid_cache_evictions_total', 'counter', 'Bid cache evictions by reason',
+           [({'reason': 'lru'}, cache['evictions_lru']), ({'reason': 'ttl'}, cache['evictions_ttl'])])
+    yield ('slam_bid_cache_entries', 'gauge', 'Answers in the bid cache', [({}, cache['entries'])])
+    yield ('slam_bid_coalesced_total', 'counter', 'Requests that shared an identical in-flight call',
+           [({}, bid_flights.stats()['coalesced'])])
+    tree = auction_tree.stats()
+    yield ('slam_auction_tree_lookups_total', 'counter', 'Precomputed auction tree lookups by result',
+           [({'result': 'hit'}, tree['hits']), ({'result': 'miss'}, tree['misses'])])
+    rules = bidding_engine.stats()
+    yield ('slam_rule_engine_total', 'counter', 'Structured bids answered by the rules or passed to the model',
+           [({'result': 'local'}, rules['local']), ({'result': 'llm'}, rules['llm_fallback'])])
+    tables = table_sessions.stats()
+    yield ('slam_table_sessions', 'gauge', 'Auction tables held for WebSocket clients', [({}, tables['sessions'])])
+    yield ('slam_table_observers', 'gauge', 'Observers watching a table', [({}, tables['observers'])])
+    yield ('slam_model_routes_total', 'counter', 'Model-answered bids by route (CLAUDE_MODEL=auto)',
+           [({'route': route}, count) for route, count in model_router.stats()['routes'].items()])
+    if request_log:
+        logged = request_log.stats()
+        yield ('slam_request_log_entries_total', 'counter', 'Bid requests offered to the request log, by result',
+               [({'result': result}, logged[result]) for result in ('written', 'dropped', 'sampled_out', 'errors')])
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics: request counts and stage latencies plus the /health counters."""
+    return Response(REGISTRY.render() + metrics_registry.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
-    if not ANTHROPIC_API_KEY:
+    if not provider_ready():
         print("\n⚠️  WARNING: ANTHROPIC_API_KEY not set!")
         print("Set it with: export ANTHROPIC_API_KEY='your-key-here'\n")
     else:
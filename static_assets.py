@@ -0,0 +1,120 @@
+"""
+In-memory static file serving with precompressed bodies and revalidation.
+
+The HTML pages and built assets only change on deploy, so they are read
+once at startup. Each file keeps its raw, gzip and brotli bodies, a
+strong ETag per encoding and a Last-Modified date. A request then costs
+a dict lookup: 304 Not Modified when the client's copy is current,
+otherwise the smallest body the client accepts.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from datetime import datetime, timezone
+
+import brotli
+from flask import Response, request
+from werkzeug.http import http_date
+
+# Pages revalidate on every load (a cheap 304); hashed assets never change
+PAGE_CACHE_CONTROL = 'no-cache'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class StaticFile:
+    """One file's bodies and validators, keyed by content encoding."""
+
+    def __init__(self, path, cache_control):
+        with open(path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()[:20]
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.cache_control = cache_control
+        self.modified = datetime.fromtimestamp(int(os.path.getmtime(path)), timezone.utc)
+        self.last_modified = http_date(self.modified)
+        self.bodies = {'identity': raw}
+        for encoding, suffix in ENCODINGS:
+            if os.path.exists(path + suffix):  # prebuilt by build_pages.py
+                with open(path + suffix, 'rb') as f:
+                    body = f.read()
+            elif encoding == 'br':
+                body = brotli.compress(raw, quality=11)
+            else:
+                body = gzip.compress(raw, compresslevel=9, mtime=0)
+            if len(body) < len(raw):
+                self.bodies[encoding] = body
+        # Strong ETags must differ between encodings of the same file
+        self.etags = {encoding: digest if encoding == 'identity' else f'{digest}-{encoding}'
+                      for encoding in self.bodies}
+
+    def choose_encoding(self, accept_encodings):
+        for encoding, _ in ENCODINGS:
+            if encoding in self.bodies and accept_encodings[encoding] > 0:
+                return encoding
+        return 'identity'
+
+
+class StaticAssets:
+    """Registry of StaticFiles served by name, with hit counters for /health."""
+
+    def __init__(self):
+        self._files = {}
+        self._lock = threading.Lock()
+        self.served = 0
+        self.not_modified = 0
+
+    def add(self, name, path, cache_control=PAGE_CACHE_CONTROL):
+        self._files[name] = StaticFile(path, cache_control)
+
+    def add_directory(self, prefix, directory, cache_control=IMMUTABLE_CACHE_CONTROL):
+        """Add every file in `directory` (skipping .gz/.br variants) as prefix + filename."""
+        if not os.path.isdir(directory):
+            return
+        for filename in sorted(os.listdir(directory)):
+            path = os.path.join(directory, filename)
+            if os.path.isfile(path) and not filename.endswith(('.gz', '.br')):
+                self.add(prefix + filename, path, cache_control)
+
+    def response(self, name):
+        """A 200 or 304 response for the current request, or None if unknown."""
+        static = self._files.get(name)
+        if static is None:
+            return None
+        encoding = static.choose_encoding(request.accept_encodings)
+        etag = static.etags[encoding]
+
+        if request.if_none_match:
+            fresh = request.if_none_match.contains_weak(etag)
+        else:
+            fresh = request.if_modified_since is not None and request.if_modified_since >= static.modified
+        if fresh:
+            response = Response(status=304)
+        else:
+            response = Response(static.bodies[encoding], mimetype=static.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Last-Modified'] = static.last_modified
+        response.headers['Cache-Control'] = static.cache_control
+        response.vary.add('Accept-Encoding')
+
+        with self._lock:
+            if fresh:
+                self.not_modified += 1
+            else:
+                self.served += 1
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                'files': len(self._files),
+                'bytes': sum(len(body) for static in self._files.values() for body in static.bodies.values()),
+                'served': self.served,
+                'not_modified': self.not_modified,
+            }
@@ -0,0 +1,115 @@
+"""
+Tests for auction legality rules
+"""
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from auction import (ALL_CALLS, CALL_CODES, Auction, decode, encode, legal_calls, is_legal,
+                     is_auction_complete, final_contract, pack)
+
+
+def auction(*calls, dealer='N'):
+    seats = ['N', 'E', 'S', 'W']
+    start = seats.index(dealer)
+    return [{'seat': seats[(start + i) % 4], 'bid': bid} for i, bid in enumerate(calls)]
+
+
+def test_opening_calls():
+    """Anything but X/XX opens the auction"""
+    calls = legal_calls('N', [])
+    assert calls[:2] == ['Pass', '1C']
+    assert 'X' not in calls and 'XX' not in calls
+    assert len(calls) == 36
+
+
+def test_bids_must_rise():
+    """Only higher bids are legal"""
+    calls = auction('1NT', 'Pass')
+    assert is_legal('2C', 'S', calls)
+    assert not is_legal('1S', 'S', calls)
+    assert not is_legal('1NT', 'S', calls)
+
+
+def test_double_only_opponents_contract():
+    """X applies to the opponents' last bid, not partner's"""
+    assert is_legal('X', 'E', auction('1NT'))
+    assert not is_legal('X', 'S', auction('1NT', 'Pass'))
+    assert is_legal('X', 'W', auction('1NT', 'Pass', 'Pass'))
+
+
+def test_redouble_only_after_opponents_double():
+    """XX needs an opponent's X as the last action"""
+    assert is_legal('XX', 'S', auction('1NT', 'X'))
+    assert is_legal('XX', 'N', auction('1NT', 'X', 'Pass', 'Pass'))
+    assert not is_legal('XX', 'W', auction('1NT', 'X'))
+    assert not is_legal('X', 'S', auction('1NT', 'X'))
+
+
+def test_auction_complete():
+    """Three passes after a bid, or four passes, end the auction"""
+    assert is_auction_complete(auction('1NT', 'Pass', 'Pass', 'Pass'))
+    assert is_auction_complete(auction('Pass', 'Pass', 'Pass', 'Pass'))
+    assert not is_auction_complete(auction('Pass', 'Pass', 'Pass'))
+    assert legal_calls('E', auction('1NT', 'Pass', 'Pass', 'Pass')) == []
+
+
+def test_final_contract_declarer_named_strain_first():
+    """Declarer is whoever on the winning side bid the strain first"""
+    contract = final_contract(auction('1H', 'Pass', '2C', 'Pass', '4H', 'X', 'Pass', 'Pass', 'Pass'))
+    assert contract == {'level': 4, 'strain': 'H', 'declarer': 'N', 'doubled': 1}
+    contract = final_contract(auction('1C', '1NT', 'X', 'XX', 'Pass', 'Pass', 'Pass', dealer='S'))
+    assert contract == {'level': 1, 'strain': 'NT', 'declarer': 'W', 'doubled': 2}
+    assert final_contract(auction('Pass', 'Pass', 'Pass', 'Pass')) is None
+
+
+def test_calls_encode_in_ladder_order():
+    """Pass, X, XX, then the contract bids, so bids compare by code"""
+    assert [encode(call) for call in ('Pass', 'X', 'XX', '1C', '1NT', '2C', '7NT')] == [0, 1, 2, 3, 7, 8, 37]
+    assert all(decode(encode(call)) == call for call in ALL_CALLS)
+    with pytest.raises(ValueError):
+        encode('8C')
+
+
+def test_packed_auction_matches_list_rules():
+    """Calls added one by one give the same legal calls as the list helpers"""
+    calls = auction('1C', '1NT', 'X', 'XX', 'Pass', 'Pass', 'Pass', dealer='S')
+    packed = Auction('S')
+    for i, entry in enumerate(calls):
+        for seat in 'NESW':
+            assert packed.legal_calls(seat) == legal_calls(seat, calls[:i])
+        packed.add(entry['bid'])
+    assert packed.complete and packed.legal_mask() == 0
+    assert packed.to_list() == calls
+    assert bytes(packed.calls) == bytes(CALL_CODES[entry['bid']] for entry in calls)
+    with pytest.raises(ValueError):
+        Auction('N').add('X')
+
+
+def test_auction_hash_is_stable_per_prefix():
+    """The hash depends on the dealer and calls only, and every prefix can be recovered"""
+    calls = auction('1NT', 'Pass', '2C', 'Pass', '2H')
+    packed = pack(calls)
+    assert packed.key() == pack(calls).key() == '%016x' % packed.hash
+    assert packed.hash != pack(auction('1NT', 'Pass', '2C', 'Pass', '2S')).hash
+    assert pack(auction('1NT', dealer='N')).hash != pack(auction('1NT', dealer='E')).hash
+    assert packed.prefix_hash(0) == Auction('N').hash
+    for length in range(1, len(calls) + 1):
+        assert packed.prefix_hash(length) == pack(calls[:length]).hash
+    # Fixed across processes, unlike hash()
+    assert pack(auction('1NT')).key() == '07bb9e07b4866eea'
+
+
+def test_checked_auction_enforces_turn_and_legality():
+    assert Auction.checked(auction('1NT', 'Pass', '2C'), 'N').to_list() == auction('1NT', 'Pass', '2C')
+    with pytest.raises(ValueError, match='not a legal call'):
+        Auction.checked(auction('1NT', 'Pass', '1C'))
+    with pytest.raises(ValueError, match='out of turn'):
+        Auction.checked([{'seat': 'N', 'bid': '1NT'}, {'seat': 'N', 'bid': '2C'}])
+    with pytest.raises(ValueError, match='out of turn'):
+        Auction.checked(auction('1NT'), 'E')
+    with pytest.raises(ValueError, match='not a legal call'):
+        Auction.checked(auction('Pass', 'Pass', 'Pass', 'Pass', '1C'))
@@ -0,0 +1,67 @@
+"""
+Tests for the precomputed auction tree
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from auction_tree import AuctionTree, build_tree, tree_key, user_options, write_tree
+from scenarios import get_scenario
+
+OPENING = [{'seat': 'N', 'bid': '1NT'}]
+
+
+def test_user_options_follow_bid_buttons():
+    """Only legal calls offered by the page are branched over"""
+    options = user_options('S', OPENING + [{'seat': 'E', 'bid': '2H'}])
+    assert options[:4] == ['Pass', 'X', '2S', '2NT']
+    assert 'X' not in user_options('S', OPENING + [{'seat': 'E', 'bid': 'Pass'}])
+    assert '5C' not in options
+
+
+def test_tree_round_trip_and_hit_rate(tmp_path):
+    path = str(tmp_path / 'tree.json.gz')
+    write_tree(path, {tree_key('U01', 'E', OPENING): ['Pass', 'Weak', 'llm']}, 'haiku', 1)
+    tree = AuctionTree(path)
+    assert tree.get('U01', 'E', OPENING, 'haiku') == {
+        'bid': 'Pass', 'reasoning': 'Weak', 'source': 'precomputed', 'model': 'haiku'
+    }
+    assert tree.get('U01', 'W', OPENING, 'haiku') is None
+    assert tree.stats()['hit_rate'] == 0.5
+
+
+def test_tree_ignores_other_models(tmp_path):
+    path = str(tmp_path / 'tree.json.gz')
+    write_tree(path, {tree_key('U01', 'E', OPENING): ['Pass', 'Weak', 'llm']}, 'haiku', 1)
+    assert AuctionTree(path).get('U01', 'E', OPENING, 'sonnet') is None
+
+
+def test_missing_file_is_empty_tree(tmp_path):
+    assert AuctionTree(str(tmp_path / 'nope.json.gz')).stats()['entries'] == 0
+    assert AuctionTree(None).get('U01', 'E', OPENING, 'haiku') is None
+
+
+def test_build_tree_walks_user_branches():
+    """Every user option is explored and only model answers are stored"""
+    seen = []
+
+    def advance(auction):
+        # Opponents always pass; E is answered by the "LLM", W by "rules"
+        seen.append(len(auction))
+        seat_after = {'N': 'E', 'S': 'W'}[auction[-1]['seat']]
+        if seat_after == 'E':
+            return [{'seat': 'E', 'bid': 'Pass', 'reasoning': 'r', 'source': 'llm'}], None
+        return [{'seat': 'W', 'bid': 'Pass', 'reasoning': 'r', 'source': 'rules'},
+                {'seat': 'N', 'bid': 'Pass', 'reasoning': 'r', 'source': 'llm'},
+                {'seat': 'E', 'bid': 'Pass', 'reasoning': 'r', 'source': 'llm'}], None
+
+    entries, counts = build_tree(get_scenario('U01'), 1, advance, workers=2)
+    branches = len(user_options('S', OPENING + [{'seat': 'E', 'bid': 'Pass'}]))
+    assert counts['paths'] == branches
+    assert counts['rules'] == branches
+    assert counts['stored'] == 1 + 2 * branches
+    assert tree_key('U01', 'E', OPENING) in entries
+    assert tree_key('U01', 'N', OPENING + [{'seat': 'E', 'bid': 'Pass'}, {'seat': 'S', 'bid': '2C'},
+                                           {'seat': 'W', 'bid': 'Pass'}]) in entries
@@ -19,8 +19,10 @@ spec.loader.exec_module(slam_backend)
 app = slam_backend.app
 
 @pytest.fixture
-def client():
-    """Create test client"""
+def client(monkeypatch):
+    """Create test client, with a fresh request budget for each test"""
+    from limits import ClientLimiter
+    monkeypatch.setattr(slam_backend, 'client_limiter', ClientLimiter(rate=2, burst=60))
     app.config['TESTING'] = True
     with app.test_client() as client:
         yield client
@@ -87,3 +89,739 @@ def test_api_bid_with_key(client):
     assert response.status_code == 200
     data = json.loads(response.data)
     assert 'content' in data
+
+def test_api_bid_through_stub_upstream(client, monkeypatch):
+    """Test the upstream HTTP path end to end against bench/stub_upstream.py, no live key needed"""
+    from bid_cache import BidCache
+    from providers import ProviderRouter, build_providers
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'bench')))
+    from stub_upstream import CANNED_TEXT, start_stub
+
+    stub = start_stub(latency=0.0)
+    env = {'ANTHROPIC_API_URL': f'http://127.0.0.1:{stub.server_port}/v1/messages', 'ANTHROPIC_API_KEY': 'stub'}
+    monkeypatch.setattr(slam_backend, 'ANTHROPIC_API_KEY', 'stub')
+    monkeypatch.setattr(slam_backend, 'upstream', ProviderRouter(build_providers('anthropic', env)))
+    monkeypatch.setattr(slam_backend, 'bid_cache', BidCache())
+    try:
+        response = client.post('/api/bid', json={'prompt': 'Say "test"'})
+        assert response.status_code == 200
+        assert json.loads(response.data)['content'][0]['text'] == CANNED_TEXT
+        assert stub.counts == {'requests': 1, 'errors': 0}
+    finally:
+        stub.shutdown()
+
+def test_health_reports_upstream_stats(client):
+    """Test health endpoint exposes upstream pool counters"""
+    response = client.get('/health')
+    data = json.loads(response.data)
+    anthropic = data['upstream']['providers']['anthropic']
+    assert 'pool_hits' in anthropic
+    assert anthropic['breaker']['state'] == 'closed'
+    assert data['upstream']['order'] == ['anthropic']
+
+@pytest.fixture
+def fake_upstream(monkeypatch):
+    """Replace the upstream call with canned answers and count calls"""
+    from bid_cache import BidCache
+
+    class Calls(list):
+        """Upstream payloads seen, plus queued replies to return"""
+        replies = None
+
+    calls = Calls()
+    replies = []
+
+    def post_json(payload, timeout=None):
+        calls.append(payload)
+        text = replies.pop(0) if replies else '{"bid": "2C", "reasoning": "Stayman"}'
+        return {'content': [{'type': 'text', 'text': text}]}
+
+    monkeypatch.setattr(slam_backend, 'ANTHROPIC_API_KEY', 'test-key')
+    monkeypatch.setattr(slam_backend.upstream, 'post_json', post_json)
+    monkeypatch.setattr(slam_backend, 'bid_cache', BidCache())
+    calls.replies = replies
+    return calls
+
+def test_api_bid_repeat_prompt_served_from_cache(client, fake_upstream):
+    """Test identical prompts go upstream only once"""
+    for expected in ('MISS', 'HIT'):
+        response = client.post('/api/bid',
+            data=json.dumps({'prompt': 'You are N'}),
+            content_type='application/json'
+        )
+        assert response.status_code == 200
+        assert response.headers['X-Cache'] == expected
+        assert 'content' in json.loads(response.data)
+    assert len(fake_upstream) == 1
+
+def test_api_bid_rejects_oversized_prompt(client, fake_upstream):
+    """Test a raw prompt over MAX_PROMPT_CHARS never goes upstream"""
+    response = client.post('/api/bid', json={'prompt': 'x' * (slam_backend.MAX_PROMPT_CHARS + 1)})
+    assert response.status_code == 413
+    assert len(fake_upstream) == 0
+
+def test_api_bid_client_over_budget_gets_429(client, fake_upstream, monkeypatch):
+    """Test a client past its burst is refused with Retry-After"""
+    from limits import ClientLimiter
+    monkeypatch.setattr(slam_backend, 'client_limiter', ClientLimiter(rate=0.5, burst=2))
+    statuses = [client.post('/api/bid', json={'prompt': 'You are N'}) for _ in range(3)]
+    assert [r.status_code for r in statuses] == [200, 200, 429]
+    assert statuses[2].headers['Retry-After'] == '2'
+    # Another address has its own budget
+    response = client.post('/api/bid', json={'prompt': 'You are N'}, environ_base={'REMOTE_ADDR': '10.0.0.2'})
+    assert response.status_code == 200
+
+def test_api_bid_upstream_full_fails_fast(client, monkeypatch):
+    """Test a bid needing the model is refused at once while the upstream cap is in use"""
+    from bid_cache import BidCache
+    from limits import ConcurrencyLimit, TokenLedger
+    from providers import ProviderRouter, StubProvider
+    limit = ConcurrencyLimit(1)
+    monkeypatch.setattr(slam_backend, 'upstream', ProviderRouter([StubProvider()], limit=limit, ledger=TokenLedger()))
+    monkeypatch.setattr(slam_backend, 'bid_cache', BidCache())
+    assert limit.try_acquire()  # another request holds the only slot
+    response = client.post('/api/bid', json={'prompt': 'You are N'})
+    assert response.status_code == 429
+    assert limit.stats()['rejected'] == 1
+    limit.release()
+    assert client.post('/api/bid', json={'prompt': 'You are N'}).status_code == 200
+
+def test_cors_is_off_by_default(client):
+    """Test the API does not answer cross-origin requests unless CORS_ORIGINS is set"""
+    response = client.get('/health', headers={'Origin': 'https://elsewhere.example'})
+    assert 'Access-Control-Allow-Origin' not in response.headers
+
+def test_metrics_endpoint(client, fake_upstream):
+    """Test /metrics counts routes and times the bid path's stages"""
+    client.post('/api/bid', json={'prompt': 'You are N'})
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'slam_http_requests_total{route="/api/bid",method="POST",status="200"}' in text
+    assert 'slam_request_seconds_count{route="/api/bid"}' in text
+    for stage in ('parse', 'serialize'):
+        assert f'slam_stage_seconds_count{{stage="{stage}"}}' in text
+    for family in ('slam_upstream_calls_total', 'slam_tokens_total', 'slam_bid_cache_lookups_total',
+                   'slam_client_requests_total', 'slam_upstream_in_flight'):
+        assert f'# TYPE {family} ' in text
+
+def test_auction_legal_endpoint(client):
+    """Test the pages get legal calls from the server's auction engine"""
+    response = client.post('/api/auction/legal', json={'auction': U01_OPENING + [{'seat': 'E', 'bid': 'Pass'}]})
+    data = json.loads(response.data)
+    assert data['next_seat'] == 'S' and not data['complete']
+    assert data['legal'][:2] == ['Pass', '2C'] and 'X' not in data['legal']  # partner's 1NT
+    assert len(data['key']) == 16
+    data = json.loads(client.post('/api/auction/legal', json={'auction': U01_OPENING, 'seat': 'E'}).data)
+    assert data['legal'][:3] == ['Pass', 'X', '2C']
+    response = client.post('/api/auction/legal', json={'auction': [{'seat': 'N', 'bid': '8NT'}]})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize('auction', [
+    [{'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'}, {'seat': 'S', 'bid': '1C'}],  # insufficient
+    [{'seat': 'N', 'bid': '1NT'}, {'seat': 'N', 'bid': '2C'}],  # out of turn
+    [{'seat': 'E', 'bid': 'Pass'}],  # U01 is dealt by N
+])
+def test_illegal_auctions_are_refused(client, fake_upstream, auction):
+    """Test every endpoint that takes an auction checks turn order and legality"""
+    for path, body in [('/api/bid', {'scenario_id': 'U01', 'seat': 'S', 'auction': auction}),
+                       ('/api/auction/advance', {'scenario_id': 'U01', 'auction': auction}),
+                       ('/api/contract/score', {'scenario_id': 'U01', 'auction': auction + [
+                           {'seat': 'W', 'bid': 'Pass'}] * 3})]:
+        response = client.post(path, json=body)
+        assert response.status_code == 400, path
+        assert 'not legal' in response.get_json()['error']
+    assert fake_upstream == []
+    if auction[0]['seat'] == 'N':
+        assert client.post('/api/auction/legal', json={'auction': auction}).status_code == 400
+
+def test_api_bid_structured_forced_call_answered_locally(client, fake_upstream):
+    """Test a Stayman reply is answered by the rules engine without the LLM"""
+    response = client.post('/api/bid',
+        data=json.dumps({
+            'prompt': 'You are N',
+            'hand': {'S': 'A105', 'H': 'KQ84', 'D': 'AQ6', 'C': 'K73'},
+            'seat': 'N',
+            'auction': [
+                {'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'},
+                {'seat': 'S', 'bid': '2C'}, {'seat': 'W', 'bid': 'Pass'}
+            ],
+            'conventions': ['stayman']
+        }),
+        content_type='application/json'
+    )
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['source'] == 'rules'
+    assert data['bid'] == '2H'
+    assert fake_upstream == []
+
+def test_api_bid_structured_invalid_seat(client):
+    """Test malformed structured requests are rejected"""
+    response = client.post('/api/bid',
+        data=json.dumps({'hand': {'S': 'A'}, 'seat': 'Q', 'auction': []}),
+        content_type='application/json'
+    )
+    assert response.status_code == 400
+
+def test_api_bid_by_scenario_builds_prompt_server_side(client, fake_upstream):
+    """Test scenario requests are rendered into a compact prompt"""
+    response = client.post('/api/bid',
+        data=json.dumps({
+            'scenario_id': 'U01', 'seat': 'S',
+            'auction': [{'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'}]
+        }),
+        content_type='application/json'
+    )
+    assert response.status_code == 200
+    payload = fake_upstream[0]
+    assert payload['system'][-1]['cache_control'] == {'type': 'ephemeral'}
+    assert 'Hand: S KJ84 (4)' in payload['messages'][0]['content']
+
+def test_api_bid_by_scenario_forced_call_is_local(client, fake_upstream):
+    """Test scenario requests also use the rules engine"""
+    response = client.post('/api/bid',
+        data=json.dumps({
+            'scenario_id': 'U01', 'seat': 'N',
+            'auction': [
+                {'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'},
+                {'seat': 'S', 'bid': '2C'}, {'seat': 'W', 'bid': 'Pass'}
+            ]
+        }),
+        content_type='application/json'
+    )
+    assert json.loads(response.data)['source'] == 'rules'
+    assert fake_upstream == []
+
+def test_api_bid_request_log(client, fake_upstream, monkeypatch, tmp_path):
+    """Test /api/bid requests are written to the request log and replayable"""
+    from request_log import RequestLog, read_log
+    log = RequestLog(str(tmp_path / 'bids.jsonl'))
+    monkeypatch.setattr(slam_backend, 'request_log', log)
+    body = {'scenario_id': 'U01', 'seat': 'N', 'auction': [
+        {'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'},
+        {'seat': 'S', 'bid': '2C'}, {'seat': 'W', 'bid': 'Pass'}]}
+    assert client.post('/api/bid', json=body).status_code == 200
+    client.get('/health')
+    log.flush()
+    [entry] = list(read_log([log.path]))
+    assert entry['request'] == body and entry['kind'] == 'scenario'
+    assert (entry['status'], entry['source'], entry['endpoint']) == (200, 'rules', '/api/bid')
+    assert entry['response']['bid'] == entry['bid']
+    health = json.loads(client.get('/health').data)['request_log']
+    assert health['written'] == 1 and health['dropped'] == 0
+
+def test_api_bid_duplicate_card_is_a_400(client, fake_upstream):
+    """Test a hand holding a card twice is refused as JSON, not a server error"""
+    response = client.post('/api/bid', json={
+        'hand': {'S': 'A105', 'H': 'AA', 'D': 'AQ6', 'C': 'K73'}, 'seat': 'N', 'auction': []})
+    assert response.status_code == 400
+    assert 'HA appears twice' in response.get_json()['error']
+    assert fake_upstream == []
+
+def test_non_string_scenario_id_is_a_400(client):
+    """Test a scenario_id that is not a string is refused as JSON, not a server error"""
+    for path in ('/api/bid', '/api/auction/advance', '/api/contract/score'):
+        response = client.post(path, json={'scenario_id': ['U01'], 'seat': 'S', 'auction': []})
+        assert response.status_code == 400, path
+        assert response.get_json()['error'] == 'scenario_id must be a string'
+
+def test_api_bid_unknown_scenario(client):
+    """Test unknown scenario IDs return 404"""
+    response = client.post('/api/bid',
+        data=json.dumps({'scenario_id': 'ZZ99', 'seat': 'S', 'auction': []}),
+        content_type='application/json'
+    )
+    assert response.status_code == 404
+
+def test_api_bid_by_scenario_returns_validated_bid(client, fake_upstream):
+    """Test model replies are parsed and normalized server-side"""
+    fake_upstream.replies.append('```json\n{"bid": "2♣", "reasoning": "Stayman"}\n```')
+    response = client.post('/api/bid',
+        data=json.dumps({
+            'scenario_id': 'U01', 'seat': 'S',
+            'auction': [{'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'}]
+        }),
+        content_type='application/json'
+    )
+    data = json.loads(response.data)
+    assert data['bid'] == '2C'
+    assert data['source'] == 'llm'
+
+def test_api_bid_illegal_reply_is_repaired_once(client, fake_upstream):
+    """Test an illegal model bid gets one short repair request"""
+    fake_upstream.replies.extend([
+        '{"bid": "1S", "reasoning": "oops"}',
+        '{"bid": "2C", "reasoning": "Stayman"}'
+    ])
+    response = client.post('/api/bid',
+        data=json.dumps({
+            'scenario_id': 'U01', 'seat': 'S',
+            'auction': [{'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'}]
+        }),
+        content_type='application/json'
+    )
+    data = json.loads(response.data)
+    assert data['bid'] == '2C'
+    assert data['source'] == 'repair'
+    assert len(fake_upstream) == 2
+    assert 'Legal calls' in fake_upstream[1]['messages'][0]['content']
+
+def test_api_bid_unrepairable_reply_passes(client, fake_upstream):
+    """Test the seat passes when the repair also fails"""
+    fake_upstream.replies.extend(['gibberish', 'more gibberish'])
+    response = client.post('/api/bid',
+        data=json.dumps({
+            'scenario_id': 'U01', 'seat': 'S',
+            'auction': [{'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'}]
+        }),
+        content_type='application/json'
+    )
+    data = json.loads(response.data)
+    assert data['bid'] == 'Pass'
+    assert data['source'] == 'fallback'
+    assert len(fake_upstream) == 2
+
+def sse_events(response):
+    """Decode a text/event-stream body into (event, data) pairs"""
+    events = []
+    for chunk in response.get_data(as_text=True).strip().split('\n\n'):
+        event, data = chunk.split('\n')
+        events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+def stream_deltas(*pieces):
+    """Upstream SSE events carrying `pieces` as text deltas"""
+    events = [('message_start', {'type': 'message_start'})]
+    for piece in pieces:
+        events.append(('content_block_delta', {
+            'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': piece}
+        }))
+    return events + [('message_stop', {'type': 'message_stop'})]
+
+def test_api_bid_stream_releases_bid_first(client, fake_upstream, monkeypatch):
+    """Test the stream emits the bid before the reasoning finishes"""
+    streamed = []
+    def stream_events(payload, timeout=None):
+        streamed.append(payload)
+        return iter(stream_deltas('{"bid": "2', 'C", "reasoning": "Stay', 'man"}'))
+    monkeypatch.setattr(slam_backend.upstream, 'stream_events', stream_events)
+    body = json.dumps({
+        'scenario_id': 'U01', 'seat': 'S',
+        'auction': [{'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'}]
+    })
+    
+    response = client.post('/api/bid/stream', data=body, content_type='application/json')
+    assert response.mimetype == 'text/event-stream'
+    events = sse_events(response)
+    assert [event for event, _ in events] == ['bid', 'reasoning', 'reasoning', 'done']
+    assert events[0][1]['bid'] == '2C'
+    assert events[-1][1] == {'bid': '2C', 'reasoning': 'Stayman', 'source': 'llm',
+                             'model': streamed[0]['model']}
+    
+    # The finished result is cached for both endpoints
+    again = client.post('/api/bid', data=body, content_type='application/json')
+    assert again.headers['X-Cache'] == 'HIT'
+    assert len(streamed) == 1 and fake_upstream == []
+
+def test_api_bid_stream_repairs_illegal_reply(client, fake_upstream, monkeypatch):
+    """Test an illegal streamed bid is withheld and repaired"""
+    monkeypatch.setattr(slam_backend.upstream, 'stream_events',
+                        lambda payload, timeout=None: iter(stream_deltas('{"bid": "1S"}')))
+    fake_upstream.replies.append('{"bid": "2C", "reasoning": "fixed"}')
+    response = client.post('/api/bid/stream',
+        data=json.dumps({
+            'scenario_id': 'U01', 'seat': 'S',
+            'auction': [{'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'}]
+        }),
+        content_type='application/json'
+    )
+    events = sse_events(response)
+    assert [event for event, _ in events] == ['bid', 'done']
+    assert events[-1][1]['source'] == 'repair'
+
+def test_api_bid_stream_forced_call_is_immediate(client, fake_upstream):
+    """Test rules-engine answers arrive as a single bid + done pair"""
+    response = client.post('/api/bid/stream',
+        data=json.dumps({
+            'scenario_id': 'U01', 'seat': 'N',
+            'auction': [
+                {'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'},
+                {'seat': 'S', 'bid': '2C'}, {'seat': 'W', 'bid': 'Pass'}
+            ]
+        }),
+        content_type='application/json'
+    )
+    events = sse_events(response)
+    assert [event for event, _ in events] == ['bid', 'done']
+    assert events[0][1]['source'] == 'rules'
+
+def test_api_bid_stream_requires_structured_request(client):
+    """Test raw prompts cannot be streamed"""
+    response = client.post('/api/bid/stream',
+        data=json.dumps({'prompt': 'You are N'}),
+        content_type='application/json'
+    )
+    assert response.status_code == 400
+
+U01_OPENING = [{'seat': 'N', 'bid': '1NT'}]
+
+def test_auction_advance_plays_until_user_turn(client, fake_upstream):
+    """Test consecutive AI seats are played in one request"""
+    # After S bids 2C: W (8 HCP, six clubs) is a judgment call for the
+    # LLM, N's Stayman reply and E's weak pass come from the rules engine
+    fake_upstream.replies.append('{"bid": "Pass", "reasoning": "Not enough to bid 3C"}')
+    response = client.post('/api/auction/advance',
+        data=json.dumps({
+            'scenario_id': 'U01',
+            'auction': U01_OPENING + [{'seat': 'E', 'bid': 'Pass'}, {'seat': 'S', 'bid': '2C'}]
+        }),
+        content_type='application/json'
+    )
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [(b['seat'], b['bid'], b['source']) for b in data['bids']] == [
+        ('W', 'Pass', 'llm'), ('N', '2H', 'rules'), ('E', 'Pass', 'rules')
+    ]
+    assert data['next_seat'] == 'S' and not data['complete']
+    assert len(fake_upstream) == 1
+
+def test_auction_advance_stops_when_auction_ends(client, fake_upstream):
+    """Test the batch stops after three passes"""
+    fake_upstream.replies.append('{"bid": "Pass", "reasoning": "Defend 1NT"}')
+    auction = U01_OPENING + [{'seat': 'E', 'bid': 'Pass'}, {'seat': 'S', 'bid': 'Pass'}]
+    response = client.post('/api/auction/advance',
+        data=json.dumps({'scenario_id': 'U01', 'auction': auction}),
+        content_type='application/json'
+    )
+    data = json.loads(response.data)
+    assert [b['bid'] for b in data['bids']] == ['Pass']
+    assert data['complete'] and data['next_seat'] is None
+
+def test_auction_advance_streams_each_seat(client, fake_upstream, monkeypatch):
+    """Test the batch can be streamed seat by seat"""
+    monkeypatch.setattr(slam_backend.upstream, 'stream_events', lambda payload, timeout=None: iter(
+        stream_deltas('{"bid": "Pass", ', '"reasoning": "Weak"}')
+    ))
+    response = client.post('/api/auction/advance',
+        data=json.dumps({
+            'scenario_id': 'U01',
+            'auction': U01_OPENING + [{'seat': 'E', 'bid': 'Pass'}, {'seat': 'S', 'bid': '2C'}]
+        }),
+        content_type='application/json',
+        headers={'Accept': 'text/event-stream'}
+    )
+    events = sse_events(response)
+    assert [event for event, _ in events] == [
+        'bid', 'reasoning', 'call', 'bid', 'call', 'bid', 'call', 'done'
+    ]
+    assert [body['seat'] for event, body in events if event == 'call'] == ['W', 'N', 'E']
+    assert events[-1][1]['next_seat'] == 'S'
+
+def test_auction_advance_upstream_failure_keeps_played_bids(client, fake_upstream, monkeypatch):
+    """Test an upstream failure mid-batch returns the seats already played"""
+    def post_json(payload, timeout=None):
+        raise slam_backend.UpstreamError('down', 503)
+    monkeypatch.setattr(slam_backend.upstream, 'post_json', post_json)
+    response = client.post('/api/auction/advance',
+        data=json.dumps({
+            'scenario_id': 'U01', 'user_seat': 'W',
+            'auction': U01_OPENING + [{'seat': 'E', 'bid': 'Pass'}, {'seat': 'S', 'bid': '2C'},
+                                      {'seat': 'W', 'bid': 'Pass'}]
+        }),
+        content_type='application/json'
+    )
+    # N's Stayman reply and E's pass are local; S needs the (failing) LLM
+    assert response.status_code == 503
+    assert [b['bid'] for b in json.loads(response.data)['bids']] == ['2H', 'Pass']
+
+def test_auction_advance_rejects_bad_requests(client):
+    """Test unknown scenarios and malformed auctions are rejected"""
+    response = client.post('/api/auction/advance',
+        data=json.dumps({'scenario_id': 'ZZ99', 'auction': []}),
+        content_type='application/json'
+    )
+    assert response.status_code == 404
+    response = client.post('/api/auction/advance',
+        data=json.dumps({'scenario_id': 'U01', 'auction': [{'seat': 'Q'}]}),
+        content_type='application/json'
+    )
+    assert response.status_code == 400
+
+def test_api_bid_served_from_auction_tree(client, fake_upstream, monkeypatch, tmp_path):
+    """Test precomputed answers are served before going upstream"""
+    from auction_tree import AuctionTree, tree_key, write_tree
+    auction = [{'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'}]
+    path = str(tmp_path / 'tree.json.gz')
+    write_tree(path, {tree_key('U01', 'S', auction): ['2C', 'Stayman', 'llm']},
+               slam_backend.choose_model(), 1)
+    monkeypatch.setattr(slam_backend, 'auction_tree', AuctionTree(path))
+    
+    response = client.post('/api/bid',
+        data=json.dumps({'scenario_id': 'U01', 'seat': 'S', 'auction': auction}),
+        content_type='application/json'
+    )
+    data = json.loads(response.data)
+    assert data['bid'] == '2C' and data['source'] == 'precomputed'
+    assert fake_upstream == []
+    assert json.loads(client.get('/health').data)['auction_tree']['hits'] == 1
+
+@pytest.fixture
+def built_dist(monkeypatch, tmp_path):
+    """A minimal up-to-date dist/ with one prebuilt page and asset"""
+    import build_pages
+    (tmp_path / 'assets').mkdir()
+    (tmp_path / 'slam-auction-full.html').write_text('<html>built</html>' * 20)
+    (tmp_path / 'assets' / 'full.abc.js').write_text('console.log(1);' * 20)
+    (tmp_path / build_pages.MANIFEST).write_text(json.dumps({'sources': build_pages.source_digests()}))
+    files, built = slam_backend.load_static_files(str(tmp_path))
+    assert built
+    monkeypatch.setattr(slam_backend, 'static_files', files)
+    return tmp_path
+
+def test_full_mode_serves_built_page(client, built_dist):
+    """Test /full uses the precompiled page, compressed when accepted"""
+    response = client.get('/full', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/html'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert client.get('/full').data == b'<html>built</html>' * 20
+
+def test_assets_are_immutable(client, built_dist):
+    """Test hashed assets get a long cache lifetime"""
+    response = client.get('/assets/full.abc.js', headers={'Accept-Encoding': 'br;q=0, gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert response.cache_control.max_age == 365 * 24 * 3600
+
+def test_assets_reject_missing_and_traversal(client, built_dist):
+    assert client.get('/assets/nope.js').status_code == 404
+    assert client.get('/assets/../slam-auction-full.html').status_code == 404
+
+def test_pages_revalidate_with_etag(client):
+    """Test repeat visits get 304 Not Modified without a body"""
+    first = client.get('/', headers={'Accept-Encoding': 'br'})
+    assert first.headers['Content-Encoding'] == 'br'
+    assert first.headers['Cache-Control'] == 'no-cache'
+    etag = first.headers['ETag']
+    
+    again = client.get('/', headers={'Accept-Encoding': 'br', 'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == etag
+    
+    # A different encoding is a different representation
+    plain = client.get('/', headers={'If-None-Match': etag})
+    assert plain.status_code == 200 and 'Content-Encoding' not in plain.headers
+
+def test_pages_revalidate_with_last_modified(client):
+    first = client.get('/bridge-101')
+    again = client.get('/bridge-101', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert again.status_code == 304
+
+def test_scenarios_api_returns_a_filtered_page(client):
+    """The pages fetch just the scenarios a session needs"""
+    response = client.get('/api/scenarios?set=single&module=COMPETE&limit=2&offset=1')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['total'] == 5
+    assert [s['id'] for s in data['scenarios']] == ['C02', 'C03']
+    assert data['scenarios'][0]['correct_bid']
+
+def test_scenarios_api_trims_fields_and_hands(client):
+    """fields= projects records; full-auction deals only include the user's hand"""
+    titles = client.get('/api/scenarios?set=full&fields=title').get_json()
+    assert titles['total'] == 15
+    assert titles['scenarios'][0] == {'id': 'U01', 'title': 'Responding to 1NT'}
+
+    scenario = client.get('/api/scenarios/full/U01').get_json()
+    assert list(scenario['hands']) == ['S']
+    assert client.get('/api/scenarios/full/NOPE').status_code == 404
+
+def test_scenarios_api_rejects_bad_queries(client):
+    """Unknown sets and out-of-range pages are 400s"""
+    assert client.get('/api/scenarios?set=nope').status_code == 400
+    assert client.get('/api/scenarios?limit=0').status_code == 400
+    assert client.get('/api/scenarios?offset=abc').status_code == 400
+
+def test_scenarios_api_revalidates_with_etag(client):
+    """A repeat query is a bodyless 304; a different query gets its own ETag"""
+    first = client.get('/api/scenarios?set=full&module=BASIC')
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    repeat = client.get('/api/scenarios?set=full&module=BASIC', headers={'If-None-Match': etag})
+    assert repeat.status_code == 304
+    assert repeat.data == b''
+
+    other = client.get('/api/scenarios?set=full&module=COMPETE', headers={'If-None-Match': etag})
+    assert other.status_code == 200
+    assert other.headers['ETag'] != etag
+
+U01_TABLE = {strain: {'N': 12, 'E': 1, 'S': 12, 'W': 1} for strain in ('NT', 'S', 'H', 'D', 'C')}
+
+@pytest.fixture
+def u01_table(monkeypatch):
+    """U01 with a known trick table, so no deal is solved during tests"""
+    scenario = dict(slam_backend.get_scenario('U01'), dd_tricks=U01_TABLE)
+    monkeypatch.setattr(slam_backend, 'get_scenario',
+                        lambda scenario_id: scenario if scenario_id == 'U01' else None)
+
+def test_contract_score_compares_with_double_dummy_best(client, u01_table):
+    """A finished auction is scored by what its contract makes"""
+    auction = U01_OPENING + [{'seat': s, 'bid': b} for s, b in
+                             [('E', 'Pass'), ('S', '3NT'), ('W', 'Pass'), ('N', 'Pass'), ('E', 'Pass')]]
+    response = client.post('/api/contract/score',
+        data=json.dumps({'scenario_id': 'U01', 'auction': auction}),
+        content_type='application/json'
+    )
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['contract'] == '3NT by N' and data['tricks'] == 12 and data['score'] == 490
+    assert data['optimal']['contract'] == '6NT by N' and data['difference'] == 490 - 990
+    assert not data['reached_optimal']
+
+def test_contract_score_reached_optimal_follows_double_dummy(client, u01_table):
+    """Reaching the stored double-dummy contract counts as optimal"""
+    auction = U01_OPENING + [{'seat': s, 'bid': b} for s, b in
+                             [('E', 'Pass'), ('S', '6NT'), ('W', 'Pass'), ('N', 'Pass'), ('E', 'Pass')]]
+    data = client.post('/api/contract/score', json={'scenario_id': 'U01', 'auction': auction}).get_json()
+    assert data['contract'] == '6NT by N' and data['reached_optimal']
+
+def test_contract_score_never_solves_in_the_request(client, monkeypatch):
+    """A deal without a stored trick table is a 503, a malformed deal a 422"""
+    scenario = {k: v for k, v in slam_backend.get_scenario('U01').items() if k not in ('dd_tricks', 'dd_contract')}
+    broken = dict(scenario, hands=dict(scenario['hands'], N={'S': 'A', 'H': '', 'D': '', 'C': ''}))
+    monkeypatch.setattr(slam_backend, 'get_scenario', lambda scenario_id: broken if scenario_id == 'BAD' else scenario)
+    auction = U01_OPENING + [{'seat': s, 'bid': 'Pass'} for s in 'ESW']
+    response = client.post('/api/contract/score', json={'scenario_id': 'U01', 'auction': auction})
+    assert response.status_code == 503
+    response = client.post('/api/contract/score', json={'scenario_id': 'BAD', 'auction': auction})
+    assert response.status_code == 422
+
+def test_contract_score_rejects_bad_requests(client, u01_table):
+    """Unknown scenarios are 404s; unfinished auctions are 400s"""
+    response = client.post('/api/contract/score',
+        data=json.dumps({'scenario_id': 'NOPE', 'auction': []}), content_type='application/json')
+    assert response.status_code == 404
+    response = client.post('/api/contract/score',
+        data=json.dumps({'scenario_id': 'U01', 'auction': U01_OPENING}), content_type='application/json')
+    assert response.status_code == 400
+
+@pytest.fixture
+def auto_routing(monkeypatch):
+    from model_router import ModelRouter
+    monkeypatch.setenv('CLAUDE_MODEL', 'auto')
+    router = ModelRouter()
+    monkeypatch.setattr(slam_backend, 'model_router', router)
+    return router
+
+def test_auto_routing_sends_easy_bids_to_cheap_model(client, fake_upstream, auto_routing):
+    """An uncontested response goes to the fast model only"""
+    response = client.post('/api/bid',
+        data=json.dumps({'scenario_id': 'U01', 'seat': 'S', 'auction': U01_OPENING + [{'seat': 'E', 'bid': 'Pass'}]}),
+        content_type='application/json'
+    )
+    assert response.get_json()['model'] == auto_routing.cheap
+    assert [call['model'] for call in fake_upstream] == [auto_routing.cheap]
+    assert auto_routing.stats()['routes']['cheap'] == 1
+
+def test_auto_routing_sends_contested_bids_to_strong_model(client, fake_upstream, auto_routing):
+    fake_upstream.replies.append('{"bid": "3NT", "reasoning": "Stopper"}')
+    response = client.post('/api/bid',
+        data=json.dumps({'scenario_id': 'U01', 'seat': 'S', 'auction': U01_OPENING + [{'seat': 'E', 'bid': '2H'}]}),
+        content_type='application/json'
+    )
+    assert response.get_json()['model'] == auto_routing.strong
+    assert [call['model'] for call in fake_upstream] == [auto_routing.strong]
+    assert auto_routing.stats()['reasons'] == {'contested': 1}
+
+def test_auto_routing_escalates_unusable_cheap_reply(client, fake_upstream, auto_routing):
+    """A bad cheap answer is asked again of the strong model, not repaired"""
+    fake_upstream.replies.extend(['gibberish', '{"bid": "2C", "reasoning": "Stayman"}'])
+    response = client.post('/api/bid',
+        data=json.dumps({'scenario_id': 'U01', 'seat': 'S', 'auction': U01_OPENING + [{'seat': 'E', 'bid': 'Pass'}]}),
+        content_type='application/json'
+    )
+    data = response.get_json()
+    assert data['bid'] == '2C' and data['source'] == 'llm' and data['escalated']
+    assert [call['model'] for call in fake_upstream] == [auto_routing.cheap, auto_routing.strong]
+    assert fake_upstream[0]['messages'] == fake_upstream[1]['messages']
+    assert auto_routing.stats()['escalation_rate'] == 1.0
+
+@pytest.fixture
+def table_server(monkeypatch):
+    """The app on a real port, with a stub provider, for WebSocket clients"""
+    import threading
+    from werkzeug.serving import make_server
+    from bid_cache import BidCache
+    from limits import ClientLimiter
+    from providers import ProviderRouter, StubProvider
+    from sessions import SessionStore
+    monkeypatch.setattr(slam_backend, 'upstream', ProviderRouter([StubProvider()]))
+    monkeypatch.setattr(slam_backend, 'bid_cache', BidCache())
+    monkeypatch.setattr(slam_backend, 'client_limiter', ClientLimiter(rate=0))
+    monkeypatch.setattr(slam_backend, 'table_sessions', SessionStore())
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'ws://127.0.0.1:{server.server_port}/ws/table'
+    server.shutdown()
+
+def receive_until(ws, kind):
+    """Messages received up to and including the first of type `kind`"""
+    messages = []
+    while not messages or messages[-1]['type'] != kind:
+        messages.append(json.loads(ws.receive(timeout=5)))
+    return messages
+
+def test_table_socket_plays_ai_seats_and_takes_calls(table_server):
+    """Test a table sends only the user's calls and gets the AI calls pushed"""
+    from simple_websocket import Client
+    ws = Client.connect(table_server)
+    try:
+        ws.send(json.dumps({'type': 'start', 'scenario_id': 'U01'}))
+        messages = receive_until(ws, 'done')
+        assert messages[0]['type'] == 'session' and messages[0]['auction'] == U01_OPENING
+        session_id = messages[0]['session_id']
+        assert [m['seat'] for m in messages if m['type'] == 'call'] == ['E']
+        assert all(m['session_id'] == session_id for m in messages)
+        assert messages[-1]['next_seat'] == 'S'
+
+        ws.send(json.dumps({'type': 'call', 'bid': '1C'}))
+        assert 'not a legal call' in receive_until(ws, 'error')[-1]['error']
+
+        ws.send(json.dumps({'type': 'call', 'bid': '2C'}))
+        done = receive_until(ws, 'done')[-1]
+        assert done['next_seat'] == 'S'
+        assert [b['seat'] for b in done['bids']] == ['W', 'N', 'E']
+        assert slam_backend.table_sessions.get(session_id).auction()[2] == {'seat': 'S', 'bid': '2C'}
+    finally:
+        ws.close()
+
+def test_table_socket_fans_out_to_observers(table_server):
+    """Test observers of a table receive the owner's calls and the AI calls"""
+    from simple_websocket import Client
+    owner = Client.connect(table_server)
+    observers = [Client.connect(table_server) for _ in range(3)]
+    try:
+        owner.send(json.dumps({'type': 'start', 'scenario_id': 'U01'}))
+        session_id = receive_until(owner, 'done')[0]['session_id']
+        for observer in observers:
+            observer.send(json.dumps({'type': 'watch', 'session_id': session_id}))
+            state = receive_until(observer, 'session')[-1]
+            assert state['observer'] and len(state['auction']) == 2
+        owner.send(json.dumps({'type': 'call', 'bid': '2C'}))
+        receive_until(owner, 'done')
+        for observer in observers:
+            messages = receive_until(observer, 'done')
+            assert [(m['seat'], m.get('source')) for m in messages if m['type'] == 'call'][0] == ('S', 'user')
+            assert len([m for m in messages if m['type'] == 'call']) == 4
+        owner.close()
+        assert receive_until(observers[0], 'closed')[-1]['session_id'] == session_id
+    finally:
+        for ws in [owner] + observers:
+            if ws.connected:
+                ws.close()
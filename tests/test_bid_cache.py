@@ -0,0 +1,107 @@
+"""
+Tests for the bid response cache
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bid_cache import BidCache, cache_key, normalize_prompt
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalized_prompts_share_key():
+    """Whitespace differences do not change the key"""
+    a = 'You are N.\n  Hand:  AK5\r\n'
+    b = 'You are N.\nHand: AK5'
+    assert normalize_prompt(a) == normalize_prompt(b)
+    assert cache_key(a, 'haiku') == cache_key(b, 'haiku')
+
+
+def test_key_depends_on_model_and_params():
+    """Model and generation params are part of the key"""
+    assert cache_key('p', 'haiku') != cache_key('p', 'sonnet')
+    assert cache_key('p', 'haiku', max_tokens=300) != cache_key('p', 'haiku', max_tokens=500)
+
+
+def test_hit_and_miss_counters():
+    """Lookups are counted"""
+    cache = BidCache()
+    assert cache.get('k') is None
+    cache.set('k', {'bid': '2C'})
+    assert cache.get('k') == {'bid': '2C'}
+    stats = cache.stats()
+    assert stats['misses'] == 1
+    assert stats['hits_memory'] == 1
+
+
+def test_ttl_expiry():
+    """Entries expire after the TTL"""
+    clock = FakeClock()
+    cache = BidCache(ttl=10, clock=clock)
+    cache.set('k', 1)
+    clock.now += 11
+    assert cache.get('k') is None
+    assert cache.stats()['evictions_ttl'] == 1
+
+
+def test_lru_eviction_by_count():
+    """The least recently used entry is evicted first"""
+    cache = BidCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.stats()['evictions_lru'] == 1
+
+
+def test_eviction_by_size():
+    """Total bytes are bounded"""
+    cache = BidCache(max_bytes=30)
+    cache.set('a', 'x' * 20)
+    cache.set('b', 'y' * 20)
+    assert cache.stats()['bytes'] <= 30
+    assert cache.get('a') is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    """A fresh cache on the same SQLite file sees earlier entries"""
+    db = str(tmp_path / 'bids.sqlite')
+    BidCache(db_path=db).set('k', {'bid': '2H'})
+
+    reopened = BidCache(db_path=db)
+    assert reopened.get('k') == {'bid': '2H'}
+    assert reopened.get('k') == {'bid': '2H'}
+    stats = reopened.stats()
+    assert stats['hits_disk'] == 1
+    assert stats['hits_memory'] == 1
+
+
+def test_expired_disk_rows_are_purged_on_writes(tmp_path):
+    """Every purge_every-th set deletes expired rows from the SQLite tier"""
+    now = [0.0]
+    cache = BidCache(ttl=10, db_path=str(tmp_path / 'bids.sqlite'), purge_every=3, clock=lambda: now[0])
+    cache.set('old1', 1)
+    cache.set('old2', 2)
+    now[0] = 20.0
+    cache.set('new', 3)  # the third set purges
+    rows = [row[0] for row in cache._db.execute('SELECT key FROM bid_cache')]
+    assert rows == ['new']
+    assert cache.stats()['purged_disk'] == 2
+
+
+def test_disabled_cache():
+    """max_entries=0 turns caching off"""
+    cache = BidCache(max_entries=0)
+    cache.set('k', 1)
+    assert cache.get('k') is None
@@ -0,0 +1,91 @@
+"""
+Tests for parsing and validating LLM bid output
+"""
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bid_output import StreamingBidParser, normalize_call, parse_bid, validate_bid, repair_request, OutputStats
+
+AUCTION = [{'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'}]
+
+
+@pytest.mark.parametrize('raw,expected', [
+    ('Pass', 'Pass'), ('pass', 'Pass'), ('No Bid', 'Pass'),
+    ('Double', 'X'), ('DBL', 'X'), ('Redouble', 'XX'), ('XX', 'XX'),
+    ('2♥', '2H'), ('2h', '2H'), ('3N', '3NT'), ('3 NT', '3NT'),
+    ('4 spades', '4S'), ('1 No Trump', '1NT'),
+    ('8C', None), ('0NT', None), ('bid', None), (None, None),
+])
+def test_normalize_call(raw, expected):
+    """Symbols, words and casing map to canonical calls"""
+    assert normalize_call(raw) == expected
+
+
+def test_parse_plain_json():
+    assert parse_bid('{"bid": "2C", "reasoning": "Stayman"}') == ('2C', 'Stayman')
+
+
+def test_parse_fenced_json_with_prose():
+    text = 'Sure!\n```json\n{"bid": "2♠", "reasoning": "Transfer"}\n```\nGood luck'
+    assert parse_bid(text) == ('2S', 'Transfer')
+
+
+def test_parse_truncated_json():
+    """A reply cut off mid-reasoning still yields the bid"""
+    assert parse_bid('{"bid": "3NT", "reasoning": "Balanced 10 HC')[0] == '3NT'
+
+
+def test_parse_garbage():
+    assert parse_bid('I think I would pass here')[0] is None
+
+
+def test_validate_legal_and_illegal():
+    assert validate_bid('{"bid": "2C", "reasoning": "x"}', 'S', AUCTION)[2] is None
+    assert validate_bid('{"bid": "1S", "reasoning": "x"}', 'S', AUCTION)[2] == 'illegal'
+    assert validate_bid('{"bid": "X", "reasoning": "x"}', 'S', AUCTION)[2] == 'illegal'
+    assert validate_bid('nonsense', 'S', AUCTION)[2] == 'unparseable'
+
+
+def test_repair_request_is_short():
+    """The repair keeps the system prefix but replaces the prompt"""
+    payload = {
+        'model': 'm', 'max_tokens': 300,
+        'system': [{'type': 'text', 'text': 'preamble'}],
+        'messages': [{'role': 'user', 'content': 'x' * 2000}],
+    }
+    hand = {'S': 'KJ84', 'H': 'A963', 'D': 'K72', 'C': '85'}
+    repair = repair_request(payload, '{"bid": "1S"}', 'illegal', 'S', hand, AUCTION)
+    assert repair['system'] == payload['system']
+    content = repair['messages'][0]['content']
+    assert len(content) < 400
+    assert 'Legal calls: Pass, 2C, 2D' in content
+    assert repair['max_tokens'] <= 120
+
+
+def test_output_stats_rates():
+    stats = OutputStats()
+    for _ in range(4):
+        stats.record('haiku', 'replies')
+    stats.record('haiku', 'illegal_bids')
+    assert stats.stats()['haiku']['illegal_rate'] == 0.25
+
+
+def test_streaming_parser_releases_bid_before_reasoning():
+    """The bid event fires as soon as the bid field closes"""
+    parser = StreamingBidParser('S', AUCTION)
+    assert parser.feed('{"bid": "2') == []
+    assert parser.feed('C", "reas') == [('bid', '2C')]
+    assert parser.feed('oning": "Stay') == [('reasoning', 'Stay')]
+    assert parser.feed('man \\u26') == []  # split escape waits for the rest
+    assert parser.feed('65"}') == [('reasoning', 'man \u2665')]
+    assert parser.bid == '2C'
+
+
+def test_streaming_parser_withholds_illegal_bid():
+    parser = StreamingBidParser('S', AUCTION)
+    assert parser.feed('{"bid": "1S", "reasoning": "x"}') == [('reasoning', 'x')]
+    assert parser.bid is None
@@ -0,0 +1,108 @@
+"""
+Tests for the rule-based bidding engine
+"""
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bidding_engine import BiddingEngine, hand_hcp, suit_lengths
+
+# Hands from scenario U01
+NORTH_U01 = {'S': 'A105', 'H': 'KQ84', 'D': 'AQ6', 'C': 'K73'}
+EAST_U01 = {'S': '9632', 'H': 'J105', 'D': '10984', 'C': 'Q4'}
+
+
+def auction(*calls, dealer='N'):
+    seats = ['N', 'E', 'S', 'W']
+    start = seats.index(dealer)
+    return [{'seat': seats[(start + i) % 4], 'bid': bid} for i, bid in enumerate(calls)]
+
+
+@pytest.fixture
+def engine():
+    return BiddingEngine()
+
+
+def test_hand_parsing_counts_ten_as_one_card():
+    """'10' is a single card"""
+    assert suit_lengths(EAST_U01) == {'S': 4, 'H': 3, 'D': 4, 'C': 2}
+    assert hand_hcp(NORTH_U01) == 18
+
+
+def test_stayman_reply_shows_hearts(engine):
+    """Opener with 4 hearts answers 2H"""
+    result = engine.decide(NORTH_U01, 'N', auction('1NT', 'Pass', '2C', 'Pass'), ['stayman'])
+    assert result['bid'] == '2H'
+    assert result['rule'] == 'stayman_reply'
+
+
+def test_stayman_reply_denies_major(engine):
+    """Opener without a 4-card major answers 2D"""
+    hand = {'S': 'A105', 'H': 'KQ8', 'D': 'AQ64', 'C': 'K73'}
+    result = engine.decide(hand, 'N', auction('1NT', 'Pass', '2C', 'Pass'), ['stayman'])
+    assert result['bid'] == '2D'
+
+
+def test_stayman_reply_still_required_after_double(engine):
+    """A double of Stayman does not cancel the reply"""
+    hand = {'S': 'AJ73', 'H': 'KQ8', 'D': 'AQ6', 'C': 'K73'}
+    result = engine.decide(hand, 'N', auction('1NT', 'Pass', '2C', 'X'), ['stayman'])
+    assert result['bid'] == '2S'
+
+
+def test_stayman_needs_convention_enabled(engine):
+    """Without stayman enabled the engine falls back"""
+    assert engine.decide(NORTH_U01, 'N', auction('1NT', 'Pass', '2C', 'Pass'), []) is None
+
+
+def test_opponent_2c_is_not_stayman(engine):
+    """An opponent's 2C is never answered as Stayman"""
+    calls = auction('1NT', '2C', 'Pass', 'Pass')
+    result = engine.decide(NORTH_U01, 'N', calls, ['stayman'])
+    assert result is None or result['rule'] != 'stayman_reply'
+
+
+def test_transfer_completion(engine):
+    """2H transfer is completed with 2S"""
+    result = engine.decide(NORTH_U01, 'N', auction('1NT', 'Pass', '2H', 'Pass'), ['transfers'])
+    assert result['bid'] == '2S'
+    assert result['rule'] == 'transfer_completion'
+
+
+def test_weak_defender_passes(engine):
+    """A weak hand with no long suit passes over the opponents' opening"""
+    result = engine.decide(EAST_U01, 'E', auction('1NT'), [])
+    assert result['bid'] == 'Pass'
+    assert result['rule'] == 'weak_no_overcall'
+
+
+def test_weak_responder_passes_one_of_a_suit(engine):
+    """Under 6 HCP opposite a 1-level opening is a pass"""
+    hand = {'S': '9632', 'H': 'J105', 'D': '10984', 'C': 'Q4'}
+    result = engine.decide(hand, 'W', auction('1S', 'Pass', 'Pass', dealer='E'), [])
+    assert result['bid'] == 'Pass'
+
+
+def test_partner_takeout_double_is_not_passed(engine):
+    """A weak hand must still answer partner's takeout double"""
+    hand = {'S': '9632', 'H': 'J105', 'D': '10984', 'C': 'Q4'}
+    assert engine.decide(hand, 'W', auction('1S', 'X', 'Pass', dealer='N'), []) is None
+
+
+def test_judgment_calls_fall_back(engine):
+    """Game-going responder hands are left to the LLM"""
+    hand = {'S': 'KJ84', 'H': 'A963', 'D': 'K72', 'C': '85'}
+    assert engine.decide(hand, 'S', auction('1NT', 'Pass'), ['stayman']) is None
+
+
+def test_stats_count_local_and_fallback(engine):
+    """Per-path counters track local answers"""
+    engine.decide(NORTH_U01, 'N', auction('1NT', 'Pass', '2C', 'Pass'), ['stayman'])
+    engine.decide({'S': 'KJ84', 'H': 'A963', 'D': 'K72', 'C': '85'}, 'S', auction('1NT', 'Pass'), [])
+    stats = engine.stats()
+    assert stats['local'] == 1
+    assert stats['llm_fallback'] == 1
+    assert stats['by_rule'] == {'stayman_reply': 1}
@@ -0,0 +1,52 @@
+"""
+Tests for the page build step
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import build_pages
+
+SOURCE = '''<head>
+    <script crossorigin src="https://unpkg.com/react@18/umd/react.production.min.js"></script>
+    <script src="https://unpkg.com/@babel/standalone/babel.min.js"></script>
+</head>
+<body>
+    <script type="text/babel">
+        const App = () => <div>hi</div>;
+    </script>
+</body>'''
+
+
+def test_build_page_swaps_cdn_and_babel_for_local_assets():
+    html = build_pages.build_page(SOURCE, ['/assets/react.1.js'], '/assets/full.2.js')
+    assert 'unpkg.com' not in html
+    assert 'text/babel' not in html
+    assert '<script defer src="/assets/react.1.js"></script>\n</head>' in html
+    assert html.index('react.1.js') < html.index('full.2.js')
+
+
+def test_stale_or_missing_build_is_not_current(tmp_path):
+    assert not build_pages.is_current(str(tmp_path))
+    sources = dict(build_pages.source_digests(), **{'slam-auction-full.html': 'old'})
+    (tmp_path / build_pages.MANIFEST).write_text(json.dumps({'sources': sources}))
+    assert not build_pages.is_current(str(tmp_path))
+
+
+def test_build_writes_hashed_precompressed_assets(tmp_path):
+    pytest.importorskip('dukpy')
+    pytest.importorskip('brotli')
+    out = str(tmp_path / 'dist')
+    manifest = build_pages.build(out)
+    assert build_pages.is_current(out)
+    for url in manifest['assets'].values():
+        path = os.path.join(out, url.lstrip('/'))
+        assert all(os.path.exists(path + suffix) for suffix in ('', '.gz', '.br'))
+    with open(os.path.join(out, 'assets', os.path.basename(manifest['assets']['full'])), encoding='utf-8') as f:
+        bundle = f.read()
+    assert 'React.createElement' in bundle and '<div' not in bundle
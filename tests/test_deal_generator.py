@@ -0,0 +1,105 @@
+"""
+Tests for the constrained deal generator
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from deal_generator import (PROFILES, SEATS, DealGenerator, generate_deals, hand_features,
+                            hand_masks, seat_mask)
+from hand_eval import evaluate_batch, suit_cards, suit_lengths
+from hand_eval import hcp as hand_hcp
+
+
+def full_deck(hands):
+    return sorted(f'{suit}{card}' for hand in hands.values()
+                  for suit in 'SHDC' for card in suit_cards(hand[suit]))
+
+
+def test_stayman_deals_meet_spec():
+    """Every deal is a full deck in the scenario shape and meets the profile"""
+    for hands in generate_deals('stayman', 200, seed=1):
+        assert set(hands) == set(SEATS)
+        assert len(full_deck(hands)) == 52 and len(set(full_deck(hands))) == 52
+        assert 15 <= hand_hcp(hands['N']) <= 17
+        assert sorted(suit_lengths(hands['N']).values()) in ([3, 3, 3, 4], [2, 3, 4, 4], [2, 3, 3, 5])
+        assert 8 <= hand_hcp(hands['S']) <= 15
+        assert suit_lengths(hands['S'])['S'] == 4 and suit_lengths(hands['S'])['H'] == 4
+
+
+def test_alternatives_are_or():
+    """A list of constraints for a seat means any of them"""
+    for hands in generate_deals('transfers', 200, seed=2):
+        lengths = suit_lengths(hands['S'])
+        assert (lengths['S'] >= 5 and lengths['H'] <= 3) or (lengths['H'] >= 5 and lengths['S'] <= 3)
+
+
+def test_unconstrained_deals_are_uniform():
+    """Known hand statistics: 10 HCP on average, 47.6% balanced, 5.1% with a void"""
+    owners = DealGenerator({}, seed=3).sample(50000)
+    hcp, lengths = hand_features(owners, 0)
+    assert abs(hcp.mean() - 10) < 0.1
+    assert abs(seat_mask(lengths, None, {'balanced': True}).mean() - 0.4762) < 0.01
+    assert abs((lengths.min(axis=1) == 0).mean() - 0.0512) < 0.005
+
+
+def test_shape_weighting_matches_plain_rejection():
+    """Conditioning on shape gives the same deals as rejecting whole shuffles"""
+    spec = {'N': {'balanced': True}, 'S': {'lengths': {'S': [5, 13]}}}
+    owners = DealGenerator(spec, seed=4).sample(20000)
+    _, north = hand_features(owners, 0)
+
+    rng = np.random.default_rng(4)
+    deck = np.repeat(np.arange(4, dtype=np.uint8), 13)
+    shuffled = rng.permuted(np.broadcast_to(deck, (150000, 52)), axis=1)
+    _, plain_north = hand_features(shuffled, 0)
+    _, plain_south = hand_features(shuffled, 2)
+    keep = seat_mask(plain_north, None, spec['N']) & seat_mask(plain_south, None, spec['S'])
+
+    # South's long spades leave North fewer: P(N has 4+ spades) must agree
+    assert abs((north[:, 0] >= 4).mean() - (plain_north[keep][:, 0] >= 4).mean()) < 0.02
+
+
+def test_evaluated_constraints():
+    """ltc, controls and quick_tricks ranges are checked on the dealt ranks"""
+    spec = {'S': {'ltc': [5, 6], 'controls': [4, 12]}, 'N': {'quick_tricks': [3, 13]}}
+    owners = DealGenerator(spec, seed=6).sample(500)
+    south = evaluate_batch(hand_masks(owners)[:, 2])
+    north = evaluate_batch(hand_masks(owners)[:, 0])
+    assert ((south['ltc'] >= 5) & (south['ltc'] <= 6)).all() and (south['controls'] >= 4).all()
+    assert (north['quick_tricks'] >= 3).all()
+
+
+def test_hand_masks_partition_the_deck():
+    """The four 52-bit hand masks are disjoint and cover every card"""
+    masks = hand_masks(DealGenerator({}, seed=5).sample(100))
+    assert (np.bitwise_or.reduce(masks, axis=1) == np.uint64(2 ** 52 - 1)).all()
+    assert all(bin(int(mask)).count('1') == 13 for mask in masks.ravel())
+
+
+def test_seed_is_reproducible():
+    assert generate_deals('michaels', 5, seed=7) == generate_deals('michaels', 5, seed=7)
+
+
+def test_bad_specs_rejected():
+    """Typos and impossible shapes fail up front"""
+    with pytest.raises(ValueError):
+        DealGenerator({'X': {}})
+    with pytest.raises(ValueError):
+        DealGenerator({'N': {'points': [1, 2]}})
+    with pytest.raises(ValueError):
+        DealGenerator({'N': {'hcp': [20, 10]}})
+    with pytest.raises(ValueError):
+        DealGenerator({'N': {'ltc': [9, 4]}})
+    with pytest.raises(ValueError):
+        DealGenerator({'N': {'lengths': {'S': [8, 13]}}, 'S': {'lengths': {'S': [6, 13]}}})
+
+
+def test_every_profile_generates():
+    for name in PROFILES:
+        assert len(DealGenerator(PROFILES[name], seed=8).sample(10)) == 10
@@ -0,0 +1,144 @@
+"""
+Tests for the double-dummy solver and contract scoring
+"""
+
+import functools
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import double_dummy
+from auction import final_contract
+from double_dummy import (NOTRUMP, Solver, best_contract, contract_score, dd_table, deal_hash,
+                          parse_hands, score_contract)
+
+# Each player holds one whole suit
+SOLID_SUITS = {
+    'N': {'S': 'AKQJ1098765432', 'H': '', 'D': '', 'C': ''},
+    'E': {'S': '', 'H': 'AKQJ1098765432', 'D': '', 'C': ''},
+    'S': {'S': '', 'H': '', 'D': 'AKQJ1098765432', 'C': ''},
+    'W': {'S': '', 'H': '', 'D': '', 'C': 'AKQJ1098765432'},
+}
+
+
+def brute_force(masks, trump, leader):
+    """Plain minimax over every card: N-S tricks from here."""
+    @functools.lru_cache(None)
+    def best(hands, seat, played, lead_suit, win_seat, win_suit, win_rank):
+        if not any(hands):
+            return 0
+        mine = range(seat * 4, seat * 4 + 4)
+        suits = [lead_suit] if lead_suit >= 0 and hands[seat * 4 + lead_suit] else range(4)
+        values = []
+        for suit in suits:
+            for rank in range(13):
+                if not hands[seat * 4 + suit] >> rank & 1:
+                    continue
+                after = list(hands)
+                after[mine[suit]] ^= 1 << rank
+                if played == 0 or (suit == win_suit and rank > win_rank) or (suit == trump and win_suit != trump):
+                    win = (seat, suit, rank)
+                else:
+                    win = (win_seat, win_suit, win_rank)
+                if played == 3:
+                    values.append((win[0] % 2 == 0) + best(tuple(after), win[0], 0, -1, -1, -1, -1))
+                else:
+                    values.append(best(tuple(after), (seat + 1) % 4, played + 1,
+                                       suit if played == 0 else lead_suit, *win))
+        return max(values) if seat % 2 == 0 else min(values)
+    return best(tuple(masks), leader, 0, -1, -1, -1, -1)
+
+
+def random_ending(cards_each, rng):
+    deck = list(range(52))
+    rng.shuffle(deck)
+    masks = [0] * 16
+    for seat in range(4):
+        for card in deck[seat * cards_each:(seat + 1) * cards_each]:
+            masks[seat * 4 + card // 13] |= 1 << card % 13
+    return masks
+
+
+def test_solver_matches_brute_force_on_endings():
+    """Pruning, quick tricks and the transposition table never change the answer"""
+    rng = random.Random(1)
+    for _ in range(150):
+        masks = random_ending(rng.choice([2, 3, 4]), rng)
+        trump = rng.choice([0, 1, 2, 3, NOTRUMP])
+        leader = rng.randrange(4)
+        assert Solver(masks, trump).tricks(leader) == brute_force(masks, trump, leader)
+
+
+def test_full_deal_table():
+    """One whole suit each: only the spade holder's side can make anything"""
+    table = dd_table(SOLID_SUITS)
+    assert table['S'] == {'N': 13, 'E': 0, 'S': 13, 'W': 0}
+    assert table['H'] == {'N': 0, 'E': 13, 'S': 0, 'W': 13}
+    # In notrump the opening leader runs their suit
+    assert table['NT'] == {'N': 0, 'E': 0, 'S': 0, 'W': 0}
+    assert best_contract(table)['contract'] == '7S by N'
+
+
+def test_tables_are_memoized_by_deal():
+    """The same deal written differently is solved once"""
+    table = dd_table(SOLID_SUITS)
+    spelled = {seat: {suit: cards.replace('10', 'T') for suit, cards in hand.items()}
+               for seat, hand in SOLID_SUITS.items()}
+    assert deal_hash(spelled) == deal_hash(SOLID_SUITS)
+    assert dd_table(spelled) is table
+    assert deal_hash(SOLID_SUITS) in double_dummy._tables
+
+
+def test_parse_rejects_bad_deals():
+    hands = {seat: dict(hand) for seat, hand in SOLID_SUITS.items()}
+    hands['W']['C'] = 'AKQJ109876543'
+    with pytest.raises(ValueError):
+        parse_hands(hands)
+    hands['W']['C'] = 'AKQJ1098765432'
+    hands['E'] = {'S': '2', 'H': 'AKQJ109876543', 'D': '', 'C': ''}  # North's two of spades too
+    with pytest.raises(ValueError):
+        parse_hands(hands)
+
+
+@pytest.mark.parametrize('level,strain,tricks,vulnerable,doubled,score', [
+    (4, 'H', 10, False, 0, 420),
+    (3, 'NT', 10, False, 0, 430),
+    (6, 'S', 12, True, 0, 1430),
+    (7, 'NT', 13, True, 0, 2220),
+    (2, 'C', 8, False, 1, 180),
+    (1, 'D', 8, True, 2, 630),
+    (1, 'NT', 6, False, 0, -50),
+    (4, 'S', 7, False, 1, -500),
+    (4, 'S', 6, False, 1, -800),
+    (3, 'H', 7, True, 1, -500),
+    (5, 'C', 9, False, 2, -600),
+])
+def test_contract_score(level, strain, tricks, vulnerable, doubled, score):
+    assert contract_score(level, strain, tricks, vulnerable, doubled) == score
+
+
+def test_best_contract_prefers_score_then_lowest_level():
+    table = {strain: {seat: 0 for seat in 'NESW'} for strain in ('NT', 'S', 'H', 'D', 'C')}
+    table['H']['N'] = table['H']['S'] = 11
+    table['NT']['S'] = 10
+    # 4H+1 (450) beats 3NT+1 (430); 5H also scores 450 but is higher
+    assert best_contract(table)['contract'] == '4H by N'
+    table['NT']['S'] = 12
+    assert best_contract(table)['contract'] == '6NT by S'
+    assert best_contract({strain: {seat: 6 for seat in 'NESW'} for strain in table}) is None
+
+
+def test_score_contract_from_either_side():
+    table = dd_table(SOLID_SUITS)
+    auction = [{'seat': 'N', 'bid': '4S'}] + [{'seat': s, 'bid': 'Pass'} for s in 'ESW']
+    result = score_contract(table, final_contract(auction), 'None', 'NS')
+    assert result['contract'] == '4S by N' and result['tricks'] == 13 and result['result'] == 3
+    assert result['score'] == 510 and result['optimal_score'] == 1510 and result['difference'] == -1000
+    defence = score_contract(table, final_contract(auction), 'None', 'EW')
+    assert defence['score'] == -510 and defence['difference'] == 1000
+    passed = score_contract(table, None)
+    assert passed['contract'] == 'Passed Out' and passed['difference'] == -1510
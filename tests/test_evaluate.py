@@ -0,0 +1,77 @@
+"""
+Tests for the offline evaluation harness
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from evaluate import Checkpoint, RateLimiter, eval_items, evaluate, load_backend, opening_auction, summarize
+from providers import StubProvider
+from scenarios import get_scenario, get_store
+
+
+@pytest.fixture(scope='module')
+def stub_backend():
+    stub = StubProvider()
+    backend, usage = load_backend(stub)
+    return stub, backend, usage
+
+
+def test_items_cover_both_sets():
+    items = eval_items(get_store())
+    assert len(items) == 30
+    single = next(item for item in items if item['key'] == 'single/U01')
+    assert single['expected'] == ['2C']
+    assert single['request']['auction'] == [{'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'}]
+    assert next(item for item in items if item['key'] == 'full/U04')['expected'] == ['4S', '6S']
+
+
+def test_opening_auction_passes_round_to_user():
+    assert opening_auction(get_scenario('U05')) == [{'seat': 'S', 'bid': '1S'}, {'seat': 'W', 'bid': 'Pass'}]
+    assert opening_auction(get_scenario('D03')) == [{'seat': 'N', 'bid': '1C'}]
+
+
+def test_rate_limiter_spaces_starts():
+    now = [0.0]
+    slept = []
+    limiter = RateLimiter(4, clock=lambda: now[0], sleep=slept.append)
+    for _ in range(3):
+        limiter.wait()
+    assert slept == [0.25, 0.5]
+
+
+def test_stub_run_resumes_from_checkpoint(tmp_path, stub_backend):
+    """A second run with the same checkpoint asks nothing again"""
+    stub, backend, usage = stub_backend
+    items = eval_items(get_store(), ids=('U01', 'U02', 'C01'))
+    path = str(tmp_path / 'eval.jsonl')
+
+    model, asked = evaluate(backend, usage, items, 'haiku', Checkpoint(path), workers=3)
+    assert asked == 6
+    calls = stub.calls
+    records = [json.loads(line) for line in open(path)]
+    assert len(records) == 6 and all(r['error'] is None for r in records)
+
+    checkpoint = Checkpoint(path)
+    assert evaluate(backend, usage, items, 'haiku', checkpoint, workers=3) == (model, 0)
+    assert stub.calls == calls
+
+    row, = summarize(checkpoint.records.values())
+    asked_model = [r for r in records if r['source'] in ('llm', 'repair', 'fallback')]
+    assert row['items'] == 6 and row['model_items'] == len(asked_model) == calls
+    assert row['accuracy'] == round(sum(r['bid'] in r['expected'] for r in records) / 6, 3)
+    assert row['input_tokens'] > 0 and row['cost_usd'] > 0
+
+
+def test_checkpoint_skips_truncated_line(tmp_path):
+    path = tmp_path / 'eval.jsonl'
+    path.write_text(json.dumps({'model': 'm', 'key': 'single/U01'}) + '\n{"model": "m", "ke')
+    checkpoint = Checkpoint(str(path))
+    assert checkpoint.done('m', 'single/U01') and len(checkpoint.records) == 1
+    checkpoint.add({'model': 'm', 'key': 'single/U02'})
+    assert len(Checkpoint(str(path)).records) == 2
@@ -0,0 +1,99 @@
+"""
+Tests for hand evaluation
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from deal_generator import DealGenerator, hand_features, hand_masks
+from hand_eval import (DISTRIBUTIONS, deal_problems, evaluate, evaluate_batch, hcp, pack_hand,
+                       suit_lengths, unpack_hand)
+
+# U01's North: 18 HCP, 4-3-3-3
+NORTH = {'S': 'A105', 'H': 'KQ84', 'D': 'AQ6', 'C': 'K73'}
+
+
+def test_single_hand_values():
+    """Each value by its textbook definition"""
+    values = evaluate(NORTH)
+    assert values['hcp'] == 18
+    assert values['lengths'] == {'S': 3, 'H': 4, 'D': 3, 'C': 3}
+    assert values['shape'] == '4-3-3-3' and values['distribution'] == 'balanced'
+    # A105: 2 losers, KQ84: 1, AQ6: 1, K73: 2
+    assert values['ltc'] == 6
+    # A 1, KQ 1, AQ 1.5, Kx 0.5
+    assert values['quick_tricks'] == 4.0
+    assert values['controls'] == 6
+    assert values['stoppers'] == ['S', 'H', 'D', 'C']
+
+
+@pytest.mark.parametrize('hand, ltc, quick, stoppers', [
+    ({'S': 'AKQJ10987', 'H': 'A', 'D': 'K', 'C': '32'}, 3, 3.0, ['S', 'H']),  # K singleton: a loser, no stopper
+    ({'S': 'Q32', 'H': 'J432', 'D': 'K2', 'C': '5432'}, 9, 0.5, ['S', 'H', 'D']),
+    ({'S': 'J32', 'H': '-', 'D': 'AKQJ1098', 'C': '5432'}, 6, 2.0, ['D']),  # a void has no losers
+])
+def test_losers_quick_tricks_and_stoppers(hand, ltc, quick, stoppers):
+    values = evaluate(hand)
+    assert (values['ltc'], values['quick_tricks'], values['stoppers']) == (ltc, quick, stoppers)
+
+
+@pytest.mark.parametrize('hand, distribution', [
+    ({'S': 'A10543', 'H': 'KQ84', 'D': 'AQ', 'C': 'K7'}, 'semi_balanced'),
+    ({'S': 'AKJ1054', 'H': 'Q84', 'D': 'A7', 'C': '73'}, 'semi_balanced'),
+    ({'S': 'AKJ1054', 'H': 'Q84', 'D': 'A7', 'C': '7'}, None),  # 12 cards
+    ({'S': 'AKJ105432', 'H': 'Q84', 'D': 'A7', 'C': '-'}, 'single_suited'),
+    ({'S': 'AKJ105', 'H': 'Q843', 'D': 'A72', 'C': '7'}, 'two_suited'),
+    ({'S': 'AKJ10', 'H': 'Q843', 'D': 'A762', 'C': '7'}, 'three_suited'),
+])
+def test_distribution_classes(hand, distribution):
+    assert evaluate(hand)['distribution'] == distribution
+
+
+def test_pack_round_trip():
+    mask = pack_hand(NORTH)
+    assert bin(mask).count('1') == 13
+    assert unpack_hand(mask) == {'S': 'AT5', 'H': 'KQ84', 'D': 'AQ6', 'C': 'K73'}
+    assert hcp(mask) == hcp(NORTH) == 18
+    assert suit_lengths(mask)['H'] == 4
+    with pytest.raises(ValueError):
+        pack_hand({'S': 'AKA'})
+
+
+def test_batch_matches_single_hands():
+    """evaluate_batch agrees with evaluate on every hand of random deals"""
+    owners = DealGenerator({}, seed=11).sample(300)
+    masks = hand_masks(owners).ravel()
+    batch = evaluate_batch(masks)
+    for i, mask in enumerate(masks.tolist()):
+        values = evaluate(mask)
+        assert batch['hcp'][i] == values['hcp']
+        assert list(batch['lengths'][i]) == list(values['lengths'].values())
+        assert DISTRIBUTIONS[batch['distribution'][i]] == values['distribution']
+        assert batch['ltc'][i] == values['ltc']
+        assert batch['quick_tricks'][i] == values['quick_tricks']
+        assert batch['controls'][i] == values['controls']
+        assert [s for s in range(4) if batch['stoppers'][i] >> s & 1] == [
+            'SHDC'.index(suit) for suit in values['stoppers']]
+
+
+def test_batch_agrees_with_deal_generator_features():
+    owners = DealGenerator({}, seed=12).sample(2000)
+    batch = evaluate_batch(hand_masks(owners)[:, 0])
+    hcp_values, lengths = hand_features(owners, 0)
+    assert (batch['hcp'] == hcp_values).all()
+    assert (batch['lengths'] == lengths).all()
+    # 12 controls in the deck, 3 per hand on average
+    assert abs(batch['controls'].mean() - 3) < 0.1
+
+
+def test_deal_problems():
+    hands = {'N': NORTH, 'S': {'S': 'A2', 'H': 'K', 'D': '', 'C': ''}}
+    assert deal_problems({'N': NORTH}) == []
+    assert deal_problems(hands) == ['S holds 3 cards', 'SA dealt twice', 'HK dealt twice']
+    assert deal_problems({'N': {'S': 'KK'}}) == ['N: SK appears twice']
+    assert evaluate_batch(np.array([pack_hand({'S': 'AK'})], dtype=np.uint64))['distribution'][0] == -1
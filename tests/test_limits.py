@@ -0,0 +1,74 @@
+"""
+Tests for the per-client limiter, the concurrency cap and the token ledger
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from limits import ClientLimiter, ConcurrencyLimit, TokenLedger
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_client_limiter_allows_burst_then_refills():
+    clock = Clock()
+    limiter = ClientLimiter(rate=2.0, burst=3, clock=clock)
+    assert [limiter.allow('a')[0] for _ in range(4)] == [True, True, True, False]
+    assert limiter.allow('a') == (False, 0.5)
+    assert limiter.allow('b')[0]  # each key has its own bucket
+    clock.now = 0.5
+    assert limiter.allow('a')[0]
+    assert not limiter.allow('a')[0]
+    stats = limiter.stats()
+    assert stats['clients'] == 2 and stats['limited'] == 3
+
+
+def test_client_limiter_forgets_oldest_clients():
+    limiter = ClientLimiter(rate=1.0, burst=1, max_clients=2, clock=Clock())
+    for key in 'abc':
+        limiter.allow(key)
+    assert limiter.stats()['clients'] == 2
+    assert limiter.allow('a')[0]  # dropped, so back to a full bucket
+    assert not limiter.allow('c')[0]
+
+
+def test_client_limiter_disabled_with_zero_rate():
+    limiter = ClientLimiter(rate=0, burst=1)
+    assert all(limiter.allow('a')[0] for _ in range(10))
+
+
+def test_concurrency_limit_refuses_when_full():
+    limit = ConcurrencyLimit(2)
+    assert limit.try_acquire() and limit.try_acquire()
+    assert not limit.try_acquire()
+    limit.release()
+    assert limit.try_acquire()
+    assert limit.stats() == {'limit': 2, 'in_flight': 2, 'peak': 2, 'rejected': 1}
+    unlimited = ConcurrencyLimit(0)
+    assert all(unlimited.try_acquire() for _ in range(100))
+
+
+def test_token_ledger_prices_and_expires():
+    clock = Clock(1000.0)
+    ledger = TokenLedger({'cheap': (1.0, 4.0)}, window=120, bucket=60, clock=clock)
+    ledger.record('cheap', 1000, 500)
+    ledger.record('unknown', 10, 10)
+    stats = ledger.stats()
+    assert stats['models']['cheap'] == {'calls': 1, 'input_tokens': 1000, 'output_tokens': 500, 'cost_usd': 0.003}
+    assert stats['models']['unknown']['cost_usd'] == 0.0
+    clock.now = 1100.0
+    ledger.record('cheap', 1000, 0)
+    assert ledger.stats()['models']['cheap']['calls'] == 2
+    clock.now = 1300.0
+    stats = ledger.stats()
+    assert stats['models'] == {} and stats['cost_usd'] == 0.0
+    assert stats['lifetime']['models']['cheap']['calls'] == 2
+    assert stats['lifetime']['cost_usd'] == 0.004
@@ -0,0 +1,46 @@
+"""
+Tests for the Prometheus text exposition
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from metrics import Registry
+
+
+def test_counter_renders_labels():
+    registry = Registry()
+    requests = registry.counter('app_requests_total', 'Requests', ('route', 'status'))
+    requests.inc('/api/bid', '200')
+    requests.inc('/api/bid', '200', amount=2)
+    requests.inc('/say "hi"', '500')
+    text = registry.render()
+    assert '# TYPE app_requests_total counter' in text
+    assert 'app_requests_total{route="/api/bid",status="200"} 3' in text
+    assert 'app_requests_total{route="/say \\"hi\\"",status="500"} 1' in text
+    assert text.endswith('\n')
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    stages = registry.histogram('app_seconds', 'Stage time', ('stage',), buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 3.0):
+        stages.observe(seconds, 'upstream')
+    lines = registry.render().splitlines()
+    assert 'app_seconds_bucket{stage="upstream",le="0.1"} 2' in lines
+    assert 'app_seconds_bucket{stage="upstream",le="1"} 3' in lines
+    assert 'app_seconds_bucket{stage="upstream",le="+Inf"} 4' in lines
+    assert 'app_seconds_sum{stage="upstream"} 3.65' in lines
+    assert 'app_seconds_count{stage="upstream"} 4' in lines
+    assert stages.count('upstream') == 4
+
+
+def test_collectors_are_read_at_render_time():
+    registry = Registry()
+    state = {'hits': 1}
+    registry.collector(lambda: [('app_hits_total', 'counter', 'Hits', [({'tier': 'memory'}, state['hits'])])])
+    assert 'app_hits_total{tier="memory"} 1' in registry.render()
+    state['hits'] = 5
+    assert 'app_hits_total{tier="memory"} 5' in registry.render()
@@ -0,0 +1,49 @@
+"""
+Tests for cheap-first model routing
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model_router import MODELS, ModelRouter, difficulty
+
+
+def auction(*calls, dealer='N'):
+    seats = ['N', 'E', 'S', 'W']
+    start = seats.index(dealer)
+    return [{'seat': seats[(start + i) % 4], 'bid': bid} for i, bid in enumerate(calls)]
+
+
+def test_routine_auctions_are_easy():
+    assert difficulty([]) == []
+    assert difficulty(auction('1NT', 'Pass', '2C', 'Pass')) == []
+
+
+def test_difficulty_reasons():
+    assert difficulty(auction('1H', '2C')) == ['contested']
+    assert difficulty(auction('1H', 'X')) == ['contested']
+    assert difficulty(auction('1S', 'Pass', '3S', 'Pass', '4NT')) == ['slam']
+    assert difficulty(auction('1C', 'Pass', '1D', 'Pass', '1H', 'Pass')) == ['long']
+    assert difficulty(auction('1C', 'Pass', '1D', 'Pass'), long_auction=4) == ['long']
+
+
+def test_route_picks_cheap_first_with_fallback():
+    router = ModelRouter()
+    assert router.route(auction('1NT', 'Pass')) == (MODELS['haiku'], MODELS['sonnet'])
+    assert router.route(auction('1NT', '2H')) == (MODELS['sonnet'], None)
+    assert router.stats()['reasons'] == {'contested': 1}
+
+
+def test_stats_track_escalation_rate_and_latency():
+    router = ModelRouter()
+    router.record({'model': MODELS['haiku']}, 0.5)
+    router.record({'model': MODELS['haiku']}, 0.7)
+    router.record({'model': MODELS['sonnet'], 'escalated': True}, 2.0)
+    router.record({'model': MODELS['sonnet']}, 1.5)
+    stats = router.stats()
+    assert stats['routes'] == {'cheap': 2, 'strong': 1, 'escalated': 1}
+    assert stats['escalation_rate'] == round(1 / 3, 3)
+    assert stats['strong_share'] == 0.5
+    assert stats['mean_latency'] == {'cheap': 0.6, 'strong': 1.5, 'escalated': 2.0}
@@ -0,0 +1,70 @@
+"""
+Tests for server-side prompt construction
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from prompts import build_bid_request, budget_report, render_user_message, request_text
+from scenarios import get_scenario
+
+HAND = {'S': 'A105', 'H': 'KQ84', 'D': 'AQ6', 'C': 'K73'}
+AUCTION = [{'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': 'Pass'}]
+
+
+def test_static_prefix_is_cacheable():
+    """The last system block carries cache_control"""
+    payload = build_bid_request('haiku', 'S', HAND, AUCTION, ['stayman'])
+    assert len(payload['system']) == 2
+    assert payload['system'][-1]['cache_control'] == {'type': 'ephemeral'}
+    assert 'cache_control' not in payload['system'][0]
+    assert 'Stayman' in payload['system'][-1]['text']
+
+
+def test_prefix_independent_of_convention_order():
+    """Convention order does not change the prefix"""
+    a = build_bid_request('haiku', 'S', HAND, AUCTION, ['stayman', 'transfers'])
+    b = build_bid_request('haiku', 'S', HAND, AUCTION, ['transfers', 'stayman'])
+    assert a['system'] == b['system']
+
+
+def test_user_message_labels_seats():
+    """The auction marks who is partner and who is opponent"""
+    text = render_user_message('S', HAND, AUCTION)
+    assert 'You are S. Partner: N.' in text
+    assert 'N 1NT (partner)' in text
+    assert 'E Pass (opp)' in text
+    assert 'AT5' in text  # ten shown as T
+    assert '18 HCP, 4-3-3-3 balanced, 6 losers, 4 quick tricks, 6 controls, stoppers S H D C' in text
+
+
+def test_opponent_stayman_warning():
+    """An opponent's 2C gets a warning when Stayman is enabled"""
+    auction = [{'seat': 'N', 'bid': '1NT'}, {'seat': 'E', 'bid': '2C'}]
+    assert 'OPPONENT' in render_user_message('S', HAND, auction, ['stayman'])
+    assert 'OPPONENT' not in render_user_message('S', HAND, auction, [])
+
+
+def test_request_text_covers_system_and_messages():
+    """Cache keys see both the prefix and the per-call message"""
+    payload = build_bid_request('haiku', 'S', HAND, AUCTION, ['stayman'])
+    text = request_text(payload)
+    assert text.startswith('You bid one seat')
+    assert text.endswith('Your call?')
+
+
+def test_budget_report_is_compact():
+    """Every template stays well under the old ~3 KB browser prompt"""
+    budget = budget_report()
+    for row in budget['templates']:
+        assert row['prefix_bytes'] + row['message_bytes'] < 1500
+    assert budget['client_request_bytes'] < 300
+
+
+def test_scenarios_loaded_by_id():
+    """Scenario data is available server-side"""
+    scenario = get_scenario('U01')
+    assert scenario['hands']['N'] == HAND
+    assert get_scenario('NOPE') is None
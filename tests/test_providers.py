@@ -0,0 +1,210 @@
+"""
+Tests for the provider adapters and the failover router
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model_router import MODELS
+from providers import (OpenAICompatibleProvider, ProviderRouter, StubProvider, build_providers)
+from upstream import UpstreamError
+
+PAYLOAD = {
+    'model': MODELS['haiku'],
+    'max_tokens': 300,
+    'system': [{'type': 'text', 'text': 'You bid bridge.'}, {'type': 'text', 'text': 'Reply in JSON.'}],
+    'messages': [{'role': 'user', 'content': 'You are S. Bid.'}],
+}
+
+
+class FakeResponse:
+    def __init__(self, body=None, lines=()):
+        self.status_code = 200
+        self.headers = {}
+        self._body = body or {}
+        self._lines = lines
+
+    def json(self):
+        return self._body
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self._lines)
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.headers = {}
+        self.sent = []
+
+    def post(self, url, json=None, timeout=None, stream=False):
+        self.sent.append(json)
+        return self.response
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_openai_request_and_reply_are_translated():
+    session = FakeSession(FakeResponse({
+        'model': 'llama-3.1-8b-instant',
+        'choices': [{'message': {'role': 'assistant', 'content': '{"bid": "2C"}'}}],
+        'usage': {'prompt_tokens': 120, 'completion_tokens': 9},
+    }))
+    provider = OpenAICompatibleProvider('groq', 'https://example.test', 'key', model='llama-3.1-8b-instant',
+                                        models={MODELS['sonnet']: 'llama-3.3-70b'}, session=session)
+    reply = provider.post_json(PAYLOAD)
+    assert session.sent[0] == {
+        'model': 'llama-3.1-8b-instant',
+        'messages': [{'role': 'system', 'content': 'You bid bridge.\nReply in JSON.'},
+                     {'role': 'user', 'content': 'You are S. Bid.'}],
+        'max_tokens': 300,
+    }
+    assert reply['content'] == [{'type': 'text', 'text': '{"bid": "2C"}'}]
+    assert reply['usage'] == {'input_tokens': 120, 'output_tokens': 9}
+    assert provider.request(dict(PAYLOAD, model=MODELS['sonnet']))['model'] == 'llama-3.3-70b'
+    assert session.headers['Authorization'] == 'Bearer key'
+
+
+def test_openai_stream_becomes_text_deltas():
+    chunks = [{'choices': [{'delta': {'role': 'assistant'}}]},
+              {'choices': [{'delta': {'content': '{"bid": '}}]},
+              {'choices': [{'delta': {'content': '"2C"}'}}]}]
+    session = FakeSession(FakeResponse(lines=[f'data: {json.dumps(c)}' for c in chunks] + ['data: [DONE]']))
+    provider = OpenAICompatibleProvider('groq', 'https://example.test', model='m', session=session)
+    events = list(provider.stream_events(PAYLOAD))
+    assert ''.join(body['delta']['text'] for event, body in events if event == 'content_block_delta') == '{"bid": "2C"}'
+    assert events[-1][0] == 'message_stop'
+    assert session.sent[0]['stream'] is True
+
+
+def test_build_providers_from_env():
+    providers = build_providers('anthropic, groq,stub', {
+        'ANTHROPIC_API_KEY': 'a', 'GROQ_API_KEY': 'g', 'GROQ_STRONG_MODEL': 'llama-3.3-70b', 'STUB_LATENCY': '0.5',
+    })
+    assert [(p.name, p.kind) for p in providers] == [('anthropic', 'anthropic'), ('groq', 'openai'), ('stub', 'stub')]
+    groq = providers[1]
+    assert groq.client.url == 'https://api.groq.com/openai/v1/chat/completions'
+    assert groq.model == 'llama-3.1-8b-instant' and groq.models == {MODELS['sonnet']: 'llama-3.3-70b'}
+    assert providers[2].latency == 0.5
+    assert providers[0].client.breaker is not groq.client.breaker
+    with pytest.raises(ValueError):
+        build_providers('mystery', {})
+    with pytest.raises(ValueError):
+        build_providers(' , ', {})
+
+
+def test_router_prefers_fastest_provider():
+    slow, fast = StubProvider('slow', latency=0.03), StubProvider('fast', latency=0.0)
+    router = ProviderRouter([slow, fast])
+    for _ in range(6):
+        router.post_json(PAYLOAD)
+    # Each is tried once, then the faster one takes the traffic
+    assert slow.calls == 1 and fast.calls == 5
+    assert router.stats()['order'] == ['fast', 'slow']
+
+
+def test_router_fails_over_on_error():
+    broken, backup = StubProvider('broken', error_rate=1.0), StubProvider('backup')
+    router = ProviderRouter([broken, backup])
+    reply = router.post_json(PAYLOAD)
+    assert reply['content'][0]['text'] == backup.text
+    stats = router.stats()
+    assert stats['failovers'] == 1 and stats['providers']['broken']['routing']['error_rate'] == 1.0
+    assert stats['order'] == ['backup', 'broken']
+
+
+def test_router_demotes_provider_failing_fast_from_cold_start():
+    """A provider whose very first calls fail instantly does not keep the top spot"""
+    bad, good = StubProvider('bad', latency=0.001, error_rate=1.0), StubProvider('good', latency=0.02)
+    router = ProviderRouter([bad, good], failover_timeout=(3.05, 10))
+    for _ in range(10):
+        router.post_json(PAYLOAD)
+    assert [provider.name for provider in router.order()] == ['good', 'bad']
+    assert bad.calls == 1 and router.failovers == 1
+    # Charged the failover timeout, not its own 1ms
+    assert router.stats()['providers']['bad']['routing']['ewma_ms'] == 10000
+
+
+def test_router_fails_over_on_timeout():
+    """Only the last provider gets the full timeout"""
+    hung, backup = StubProvider('hung', latency=5.0), StubProvider('backup')
+    router = ProviderRouter([hung, backup], failover_timeout=(1.0, 0.02))
+    assert router.post_json(PAYLOAD)['content'][0]['text'] == backup.text
+    assert router.stats()['providers']['hung']['routing']['ewma_ms'] >= 20
+
+
+def test_router_raises_last_error_when_all_fail():
+    router = ProviderRouter([StubProvider('a', error_rate=1.0), StubProvider('b', error_rate=1.0)])
+    with pytest.raises(UpstreamError):
+        router.post_json(PAYLOAD)
+
+
+def test_router_probes_idle_provider():
+    """A provider passed over for probe_interval gets one call to show it recovered"""
+    clock = Clock()
+    primary, backup = StubProvider('primary', error_rate=1.0), StubProvider('backup')
+    router = ProviderRouter([primary, backup], probe_interval=30.0, clock=clock)
+    router.post_json(PAYLOAD)
+    router.post_json(PAYLOAD)
+    assert primary.calls == 1
+    primary.error_rate = 0.0
+    clock.now = 31.0
+    router.post_json(PAYLOAD)
+    assert primary.calls == 2 and router.stats()['probes'] == 1
+
+
+def test_router_stream_fails_over_before_first_event():
+    broken, backup = StubProvider('broken', error_rate=1.0), StubProvider('backup')
+    router = ProviderRouter([broken, backup])
+    events = list(router.stream_events(PAYLOAD))
+    assert ''.join(body['delta']['text'] for event, body in events if event == 'content_block_delta') == backup.text
+    assert router.stats()['failovers'] == 1
+
+
+def test_router_refuses_over_concurrency_limit():
+    from limits import ConcurrencyLimit
+    limit = ConcurrencyLimit(1)
+    router = ProviderRouter([StubProvider()], limit=limit)
+    assert limit.try_acquire()
+    with pytest.raises(UpstreamError) as error:
+        router.post_json(PAYLOAD)
+    assert error.value.status_code == 429
+    with pytest.raises(UpstreamError):
+        list(router.stream_events(PAYLOAD))
+    limit.release()
+    router.post_json(PAYLOAD)
+    assert limit.stats()['in_flight'] == 0
+
+
+def test_router_records_usage_in_ledger():
+    from limits import TokenLedger
+    ledger = TokenLedger({MODELS['haiku']: (1.0, 1.0)})
+    router = ProviderRouter([StubProvider()], ledger=ledger)
+    router.post_json(PAYLOAD)
+    list(router.stream_events(PAYLOAD))
+    row = ledger.stats()['models'][MODELS['haiku']]
+    assert row['calls'] == 2 and row['input_tokens'] > 0 and row['output_tokens'] > 0
+
+
+def test_upstream_client_counts_status_codes_and_stages():
+    from metrics import stage_seconds
+    session = FakeSession(FakeResponse({'content': [{'type': 'text', 'text': 'Pass'}]}))
+    provider = OpenAICompatibleProvider('groq', 'https://example.test', model='m', session=session)
+    before = stage_seconds.count('upstream_wait'), stage_seconds.count('upstream_read')
+    provider.post_json(PAYLOAD)
+    assert provider.stats()['status_codes'] == {'200': 1}
+    assert (stage_seconds.count('upstream_wait'), stage_seconds.count('upstream_read')) == (before[0] + 1, before[1] + 1)
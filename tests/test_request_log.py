@@ -0,0 +1,146 @@
+"""
+Tests for the request log and its replay tool
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from request_log import RequestLog, encode_entry, log_files, read_log, replay, summarize
+
+REQUEST = json.dumps({'scenario_id': 'U01', 'seat': 'N', 'auction': []}).encode()
+RESPONSE = json.dumps({'bid': '2C', 'reasoning': 'Stayman', 'source': 'llm', 'model': 'haiku'}).encode()
+
+
+def test_entries_are_written_and_decoded(tmp_path):
+    log = RequestLog(str(tmp_path / 'logs' / 'bids.jsonl'))
+    for _ in range(3):
+        assert log.record('/api/bid', 200, 0.25, 'MISS', REQUEST, RESPONSE)
+    log.flush()
+    entries = list(read_log([log.path]))
+    assert len(entries) == 3
+    assert entries[0]['ms'] == 250.0 and entries[0]['cache'] == 'MISS'
+    assert (entries[0]['kind'], entries[0]['bid'], entries[0]['model']) == ('scenario', '2C', 'haiku')
+    assert log.stats()['written'] == 3
+
+
+def test_raw_prompts_and_bad_bodies():
+    entry = json.loads(encode_entry(1.0, '/api/bid', 400, 0.001, None, b'{"prompt": "Bid"}', b'not json'))
+    assert (entry['kind'], entry['prompt_chars'], entry['response']) == ('prompt', 3, None)
+    assert entry['response_bytes'] == 8
+
+
+def test_rotation_keeps_backups(tmp_path):
+    path = str(tmp_path / 'bids.jsonl')
+    log = RequestLog(path, max_bytes=600, backups=2)
+    for _ in range(20):
+        log.record('/api/bid', 200, 0.1, None, REQUEST, RESPONSE)
+        log.flush()
+    assert log.stats()['rotations'] >= 3
+    assert log_files(path) == [path + '.2', path + '.1', path]
+    assert all(os.path.getsize(name) <= 600 for name in log_files(path))
+    timestamps = [entry['ts'] for entry in read_log([path])]
+    assert timestamps == sorted(timestamps)
+
+
+def test_sampling(tmp_path):
+    log = RequestLog(str(tmp_path / 'bids.jsonl'), sample=0.25, seed=1)
+    kept = sum(log.record('/api/bid', 200, 0.1, None, REQUEST, RESPONSE) for _ in range(400))
+    log.flush()
+    assert 60 < kept < 140
+    assert log.stats()['written'] == kept and log.stats()['sampled_out'] == 400 - kept
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    log = RequestLog(str(tmp_path / 'bids.jsonl'), queue_size=2)
+    release = threading.Event()
+    write = log._write_batch
+    log._write_batch = lambda batch, flush: release.wait(5) and write(batch, flush)
+    results = [log.record('/api/bid', 200, 0.1, None, REQUEST, RESPONSE) for _ in range(10)]
+    assert results.count(False) >= 7 and log.stats()['dropped'] == results.count(False)
+    release.set()
+    log.flush()
+    assert log.stats()['written'] == results.count(True)
+
+
+# Under gevent a slow disk write must not hold up the event loop: the
+# write sleeps 0.5s (unpatched) while a greenlet ticks every 10ms
+GEVENT_WRITER = """
+from gevent import monkey
+monkey.patch_all()
+import sys, time
+import gevent
+sys.path.insert(0, sys.argv[1])
+from request_log import RequestLog, read_log
+
+blocking_sleep = monkey.get_original('time', 'sleep')
+log = RequestLog(sys.argv[2])
+write = log._write_batch
+log._write_batch = lambda batch, flush: (blocking_sleep(0.5), write(batch, flush))[1]
+ticks = []
+
+def tick():
+    for _ in range(60):
+        ticks.append(time.perf_counter())
+        gevent.sleep(0.01)
+
+ticker = gevent.spawn(tick)
+gevent.sleep(0.05)
+log.record('/api/bid', 200, 0.1, None, b'{"prompt": "x"}', b'{"bid": "1C"}')
+ticker.join()
+log.flush()
+print(max(b - a for a, b in zip(ticks, ticks[1:])), len(list(read_log([log.path]))))
+"""
+
+
+def test_writer_does_not_block_the_gevent_loop(tmp_path):
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    result = subprocess.run([sys.executable, '-c', GEVENT_WRITER, root, str(tmp_path / 'bids.jsonl')],
+                            capture_output=True, text=True, timeout=60, check=True)
+    longest_gap, entries = result.stdout.split()
+    assert entries == '1'
+    assert float(longest_gap) < 0.25
+
+
+def test_summary():
+    entries = [json.loads(encode_entry(i, '/api/bid', 200, i / 1000, 'HIT', REQUEST, RESPONSE)) for i in range(1, 101)]
+    summary = summarize(entries)
+    assert summary['requests'] == 100 and summary['cache'] == {'HIT': 100}
+    assert summary['ms'] == {'p50': 50.0, 'p95': 95.0, 'p99': 99.0}
+
+
+def test_replay_against_a_server():
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            seen.append((self.path, json.loads(self.rfile.read(int(self.headers['Content-Length'])))))
+            body = json.dumps({'bid': '2C' if len(seen) % 2 else '3NT'}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    entries = [json.loads(encode_entry(1000 + i * 0.05, '/api/bid', 200, 0.1, None, REQUEST, RESPONSE))
+               for i in range(6)]
+    try:
+        result = replay(entries, f'http://127.0.0.1:{server.server_port}', speed=1, concurrency=1)
+    finally:
+        server.shutdown()
+    assert result['sent'] == 6 and result['statuses'] == {'200': 6}
+    assert (result['same_bid'], result['changed_bid']) == (3, 3)
+    # Original spacing: 0.25s between the first and last request
+    assert result['seconds'] >= 0.25
+    assert seen[0] == ('/api/bid', json.loads(REQUEST))
@@ -0,0 +1,81 @@
+"""
+Tests for the server-held auction tables
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from auction import CALL_CODES
+from sessions import CLOSED, SessionStore
+
+SCENARIO = {'id': 'U01', 'dealer': 'N'}
+OPENING = [{'seat': 'N', 'bid': '1NT'}]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_table_keeps_calls_compactly():
+    session = SessionStore().create(SCENARIO, 'S', OPENING)
+    session.add('Pass')
+    session.add('2C')
+    assert bytes(session.calls.calls) == bytes([CALL_CODES['1NT'], CALL_CODES['Pass'], CALL_CODES['2C']])
+    assert session.auction() == OPENING + [{'seat': 'E', 'bid': 'Pass'}, {'seat': 'S', 'bid': '2C'}]
+    assert session.next_seat() == 'W'
+    with pytest.raises(ValueError):
+        session.add('1H')  # below 2C
+    assert session.state()['next_seat'] == 'W' and not session.state()['complete']
+
+
+def test_create_rejects_out_of_turn_auction():
+    with pytest.raises(ValueError):
+        SessionStore().create(SCENARIO, 'S', [{'seat': 'E', 'bid': '1NT'}])
+    with pytest.raises(ValueError):
+        SessionStore().create(SCENARIO, 'S', [{'seat': 'N', 'bid': '8NT'}])
+
+
+def test_idle_tables_expire_and_observers_hear_it():
+    clock = Clock()
+    store = SessionStore(idle_ttl=60, clock=clock)
+    session = store.create(SCENARIO, 'S', OPENING)
+    _, events = store.watch(session.id)
+    clock.now = 30
+    assert store.get(session.id) is session  # touched
+    clock.now = 89
+    assert store.get(session.id) is session
+    clock.now = 150
+    assert store.get(session.id) is None
+    assert events.get_nowait() is CLOSED
+    assert store.stats()['expired'] == 1
+
+
+def test_oldest_table_evicted_beyond_max():
+    store = SessionStore(max_sessions=2)
+    first = store.create(SCENARIO, 'S')
+    store.create(SCENARIO, 'S')
+    store.create(SCENARIO, 'S')
+    assert store.get(first.id) is None
+    assert store.stats()['sessions'] == 2 and store.stats()['evicted'] == 1
+
+
+def test_publish_fans_out_and_drops_slow_observers():
+    store = SessionStore(observer_queue=2)
+    session = store.create(SCENARIO, 'S', OPENING)
+    _, fast = store.watch(session.id)
+    _, slow = store.watch(session.id)
+    for i in range(2):
+        store.publish(session, f'event {i}')
+        assert fast.get_nowait() == f'event {i}'
+    assert store.stats()['observers'] == 2
+    store.publish(session, 'event 2')  # slow's queue is full
+    assert store.stats()['observers'] == 1 and store.stats()['dropped_observers'] == 1
+    assert [slow.get_nowait(), slow.get_nowait()] == ['event 1', CLOSED]
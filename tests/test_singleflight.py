@@ -0,0 +1,93 @@
+"""
+Tests for single-flight request coalescing
+"""
+
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from singleflight import SingleFlight
+
+
+def run_concurrently(flights, key, fn, count):
+    """Start `count` callers that block until the leader is released"""
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flights.do(key, fn)))
+        for _ in range(count)
+    ]
+    for t in threads:
+        t.start()
+    return threads, results
+
+
+def wait_until(condition, timeout=5.0):
+    """Check `condition` every few milliseconds; fail the test if it has not held within `timeout` seconds"""
+    deadline = time.monotonic() + timeout
+    tick = threading.Event()
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out waiting for callers to coalesce'
+        tick.wait(0.005)
+
+
+def test_concurrent_calls_share_one_execution():
+    """Identical concurrent calls run fn once and all get its result"""
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return {'bid': '2C'}
+
+    threads, results = run_concurrently(flights, 'k', fn, 5)
+    wait_until(lambda: flights.stats()['coalesced'] >= 4)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert [r[0] for r in results] == [{'bid': '2C'}] * 5
+    assert sum(1 for r in results if r[1]) == 4
+    stats = flights.stats()
+    assert stats['executions'] == 1
+    assert stats['coalesced'] == 4
+    assert stats['in_flight'] == 0
+
+
+def test_errors_propagate_to_waiters():
+    """Waiters see the leader's exception"""
+    flights = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def fn():
+        release.wait(5)
+        raise ValueError('upstream down')
+
+    def caller():
+        try:
+            flights.do('k', fn)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=caller) for _ in range(3)]
+    for t in threads:
+        t.start()
+    wait_until(lambda: flights.stats()['coalesced'] >= 2)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(errors) == 3
+
+
+def test_sequential_calls_not_coalesced():
+    """Once a call finishes the next one runs again"""
+    flights = SingleFlight()
+    assert flights.do('k', lambda: 1) == (1, False)
+    assert flights.do('k', lambda: 2) == (2, False)
+    assert flights.stats()['coalesced'] == 0
@@ -0,0 +1,186 @@
+"""
+Tests for the pooled upstream client and circuit breaker
+"""
+
+import pytest
+import sys
+import os
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from upstream import UpstreamClient, UpstreamError, CircuitOpenError, CircuitBreaker
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self._body = body or {}
+        self.headers = headers or {}
+        self.text = str(self._body)
+
+    def json(self):
+        return self._body
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self._body.get('lines', []))
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """Returns queued responses (or raises queued exceptions) in order"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.headers = {}
+        self.calls = 0
+
+    def post(self, url, json=None, timeout=None, stream=False):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def make_client(outcomes, **kwargs):
+    session = FakeSession(outcomes)
+    client = UpstreamClient('https://example.test/v1/messages', session=session, **kwargs)
+    client._sleep = lambda seconds: None
+    return client, session
+
+
+def test_success_returns_json():
+    """A 200 response is decoded and counted"""
+    client, session = make_client([FakeResponse(200, {'content': []})])
+    assert client.post_json({'x': 1}) == {'content': []}
+    stats = client.stats()
+    assert stats['successes'] == 1
+    assert stats['retries'] == 0
+
+
+def test_retries_on_5xx_then_succeeds():
+    """429/5xx responses are retried up to max_retries"""
+    client, session = make_client(
+        [FakeResponse(529), FakeResponse(429, headers={'retry-after': '1'}), FakeResponse(200, {'ok': True})],
+        max_retries=2,
+    )
+    assert client.post_json({}) == {'ok': True}
+    assert session.calls == 3
+    assert client.stats()['retries'] == 2
+
+
+def test_gives_up_after_max_retries():
+    """Retries are bounded"""
+    client, session = make_client([FakeResponse(503)] * 3, max_retries=2)
+    with pytest.raises(UpstreamError) as exc:
+        client.post_json({})
+    assert exc.value.status_code == 503
+    assert session.calls == 3
+
+
+def test_client_errors_not_retried():
+    """4xx other than 429 fail immediately; a bad request does not count against the breaker"""
+    breaker = CircuitBreaker(failure_threshold=1)
+    client, session = make_client([FakeResponse(400)], max_retries=3, breaker=breaker)
+    with pytest.raises(UpstreamError):
+        client.post_json({})
+    assert session.calls == 1
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize('status', [401, 403, 404])
+def test_configuration_errors_open_the_breaker(status):
+    """A bad key or URL fails every call, so it is not retried and counts as a failure"""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    client, session = make_client([FakeResponse(status)] * 2, max_retries=3, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(UpstreamError):
+            client.post_json({})
+    assert session.calls == 2
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+
+def test_read_timeout_not_retried():
+    """A read timeout maps to 504 without retrying"""
+    client, session = make_client([requests.exceptions.ReadTimeout('slow')], max_retries=3)
+    with pytest.raises(UpstreamError) as exc:
+        client.post_json({})
+    assert exc.value.status_code == 504
+    assert session.calls == 1
+
+
+def test_breaker_opens_and_fails_fast():
+    """After repeated failures calls are rejected without touching the network"""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    client, session = make_client([requests.exceptions.ConnectionError('down')] * 2,
+                                  max_retries=0, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(UpstreamError):
+            client.post_json({})
+    with pytest.raises(CircuitOpenError):
+        client.post_json({})
+    assert session.calls == 2
+    assert client.stats()['rejected_by_breaker'] == 1
+
+
+def test_breaker_half_open_recovers():
+    """After the reset timeout a single trial call is allowed through"""
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert not breaker.allow()
+    now[0] = 11.0
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial at a time
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+class InvalidJSONResponse(FakeResponse):
+    def json(self):
+        raise ValueError('Expecting value')
+
+
+@pytest.mark.parametrize('outcome', [
+    InvalidJSONResponse(200),
+    requests.exceptions.ChunkedEncodingError('connection broken'),
+])
+def test_half_open_trial_always_resolved(outcome):
+    """A trial call that fails in any way reopens the breaker instead of leaving it waiting"""
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    client, session = make_client([outcome, FakeResponse(200, {'ok': True})], max_retries=0, breaker=breaker)
+    breaker.record_failure()
+    now[0] = 11.0
+    with pytest.raises(UpstreamError) as exc:
+        client.post_json({})
+    assert exc.value.status_code == 502
+    assert breaker.state == CircuitBreaker.OPEN and client.stats()['failures'] == 1
+    now[0] = 22.0
+    assert client.post_json({}) == {'ok': True}
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_backoff_is_bounded():
+    """Jittered backoff never exceeds the cap"""
+    client, _ = make_client([], backoff_base=1.0, backoff_cap=2.0)
+    for attempt in range(10):
+        assert 0 <= client._backoff(attempt) <= 2.0
+
+
+def test_stream_events_parses_sse():
+    """Streamed replies are split into (event, data) pairs"""
+    lines = [
+        'event: message_start', 'data: {"type": "message_start"}', '',
+        'event: content_block_delta',
+        'data: {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "hi"}}', '',
+    ]
+    client, session = make_client([FakeResponse(200, {'lines': lines})])
+    events = list(client.stream_events({'model': 'm'}))
+    assert [event for event, _ in events] == ['message_start', 'content_block_delta']
+    assert events[1][1]['delta']['text'] == 'hi'
+    assert client.stats()['successes'] == 1
@@ -0,0 +1,333 @@
+"""
+Pooled HTTP client for the upstream LLM API.
+
+One UpstreamClient lives for the whole process, so every /api/bid call
+reuses a warm keep-alive connection instead of paying a TLS handshake.
+Calls have connect/read timeouts, bounded retries with jittered backoff
+on 429/5xx, and a circuit breaker that fails fast while the upstream is down.
+"""
+
+import json
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import stage_seconds
+
+RETRY_STATUSES = {429, 500, 502, 503, 504, 529}
+# A bad key, no access or a wrong URL fails every call until someone fixes
+# the configuration, so these count against the breaker; other 4xx are
+# problems with one request
+CONFIG_ERROR_STATUSES = {401, 403, 404}
+
+
+class UpstreamError(Exception):
+    """Raised when an upstream call fails. Carries the HTTP status to return."""
+
+    def __init__(self, message, status_code=502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised without touching the network while the breaker is open."""
+
+    def __init__(self, message='Upstream circuit open - failing fast'):
+        super().__init__(message, status_code=503)
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    rejects calls for `reset_timeout` seconds. Then one trial call is let
+    through; success closes the breaker, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self):
+        """Return True if a call may go upstream right now."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._trial_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self._current_state(),
+                'consecutive_failures': self._failures,
+                'times_opened': self.times_opened,
+            }
+
+
+class UpstreamClient:
+    """
+    Thread-safe JSON POST client bound to one upstream URL.
+
+    `post_json(payload)` returns the decoded response body and
+    `stream_events(payload)` yields streamed SSE events; both raise
+    UpstreamError. Counters are exposed through `stats()` for /health.
+    """
+
+    def __init__(self, url, headers=None, connect_timeout=3.05, read_timeout=30.0,
+                 max_retries=2, backoff_base=0.25, backoff_cap=4.0, pool_size=20,
+                 breaker=None, session=None):
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker = breaker or CircuitBreaker()
+        self._sleep = time.sleep
+
+        self._adapter = None
+        if session is None:
+            session = requests.Session()
+            self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size,
+                                        max_retries=0, pool_block=False)
+            session.mount('https://', self._adapter)
+            session.mount('http://', self._adapter)
+        if headers:
+            session.headers.update(headers)
+        self.session = session
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._successes = 0
+        self._failures = 0
+        self._retries = 0
+        self._rejected = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._latency_last = 0.0
+        self._statuses = {}
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring Retry-After up to the cap."""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.backoff_cap))
+            except ValueError:
+                pass
+        return delay
+
+    def _record(self, ok, elapsed):
+        with self._lock:
+            if ok:
+                self._successes += 1
+            else:
+                self._failures += 1
+            self._latency_total += elapsed
+            self._latency_last = elapsed
+            self._latency_max = max(self._latency_max, elapsed)
+
+    def post_json(self, payload, timeout=None):
+        """POST `payload` upstream and return the JSON body."""
+        response, start, headers_at = self._send(payload, timeout)
+        ok = False
+        try:
+            body = response.json()
+            ok = True
+        except ValueError as e:
+            raise UpstreamError(f'Upstream returned invalid JSON: {e}', 502)
+        finally:
+            if not ok:
+                # Also resolves a half-open breaker's trial call
+                self._fail(start)
+        now = time.perf_counter()
+        stage_seconds.observe(now - headers_at, 'upstream_read')
+        self.breaker.record_success()
+        self._record(True, now - start)
+        return body
+
+    def stream_events(self, payload, timeout=None):
+        """
+        POST `payload` with "stream": true and yield (event, data) pairs
+        from the Server-Sent Events reply as they arrive.
+
+        Retries apply only until the response headers arrive; once the
+        stream has started, a broken connection raises UpstreamError.
+        """
+        response, start, headers_at = self._send(dict(payload, stream=True), timeout, stream=True)
+        self.breaker.record_success()
+        try:
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith('event:'):
+                    event = line[6:].strip()
+                elif line.startswith('data:'):
+                    if line[5:].strip() == '[DONE]':  # OpenAI-style end of stream
+                        break
+                    data = json.loads(line[5:])
+                    yield event or data.get('type'), data
+                    event = None
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self._fail(start)
+            raise UpstreamError(f'Upstream stream broken: {e}', 502)
+        finally:
+            response.close()
+        now = time.perf_counter()
+        stage_seconds.observe(now - headers_at, 'upstream_read')
+        self._record(True, now - start)
+
+    def _send(self, payload, timeout=None, stream=False):
+        """Send with retries; return (successful response, start time, time its headers arrived)."""
+        if not self.breaker.allow():
+            with self._lock:
+                self._rejected += 1
+            raise CircuitOpenError()
+
+        with self._lock:
+            self._requests += 1
+
+        timeout = timeout or (self.connect_timeout, self.read_timeout)
+        start = time.perf_counter()
+        # Every way out of here must tell the breaker how the call went, or
+        # a half-open breaker waits forever for its trial call. A returned
+        # response is the caller's to record.
+        settled = False
+        try:
+            attempt = 0
+            while True:
+                retry_after = None
+                sent = time.perf_counter()
+                try:
+                    response = self.session.post(self.url, json=payload, timeout=timeout, stream=stream)
+                except requests.exceptions.ConnectionError as e:
+                    self._count_status('connection_error')
+                    error = UpstreamError(f'Upstream connection failed: {e}', 502)
+                except requests.exceptions.Timeout as e:
+                    # A read timeout already held the worker for read_timeout
+                    # seconds; retrying would only double that.
+                    self._count_status('timeout')
+                    raise UpstreamError(f'Upstream timed out: {e}', 504)
+                except requests.exceptions.RequestException as e:
+                    self._count_status('error')
+                    raise UpstreamError(f'Upstream request failed: {e}', 502)
+                else:
+                    self._count_status(str(response.status_code))
+                    if response.status_code < 400:
+                        # requests times the wait for the headers, before it
+                        # reads a buffered reply's body
+                        elapsed = getattr(response, 'elapsed', None)
+                        wait = elapsed.total_seconds() if elapsed is not None else time.perf_counter() - sent
+                        stage_seconds.observe(wait, 'upstream_wait')
+                        settled = True
+                        return response, start, sent + wait
+                    error = UpstreamError(
+                        f'Upstream returned {response.status_code}: {response.text[:200]}',
+                        response.status_code if response.status_code in RETRY_STATUSES else 502,
+                    )
+                    if response.status_code in CONFIG_ERROR_STATUSES:
+                        raise error
+                    if response.status_code not in RETRY_STATUSES:
+                        # Our request was bad (validation, size); the upstream is healthy.
+                        self.breaker.record_success()
+                        self._record(False, time.perf_counter() - start)
+                        settled = True
+                        raise error
+                    retry_after = response.headers.get('retry-after')
+
+                if attempt >= self.max_retries:
+                    raise error
+                self._sleep(self._backoff(attempt, retry_after))
+                attempt += 1
+                with self._lock:
+                    self._retries += 1
+        finally:
+            if not settled:
+                self._fail(start)
+
+    def _count_status(self, status):
+        with self._lock:
+            self._statuses[status] = self._statuses.get(status, 0) + 1
+
+    def _fail(self, start):
+        self.breaker.record_failure()
+        self._record(False, time.perf_counter() - start)
+
+    def _pool_counters(self):
+        """Sum urllib3 pool counters: requests served vs. connections opened."""
+        connections = 0
+        pool_requests = 0
+        if self._adapter is not None:
+            pools = self._adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+                    pool_requests += pool.num_requests
+        return connections, pool_requests
+
+    def stats(self):
+        connections, pool_requests = self._pool_counters()
+        with self._lock:
+            completed = self._successes + self._failures
+            return {
+                'requests': self._requests,
+                'successes': self._successes,
+                'failures': self._failures,
+                'retries': self._retries,
+                'rejected_by_breaker': self._rejected,
+                'status_codes': dict(self._statuses),
+                'connections_opened': connections,
+                'pool_hits': max(0, pool_requests - connections),
+                'latency_ms': {
+                    'avg': round(1000 * self._latency_total / completed, 1) if completed else 0.0,
+                    'max': round(1000 * self._latency_max, 1),
+                    'last': round(1000 * self._latency_last, 1),
+                },
+                'breaker': self.breaker.snapshot(),
+            }